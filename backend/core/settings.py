@@ -175,6 +175,7 @@ CORS_ALLOW_METHODS = (
 CORS_ALLOW_HEADERS = (
     "accept",
     "authorization",
+    "idempotency-key",
     "content-type",
     "user-agent",
     "x-csrftoken",
@@ -243,9 +244,151 @@ WEB3 = {
     'provider': 'http://192.168.0.146:8545',  # Same as above
 }
 
+# Where the chain lives (main.chain_backends): 'rpc' is a node at
+# WEB3_PROVIDER_URI; 'tester' an in-process EVM; 'simulator' a
+# deterministic in-process model for load tests, which mines every
+# CHAIN_SIM_BLOCK_TIME seconds (0: on every transaction), adds
+# CHAIN_SIM_LATENCY seconds to each call and drops CHAIN_SIM_FAILURE_RATE of
+# calls, drawn from CHAIN_SIM_SEED.
+CHAIN_BACKEND = os.getenv('CHAIN_BACKEND', 'rpc')
+CHAIN_SIM_BLOCK_TIME = float(os.getenv('CHAIN_SIM_BLOCK_TIME', '0'))
+CHAIN_SIM_LATENCY = float(os.getenv('CHAIN_SIM_LATENCY', '0'))
+CHAIN_SIM_FAILURE_RATE = float(os.getenv('CHAIN_SIM_FAILURE_RATE', '0'))
+CHAIN_SIM_SEED = int(os.getenv('CHAIN_SIM_SEED', '0'))
 WEB3_PROVIDER_URI = os.getenv('WEB3_PROVIDER_URI', 'http://192.168.0.146:8545')  # Ganache default
 CONTRACT_ADDRESS = os.getenv('VOTING_CONTRACT_ADDRESS')  # Set via .env after migration
 CONTRACT_ABI_PATH = os.path.join(BASE_DIR,'build' ,'contracts', 'VotingContract.json')
+# 'shared': elections without their own contract_address use CONTRACT_ADDRESS.
+# 'per_election': each such election gets a VotingContract deployed on first use.
+ELECTION_CONTRACTS = os.getenv('ELECTION_CONTRACTS', 'shared')
+# Relayer accounts for candidate registration, opening voting and contract
+# deploys (main.signer_pool): comma-separated private keys, PRIVATE_KEY when
+# empty. Selection is 'least_pending' or 'round_robin'; accounts with less
+# than SIGNER_MIN_BALANCE ether are skipped. Balances and the other workers'
+# backlog are re-read at most every SIGNER_REFRESH_INTERVAL seconds.
+SIGNER_PRIVATE_KEYS = os.getenv('SIGNER_PRIVATE_KEYS', '')
+SIGNER_SELECTION = os.getenv('SIGNER_SELECTION', 'least_pending')
+SIGNER_MIN_BALANCE = float(os.getenv('SIGNER_MIN_BALANCE', '0.01'))
+SIGNER_REFRESH_INTERVAL = float(os.getenv('SIGNER_REFRESH_INTERVAL', '30'))
+# Comma-separated keys of custodial voter wallets. A vote from one of these
+# wallets is signed with its own key; every other vote with PRIVATE_KEY.
+VOTER_PRIVATE_KEYS = os.getenv('VOTER_PRIVATE_KEYS', '')
+# Transaction signing (main.tx_signing): with SIGNING_PROCESSES > 0, signatures
+# are made in that many processes, in batches of up to SIGNING_BATCH_SIZE
+# gathered for at most SIGNING_BATCH_WAIT seconds. 0 signs on the calling thread.
+# A caller gives up on its signature after SIGNING_TIMEOUT seconds.
+SIGNING_PROCESSES = int(os.getenv('SIGNING_PROCESSES', '0'))
+SIGNING_BATCH_SIZE = int(os.getenv('SIGNING_BATCH_SIZE', '64'))
+SIGNING_BATCH_WAIT = float(os.getenv('SIGNING_BATCH_WAIT', '0.001'))
+SIGNING_TIMEOUT = float(os.getenv('SIGNING_TIMEOUT', '10'))
+
+# Shared Web3 client (main.web3_provider). Size the pool to the number of
+# threads per gunicorn worker; timeouts are in seconds.
+WEB3_POOL_MAXSIZE = int(os.getenv('WEB3_POOL_MAXSIZE', '10'))
+WEB3_CONNECT_TIMEOUT = float(os.getenv('WEB3_CONNECT_TIMEOUT', '3'))
+WEB3_READ_TIMEOUT = float(os.getenv('WEB3_READ_TIMEOUT', '30'))
+# Extra nodes (comma-separated URIs) used next to WEB3_PROVIDER_URI through
+# main.web3_failover: reads are hedged to a second node after the first one's
+# p95 latency (never sooner than WEB3_HEDGE_MIN_DELAY seconds), writes go to
+# the healthiest node. A node whose error rate over its last
+# WEB3_HEALTH_WINDOW calls exceeds WEB3_MAX_ERROR_RATE is benched for
+# WEB3_UNHEALTHY_COOLDOWN seconds.
+WEB3_PROVIDER_URIS = [uri.strip() for uri in os.getenv('WEB3_PROVIDER_URIS', '').split(',') if uri.strip()]
+WEB3_HEALTH_WINDOW = int(os.getenv('WEB3_HEALTH_WINDOW', '100'))
+WEB3_MAX_ERROR_RATE = float(os.getenv('WEB3_MAX_ERROR_RATE', '0.5'))
+WEB3_HEDGE_MIN_DELAY = float(os.getenv('WEB3_HEDGE_MIN_DELAY', '0.05'))
+WEB3_UNHEALTHY_COOLDOWN = float(os.getenv('WEB3_UNHEALTHY_COOLDOWN', '10'))
+# Seconds between background chain health checks in each web worker (0 = off).
+CHAIN_HEALTH_PROBE_INTERVAL = float(os.getenv('CHAIN_HEALTH_PROBE_INTERVAL', '30'))
+# Chain-bound requests (main.circuit_breaker): the breaker opens after
+# CHAIN_BREAKER_FAILURE_THRESHOLD consecutive node failures and tries again
+# after CHAIN_BREAKER_RESET_TIMEOUT seconds; each process re-reads its state
+# at most every CHAIN_BREAKER_STATE_TTL seconds. Each worker process admits at
+# most CHAIN_MAX_CONCURRENCY of these requests at once; keep it below
+# gunicorn's --threads. Async views hold no thread while they wait and get
+# their own cap per event loop, CHAIN_MAX_ASYNC_CONCURRENCY. Shed requests
+# are told to retry after CHAIN_BUSY_RETRY_AFTER seconds.
+CHAIN_BREAKER_FAILURE_THRESHOLD = int(os.getenv('CHAIN_BREAKER_FAILURE_THRESHOLD', '5'))
+CHAIN_BREAKER_RESET_TIMEOUT = float(os.getenv('CHAIN_BREAKER_RESET_TIMEOUT', '30'))
+CHAIN_BREAKER_STATE_TTL = float(os.getenv('CHAIN_BREAKER_STATE_TTL', '1'))
+CHAIN_MAX_CONCURRENCY = int(os.getenv('CHAIN_MAX_CONCURRENCY', '4'))
+CHAIN_MAX_ASYNC_CONCURRENCY = int(os.getenv('CHAIN_MAX_ASYNC_CONCURRENCY', '32'))
+CHAIN_BUSY_RETRY_AFTER = float(os.getenv('CHAIN_BUSY_RETRY_AFTER', '1'))
+
+# 'sync' waits for the vote transaction inside the request; 'queued' stores a
+# pending receipt, answers 202 and lets `manage.py run_vote_worker` submit it;
+# 'batched' stores a commitment and `manage.py anchor_votes` puts one Merkle
+# root per VOTE_BATCH_SIZE votes (or per VOTE_BATCH_INTERVAL seconds) on chain.
+VOTE_SUBMISSION_MODE = os.getenv('VOTE_SUBMISSION_MODE', 'sync')
+VOTE_WORKER_CONCURRENCY = int(os.getenv('VOTE_WORKER_CONCURRENCY', '8'))
+VOTE_WORKER_POLL_INTERVAL = float(os.getenv('VOTE_WORKER_POLL_INTERVAL', '0.5'))
+# A receipt a worker claimed but never broadcast (the worker died) goes back
+# to the queue after VOTE_SUBMISSION_LEASE seconds.
+VOTE_SUBMISSION_LEASE = float(os.getenv('VOTE_SUBMISSION_LEASE', '300'))
+VOTE_RECEIPT_TIMEOUT = float(os.getenv('VOTE_RECEIPT_TIMEOUT', '120'))
+VOTE_BATCH_SIZE = int(os.getenv('VOTE_BATCH_SIZE', '256'))
+VOTE_BATCH_INTERVAL = float(os.getenv('VOTE_BATCH_INTERVAL', '30'))
+# Seconds between background reloads of each worker's in-memory voted sets
+# (main.voted_set), which pick up ballots other processes deleted; 0 turns
+# the sets off and every check goes to the database.
+VOTED_SET_REFRESH = float(os.getenv('VOTED_SET_REFRESH', '60'))
+# Idempotency-Key support on vote and candidate POSTs (main.idempotency):
+# responses are replayed for IDEMPOTENCY_TTL seconds; a retry while the
+# first attempt runs gets 409, and that attempt's claim on the key lapses
+# after IDEMPOTENCY_LOCK_TIMEOUT seconds if its worker dies.
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', '86400'))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', '300'))
+# Blocks a vote must be buried under before its receipt is 'confirmed' (1 =
+# the block that mined it). The tracker polls the head every interval and
+# re-checks transactions it has not seen in a block every sweep interval.
+VOTE_CONFIRMATIONS = int(os.getenv('VOTE_CONFIRMATIONS', '1'))
+CONFIRMATION_POLL_INTERVAL = float(os.getenv('CONFIRMATION_POLL_INTERVAL', '1'))
+CONFIRMATION_SWEEP_INTERVAL = float(os.getenv('CONFIRMATION_SWEEP_INTERVAL', '30'))
+
+# Contract event index (manage.py index_events). Chunk size is the initial
+# eth_getLogs block range; reorg depth is how many recent block hashes are
+# kept to detect and roll back reorgs.
+INDEXER_START_BLOCK = int(os.getenv('INDEXER_START_BLOCK', '0'))
+INDEXER_CHUNK_SIZE = int(os.getenv('INDEXER_CHUNK_SIZE', '2000'))
+INDEXER_REORG_DEPTH = int(os.getenv('INDEXER_REORG_DEPTH', '64'))
+INDEXER_POLL_INTERVAL = float(os.getenv('INDEXER_POLL_INTERVAL', '2'))
+
+# Where voting-results/<id>/ gets its counts: 'tally' reads the CandidateTally
+# rows kept in step with votes; 'chain' reads candidateVotes from the contract;
+# 'index' counts the VoteCast events `manage.py index_events` has mirrored, up
+# to its cursor (final results of ended elections still come from the chain).
+VOTING_RESULTS_SOURCE = os.getenv('VOTING_RESULTS_SOURCE', 'tally')
+# Multicall3 used to read all candidate counts in one eth_call. Chains where
+# nothing is deployed there (e.g. Ganache) fall back to a JSON-RPC batch;
+# set it empty to always use the batch.
+MULTICALL3_ADDRESS = os.getenv('MULTICALL3_ADDRESS', '0xcA11bde05977b3631167028862bE2a173976CA11')
+# Live results stream: at most one update per election every interval
+# (seconds), and a keepalive comment when nothing changed for that long.
+LIVE_RESULTS_INTERVAL = float(os.getenv('LIVE_RESULTS_INTERVAL', '1'))
+LIVE_RESULTS_KEEPALIVE = float(os.getenv('LIVE_RESULTS_KEEPALIVE', '15'))
+
+# TTLs (seconds) for main.blockchain.chain_cache. Gas price and balances are
+# also dropped whenever the cached chain head advances. Each process keeps at
+# most CHAIN_CACHE_MAX_ENTRIES keys, evicting the least recently used.
+CHAIN_CACHE_BLOCK_TTL = float(os.getenv('CHAIN_CACHE_BLOCK_TTL', '1'))
+CHAIN_CACHE_GAS_PRICE_TTL = float(os.getenv('CHAIN_CACHE_GAS_PRICE_TTL', '15'))
+CHAIN_CACHE_BALANCE_TTL = float(os.getenv('CHAIN_CACHE_BALANCE_TTL', '10'))
+CHAIN_CACHE_MAX_ENTRIES = int(os.getenv('CHAIN_CACHE_MAX_ENTRIES', '10000'))
+
+# Transaction fees (main.fees). 'auto' sends EIP-1559 fees derived from
+# eth_feeHistory when the node reports a base fee, else a legacy gasPrice;
+# 'legacy' always uses gasPrice. maxFeePerGas is base fee x multiplier + tip.
+FEE_STRATEGY = os.getenv('FEE_STRATEGY', 'auto')
+FEE_HISTORY_BLOCKS = int(os.getenv('FEE_HISTORY_BLOCKS', '10'))
+FEE_PRIORITY_PERCENTILE = float(os.getenv('FEE_PRIORITY_PERCENTILE', '50'))
+FEE_MIN_PRIORITY_FEE_GWEI = float(os.getenv('FEE_MIN_PRIORITY_FEE_GWEI', '1'))
+FEE_BASE_FEE_MULTIPLIER = float(os.getenv('FEE_BASE_FEE_MULTIPLIER', '2'))
+# A transaction still pending after the deadline (seconds, 0 = never) is
+# re-sent at the same nonce with fees raised by FEE_BUMP_PERCENT, at most
+# FEE_MAX_REPLACEMENTS times. Nodes reject bumps below 10%.
+FEE_REPLACEMENT_DEADLINE = float(os.getenv('FEE_REPLACEMENT_DEADLINE', '30'))
+FEE_BUMP_PERCENT = float(os.getenv('FEE_BUMP_PERCENT', '12.5'))
+FEE_MAX_REPLACEMENTS = int(os.getenv('FEE_MAX_REPLACEMENTS', '3'))
 
 REST_KNOX = {
     'TOKEN_TTL': timedelta(hours=10),  # token expiration time
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Check the chain node in the background instead of during worker boot.
+from main.blockchain import start_health_probe  # noqa: E402
+from main.voted_set import warm_voted_sets  # noqa: E402
+
+start_health_probe()
+# Load the running elections' voted sets before the first request.
+warm_voted_sets()
@@ -1,28 +1,144 @@
+import logging
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from web3 import Web3
-from .models import VotingResult, Election, Candidate
-from .blockchain import voting_contract
+from django.db import IntegrityError, transaction
+from django.utils.timezone import now
+from .models import BlockchainTransaction, VotingResult, Election, Candidate, Vote
+from .blockchain import election_contract_address, fetch_winner_and_votes
+from .event_indexer import vote_counts
+from .tally import election_tallies
+from . import async_blockchain
 
-def get_voting_result(election_id):
-    election = Election.objects.get(id=election_id)
-    voting_contract_address = settings.VOTING_CONTRACT_ADDRESS
-    w3 = Web3(Web3.HTTPProvider(settings.WEB3_PROVIDER_URI))
-    contract = w3.eth.contract(address=voting_contract_address, abi=voting_contract.abi)
-
-    # Get the winner of the election from the blockchain
-    winner = contract.functions.getWinner().call()
-
-    # Get the total number of votes from the blockchain
-    # Since there is no getTotalVotes function, we need to iterate over the candidates and sum up their votes
-    total_votes = 0
-    for candidate in election.candidates.all():
-        total_votes += contract.functions.candidateVotes(candidate.id).call()
-
-    # Create a new VotingResult object
-    voting_result = VotingResult.objects.create(
+logger = logging.getLogger(__name__)
+
+# Finalized results never change, so each worker keeps the most recently
+# read ones (least recently used first).
+FINAL_RESULTS_CACHE_SIZE = 1024
+_final_results = OrderedDict()
+
+# Ballots in these states can still fail and be taken off the tally.
+UNSETTLED_STATUSES = (
+    BlockchainTransaction.STATUS_PENDING,
+    BlockchainTransaction.STATUS_SUBMITTED,
+    BlockchainTransaction.STATUS_SENT,
+    BlockchainTransaction.STATUS_COMMITTED,
+)
+
+def _candidate_ids(election):
+    # on-chain candidate ids are Candidate primary keys (see add_candidate_to_chain)
+    return list(Candidate.objects.filter(election=election).order_by('id').values_list('id', flat=True))
+
+def _tally_winner(tallies):
+    # ties go to the lowest candidate id, like the contract's getWinner loop
+    return max(tallies, key=tallies.get) if any(tallies.values()) else None
+
+def _build_result(election, winner, tallies):
+    if winner is None:
+        # getWinner only answers once voting is closed
+        winner = _tally_winner(tallies)
+    # Since there is no getTotalVotes function, we sum up the candidates' votes
+    return VotingResult(
         election=election,
-        winner=Candidate.objects.get(id=winner),
-        total_votes=total_votes
+        winner=Candidate.objects.filter(id=winner).first(),
+        total_votes=sum(tallies.values()),
+        tallies=tallies,
     )
 
-    return voting_result
\ No newline at end of file
+def _remember(election_id, result):
+    _final_results[election_id] = result
+    _final_results.move_to_end(election_id)
+    while len(_final_results) > FINAL_RESULTS_CACHE_SIZE:
+        _final_results.popitem(last=False)
+    return result
+
+def _remembered(election_id):
+    result = _final_results.get(election_id)
+    if result is not None:
+        _final_results.move_to_end(election_id)
+    return result
+
+def has_unsettled_votes(election) -> bool:
+    """Whether any of the election's ballots is not yet mined (or failed) on the chain."""
+    return Vote.objects.filter(election=election, transaction__status__in=UNSETTLED_STATUSES).exists()
+
+def compute_result(election_id, source=None, election=None):
+    """
+    Current standings as an unsaved VotingResult, from `source` or the
+    configured one. Pass `election` when it is already loaded.
+    """
+    source = source or settings.VOTING_RESULTS_SOURCE
+    if election is None:
+        election = Election.objects.get(id=election_id)
+    if source == 'tally':
+        return _build_result(election, None, election_tallies(election))
+
+    candidate_ids = _candidate_ids(election)
+    if source == 'index':
+        counts, indexed_block = vote_counts(election_contract_address(election), candidate_ids)
+        if indexed_block is not None:
+            return _build_result(election, None, {cid: counts.get(cid, 0) for cid in candidate_ids})
+        logger.warning("Election %s's contract is not indexed yet; reading its results from the chain", election_id)
+
+    # one aggregated read instead of one eth_call per candidate
+    winner, candidate_votes = fetch_winner_and_votes(candidate_ids, election)
+    return _build_result(election, winner, dict(zip(candidate_ids, candidate_votes)))
+
+def finalize_result(election_id, election=None):
+    """
+    Freeze the result of an ended election: computed once, stored with a
+    content hash and never recomputed. Safe to call concurrently. Returns
+    None while some of its ballots can still fail (see UNSETTLED_STATUSES).
+    """
+    existing = VotingResult.objects.filter(election_id=election_id, is_final=True).first()
+    if existing is not None:
+        return existing
+
+    if election is None:
+        election = Election.objects.get(id=election_id)
+    if has_unsettled_votes(election):
+        return None
+    # the event index may trail the chain, so it never decides a final result
+    source = 'chain' if settings.VOTING_RESULTS_SOURCE == 'index' else None
+    result = compute_result(election_id, source, election)
+    result.is_final = True
+    result.content_hash = result.compute_hash()
+    try:
+        with transaction.atomic():
+            result.save()
+    except IntegrityError:
+        # another worker finalized it first
+        return VotingResult.objects.get(election_id=election_id, is_final=True)
+    return result
+
+def _voting_result(election):
+    if election.end_date <= now():
+        result = finalize_result(election.id, election)
+        if result is not None:
+            return _remember(election.id, result)
+    return compute_result(election.id, election=election)
+
+def get_voting_result(election_id):
+    """
+    Final snapshot for ended elections; live standings (not stored) for
+    elections still running or whose ballots are still settling.
+    """
+    result = _remembered(election_id)
+    if result is not None:
+        return result
+    return _voting_result(Election.objects.get(id=election_id))
+
+async def aget_voting_result(election_id):
+    """Async get_voting_result: the chain reads are awaited, not blocking a thread."""
+    result = _remembered(election_id)
+    if result is not None:
+        return result
+
+    election = await Election.objects.aget(id=election_id)
+    if election.end_date <= now() or settings.VOTING_RESULTS_SOURCE in ('tally', 'index'):
+        return await sync_to_async(_voting_result)(election)
+
+    candidate_ids = await sync_to_async(_candidate_ids)(election)
+    winner, candidate_votes = await async_blockchain.fetch_winner_and_votes(candidate_ids, election)
+    return await sync_to_async(_build_result)(election, winner, dict(zip(candidate_ids, candidate_votes)))
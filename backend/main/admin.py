@@ -2,4 +2,5 @@ from django.contrib import admin
 from .models import *
 # Register your models here.
 
-admin.site.register(CustomUser)
\ No newline at end of file
+admin.site.register(CustomUser)
+admin.site.register(CircuitBreakerState)
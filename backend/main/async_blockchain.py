@@ -0,0 +1,212 @@
+"""
+AsyncWeb3 counterparts of the operations in `main.blockchain`, for the
+views in `main.async_views`. Waiting on the node here suspends a coroutine
+instead of holding a thread, so one ASGI worker can keep thousands of
+votes in flight. Nonces, the metadata cache and the contract ABI are
+shared with the sync path.
+"""
+import asyncio
+import inspect
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+from .blockchain import (
+    RECEIPT_POLL_INTERVAL, ReceiptWait, _fee_history, cached_contract_address, chain_cache,
+    election_contract_address, fill_gap_below, replaced, replacement_failed, replacement_key, replacement_tx,
+    reserve_nonce, settle_failed_send, signing_key, vote_cost, vote_sent, vote_tx_params, winner_and_votes,
+    with_nonce,
+)
+from .fees import fee_history_params, fee_params
+from .multicall import AggregateRead
+from .rpc_batch import RpcBatch
+from .signer_pool import get_signer_pool, private_key_for
+from .tx_signing import asign_transaction, vote_calldata
+from .web3_provider import get_async_web3, get_contract
+
+logger = logging.getLogger(__name__)
+
+# The nonce bookkeeping is short row-locked updates (plus an RPC call when
+# recovering); off the event loop's sync thread, so concurrent votes don't
+# queue behind each other for it.
+_reserve_nonce = sync_to_async(reserve_nonce, thread_sensitive=False)
+_settle_failed_send = sync_to_async(settle_failed_send, thread_sensitive=False)
+_fill_gap_below = sync_to_async(fill_gap_below, thread_sensitive=False)
+
+
+def get_voting_contract():
+    """Return the shared AsyncContract for the voting contract."""
+    if not settings.CONTRACT_ADDRESS:
+        raise ImproperlyConfigured("VOTING_CONTRACT_ADDRESS is not set")
+    return get_contract(settings.CONTRACT_ADDRESS, w3=get_async_web3())
+
+
+async def get_election_contract(election=None):
+    """AsyncContract for `election`; the address is resolved (or deployed) on the sync side once."""
+    if election is None:
+        return get_voting_contract()
+    address = cached_contract_address(election) or await sync_to_async(election_contract_address)(election)
+    return get_contract(address, w3=get_async_web3())
+
+
+# ——— Cached chain metadata ——————————————————————————
+
+async def get_chain_id() -> int:
+    return await chain_cache.aget('chain_id', lambda: get_async_web3().eth.chain_id)
+
+
+async def get_gas_price() -> int:
+    return await chain_cache.aget(
+        'gas_price', lambda: get_async_web3().eth.gas_price,
+        ttl=settings.CHAIN_CACHE_GAS_PRICE_TTL, per_block=True,
+    )
+
+
+async def get_fee_history() -> dict:
+    async def load():
+        batch = RpcBatch(get_async_web3())
+        batch.request('eth_feeHistory', fee_history_params())
+        return _fee_history((await batch.async_execute())[0])
+
+    return await chain_cache.aget('fee_history', load, ttl=settings.CHAIN_CACHE_GAS_PRICE_TTL, per_block=True)
+
+
+async def get_fee_params() -> dict:
+    """Async `main.blockchain.get_fee_params`."""
+    if settings.FEE_STRATEGY == 'legacy':
+        return fee_params(None, await get_gas_price())
+    history, gas_price = await asyncio.gather(get_fee_history(), get_gas_price())
+    return fee_params(history, gas_price)
+
+
+async def get_balance(address: str) -> int:
+    return await chain_cache.aget(
+        ('balance', address), lambda: get_async_web3().eth.get_balance(address),
+        ttl=settings.CHAIN_CACHE_BALANCE_TTL, per_block=True,
+    )
+
+
+async def estimate_vote_gas(contract, voter_address: str, candidate_id: int) -> int:
+    # not cached, see main.blockchain.prefetch_vote_metadata
+    return await get_async_web3().eth.estimate_gas({
+        'from': voter_address, 'to': contract.address, 'data': vote_calldata(candidate_id),
+    })
+
+
+# ——— Transactions ————————————————————————————————————
+
+async def send_contract_transaction(contract_function, sender: str, tx_params: dict, private_key: str = None):
+    """Async `main.blockchain.send_contract_transaction`; returns the tx hash."""
+    return await send_transaction(contract_function.build_transaction, sender, tx_params, private_key)
+
+
+async def send_transaction(build, sender: str, tx_params: dict, private_key: str = None):
+    """Async `main.blockchain.send_transaction`; `build` may be a coroutine function."""
+    pk = signing_key(private_key)
+    w3 = get_async_web3()
+    sender = Web3.to_checksum_address(sender)
+    for attempt in range(2):
+        nonce = await _reserve_nonce(sender)
+        try:
+            tx = build(with_nonce(tx_params, sender, nonce, await get_chain_id()))
+            if inspect.isawaitable(tx):
+                tx = await tx
+            return await w3.eth.send_raw_transaction(await asign_transaction(tx, pk))
+        except Exception as e:
+            if not await _settle_failed_send(sender, nonce, pk, e, attempt):
+                raise
+
+
+async def replace_transaction(tx_hash):
+    """Async `main.blockchain.replace_transaction`."""
+    w3 = get_async_web3()
+    try:
+        pending = await w3.eth.get_transaction(tx_hash)
+    except TransactionNotFound:
+        return None
+    private_key = replacement_key(pending, tx_hash)
+    if private_key is None:
+        return None
+    await _fill_gap_below(pending, tx_hash, private_key)
+    tx = replacement_tx(pending, await get_chain_id(), await get_fee_params())
+    try:
+        replacement = await w3.eth.send_raw_transaction(await asign_transaction(tx, private_key))
+    except Exception as e:
+        return replacement_failed(tx_hash, e)
+    return replaced(tx_hash, replacement)
+
+
+async def wait_for_receipt(tx_hash, timeout: float = None):
+    """Async `main.blockchain.wait_for_receipt`, replacing stuck transactions the same way."""
+    w3 = get_async_web3()
+    wait = ReceiptWait(tx_hash, timeout)
+    while True:
+        for candidate in wait.hashes:
+            try:
+                return await w3.eth.get_transaction_receipt(candidate)
+            except TransactionNotFound:
+                pass
+        stuck = wait.stuck()
+        if stuck is not None:
+            wait.replaced(await replace_transaction(stuck))
+        await asyncio.sleep(RECEIPT_POLL_INTERVAL)
+
+
+async def add_candidate_to_chain(candidate_id: int, election=None):
+    """Add a candidate to the on‑chain registry of `election`'s contract."""
+    contract = await get_election_contract(election)
+    # no blocking balance refresh on the event loop; the ASGI health probe keeps them fresh
+    with get_signer_pool().acquire(refresh=False) as signer:
+        fees = await get_fee_params()
+        tx_hash = await send_contract_transaction(
+            contract.functions.addCandidate(candidate_id),
+            signer.address,
+            {'gas': 300_000, **fees},
+            signer.private_key,
+        )
+        return await wait_for_receipt(tx_hash)
+
+
+async def send_vote_transaction(voter_address: str, candidate_id: int, election=None):
+    """
+    Async `main.blockchain.send_vote_transaction`. The uncached gas estimate,
+    fees and balance are fetched concurrently rather than batched.
+    """
+    checksum = Web3.to_checksum_address(voter_address)
+    contract = await get_election_contract(election)
+    gas_est, fees, balance = await asyncio.gather(
+        estimate_vote_gas(contract, checksum, candidate_id),
+        get_fee_params(),
+        get_balance(checksum),
+        return_exceptions=True,
+    )
+    total_cost = vote_cost(checksum, gas_est, fees, balance)
+
+    # a custodial voter wallet signs its own ballot; PRIVATE_KEY signs the rest
+    tx_hash = await send_transaction(
+        dict, checksum, vote_tx_params(contract, candidate_id, gas_est, fees), private_key_for(checksum)
+    )
+    vote_sent(checksum, total_cost)
+    return tx_hash
+
+
+async def vote_on_chain(voter_address: str, candidate_id: int, election=None):
+    """Cast a vote and await its receipt without blocking a thread."""
+    tx_hash = await send_vote_transaction(voter_address, candidate_id, election)
+    return await wait_for_receipt(tx_hash)
+
+
+# ——— Reads ———————————————————————————————————————————
+
+async def fetch_winner_and_votes(candidate_ids, election=None):
+    """`getWinner` plus every candidate's `candidateVotes` in a single round trip."""
+    contract = await get_election_contract(election)
+    reads = AggregateRead(get_async_web3(), cache=chain_cache)
+    reads.add(contract.functions.getWinner())
+    for candidate_id in candidate_ids:
+        reads.add(contract.functions.candidateVotes(candidate_id))
+    return winner_and_votes(await reads.async_execute())
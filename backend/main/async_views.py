@@ -0,0 +1,169 @@
+"""
+Async variants of the vote, candidate-registration and results endpoints.
+They only pay off under ASGI (core.asgi served by uvicorn). Under WSGI,
+Django runs them in a thread and the DRF views in main.views remain the
+regular path.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from knox.auth import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from . import async_blockchain
+from .circuit_breaker import ChainUnavailable, achain_guard
+from .idempotency import arun_idempotent
+from .live_results import stream_results
+from .models import Candidate, Election
+from .serializers import CandidateSerializer, VoteReceiptSerializer, VoteSerializer, VotingResultSerializer
+from .vote_batches import commit_vote
+from .voted_set import ahas_voted
+from .vote_queue import enqueue_vote, record_vote
+from .VotingResult import aget_voting_result
+
+
+@sync_to_async
+def _authenticate(request):
+    """Resolve the knox token on `request`; returns the user or None."""
+    try:
+        result = TokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    if result is None:
+        return None
+    request.user = result[0]
+    return result[0]
+
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+
+
+def _unavailable(exc: ChainUnavailable) -> JsonResponse:
+    response = JsonResponse({'detail': str(exc.detail)}, status=exc.status_code)
+    if exc.wait:
+        response['Retry-After'] = str(exc.wait)
+    return response
+
+
+@sync_to_async
+def _validate_vote(request, data):
+    serializer = VoteSerializer(data=data, context={'request': request})
+    if not serializer.is_valid():
+        return None, serializer.errors
+    return serializer.validated_data, None
+
+
+@csrf_exempt
+@require_POST
+async def cast_vote(request):
+    voter = await _authenticate(request)
+    if voter is None:
+        return JsonResponse({'error': 'You must be authenticated to cast a vote'}, status=401)
+
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
+    return await arun_idempotent(request, voter, 'votes', data, lambda: _cast_vote(request, voter, data))
+
+
+async def _cast_vote(request, voter, data):
+    # repeat voters are turned away from the in-memory voted set before validation
+    election_id = str(data.get('election', ''))
+    if election_id.isdigit() and await ahas_voted(voter.id, int(election_id)):
+        return JsonResponse({"detail": "You have already voted in this election."}, status=400)
+    validated, errors = await _validate_vote(request, data)
+    if errors:
+        return JsonResponse(errors, status=400)
+
+    candidate = validated['candidate_id']
+    election = validated['election']
+
+    if settings.VOTE_SUBMISSION_MODE in ('queued', 'batched'):
+        submit = commit_vote if settings.VOTE_SUBMISSION_MODE == 'batched' else enqueue_vote
+        vote = await sync_to_async(submit)(voter, election, candidate)
+        return JsonResponse(VoteReceiptSerializer(vote.transaction).data, status=202)
+
+    try:
+        async with achain_guard():
+            receipt = await async_blockchain.vote_on_chain(voter.wallet_address, int(candidate.id), election)
+    except ChainUnavailable as e:
+        return _unavailable(e)
+    if receipt.status != 1:
+        return JsonResponse({
+            "detail": "The vote was rejected on chain and has not been recorded.",
+            "transaction_hash": receipt.transactionHash.to_0x_hex(),
+        }, status=400)
+    vote = await sync_to_async(record_vote)(voter, election, candidate, receipt)
+    data = await sync_to_async(lambda: VoteSerializer(vote).data)()
+    return JsonResponse(data, status=201)
+
+
+@sync_to_async
+def _save_candidate(request, data):
+    serializer = CandidateSerializer(data=data, context={'request': request})
+    if not serializer.is_valid():
+        return None, serializer.errors, 400
+    if Candidate.objects.filter(user=request.user, election=serializer.validated_data['election']).exists():
+        return None, {'detail': "You have already registered as a candidate for this election."}, 403
+    candidate = serializer.save(user=request.user)
+    return candidate, serializer.data, 201
+
+
+@csrf_exempt
+@require_POST
+async def register_candidate(request):
+    user = await _authenticate(request)
+    if user is None:
+        return JsonResponse({'error': 'You must be authenticated to register as a candidate'}, status=401)
+
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
+    return await arun_idempotent(request, user, 'candidates', data, lambda: _register_candidate(request, data))
+
+
+async def _register_candidate(request, data):
+    try:
+        async with achain_guard():
+            candidate, payload, status = await _save_candidate(request, data)
+            if candidate is None:
+                return JsonResponse(payload, status=status)
+
+            # add candidate to blockchain; a DB transaction can't stay open
+            # across the awaits, so a failed call deletes the row instead
+            try:
+                await async_blockchain.add_candidate_to_chain(candidate.id, candidate.election_id)
+            except BaseException:
+                await candidate.adelete()
+                raise
+    except ChainUnavailable as e:
+        return _unavailable(e)
+    return JsonResponse(payload, status=status)
+
+
+@require_GET
+async def voting_result(request, election_id):
+    try:
+        result = await aget_voting_result(election_id)
+    except Election.DoesNotExist:
+        return JsonResponse({'error': 'Election not found.'}, status=404)
+    return JsonResponse(VotingResultSerializer(result).data)
+
+
+@require_GET
+async def live_results(request, election_id):
+    """Push an election's tallies as server-sent events (ASGI only)."""
+    if not await Election.objects.filter(id=election_id).aexists():
+        return JsonResponse({'error': 'Election not found.'}, status=404)
+    response = StreamingHttpResponse(stream_results(election_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+    return response
@@ -0,0 +1,374 @@
+"""
+End-to-end load benchmark of the vote path (see the benchmark_vote_path
+command).
+
+Requests go straight to the DRF views through APIRequestFactory, so the
+URLconf (and the OCR dependencies of the verification app) are never
+loaded. Every request is timed, and the SQL queries and JSON-RPC traffic
+it caused on its own thread are counted. Queued and batched votes are then
+drained by the vote worker or the anchorer inside the timed window, so the
+report covers the time until every ballot is mined, not just accepted.
+"""
+import contextlib
+import hashlib
+import io
+import subprocess
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from random import Random
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from knox.models import AuthToken
+from rest_framework.test import APIRequestFactory
+from web3 import Web3
+
+from .blockchain import open_voting_on_chain
+from .confirmations import ConfirmationTracker
+from .models import OTP, BlockchainTransaction, Candidate, CustomUser, Election, Party, Vote
+from .vote_batches import run_anchorer
+from .vote_queue import run_worker
+from .views import CandidateViewSet, PhoneOTPLoginAPI, VoteViewSet, VotingResultDetailView
+from .web3_provider import get_web3
+
+BENCHMARK_OTP = '123456'
+
+login_view = PhoneOTPLoginAPI.as_view()
+vote_view = VoteViewSet.as_view({'post': 'create'})
+candidate_view = CandidateViewSet.as_view({'post': 'create'})
+result_view = VotingResultDetailView.as_view()
+
+
+# ——— Instrumentation ——————————————————————————————————
+
+class RpcCounter:
+    """
+    Counts provider round trips and JSON-RPC calls per thread. Installed on
+    the shared sync client before its first request, since web3 binds
+    `make_request` into its middleware chain on first use.
+    """
+
+    def __init__(self, provider):
+        self._local = threading.local()
+        self._make_request = provider.make_request
+        self._make_batch_request = getattr(provider, 'make_batch_request', None)
+        provider.make_request = self._request
+        if self._make_batch_request is not None:
+            provider.make_batch_request = self._batch_request
+
+    def _count(self, methods):
+        counts = getattr(self._local, 'counts', None)
+        if counts is None:
+            counts = self._local.counts = Counter()
+        counts['round_trips'] += 1
+        counts.update(methods)
+
+    def _request(self, method, params):
+        self._count([method])
+        return self._make_request(method, params)
+
+    def _batch_request(self, requests):
+        self._count([method for method, _ in requests])
+        return self._make_batch_request(requests)
+
+    def snapshot(self) -> Counter:
+        return Counter(getattr(self._local, 'counts', None) or {})
+
+
+class StageRecorder:
+    """Per-request samples of every stage, collected from all worker threads."""
+
+    def __init__(self, rpc: RpcCounter):
+        self.rpc = rpc
+        self.samples = defaultdict(list)
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    def call(self, stage: str, view, request, **kwargs):
+        """Run `view` on `request` and record latency, status, queries and RPCs."""
+        rpc_before = self.rpc.snapshot()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            try:
+                response = view(request, **kwargs)
+                response.render()
+                status, error = response.status_code, None
+            except Exception as e:
+                response, status, error = None, 500, type(e).__name__
+            latency = time.perf_counter() - started
+        rpc = self.rpc.snapshot() - rpc_before
+        with self._lock:
+            self.samples[stage].append({
+                'latency': latency, 'status': status, 'error': error,
+                'queries': len(queries), 'rpc': rpc,
+            })
+        return response
+
+    def summary(self) -> dict:
+        return {stage: summarize(samples, self.durations.get(stage)) for stage, samples in self.samples.items()}
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of sorted `values`."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, round(pct / 100 * len(values) + 0.5) - 1))]
+
+
+def summarize(samples: list, duration: float) -> dict:
+    latencies = sorted(s['latency'] * 1000 for s in samples)
+    rpc = sum((s['rpc'] for s in samples), Counter())
+    round_trips = rpc.pop('round_trips', 0)
+    queries = sum(s['queries'] for s in samples)
+    count = len(samples)
+    return {
+        'requests': count,
+        'errors': sum(1 for s in samples if s['status'] >= 400),
+        'status_codes': dict(Counter(str(s['status']) for s in samples)),
+        'exceptions': dict(Counter(s['error'] for s in samples if s['error'])),
+        'duration_s': round(duration, 4) if duration else None,
+        'throughput_rps': round(count / duration, 2) if duration else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / count, 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(latencies[-1], 3),
+        },
+        'sql_queries': {'total': queries, 'per_request': round(queries / count, 2)},
+        'rpc': {
+            'round_trips': round_trips,
+            'calls': sum(rpc.values()),
+            'round_trips_per_request': round(round_trips / count, 2),
+            'methods': dict(rpc.most_common()),
+        },
+    }
+
+
+# ——— Seeding ——————————————————————————————————
+
+def _address(seed: int, label: str) -> str:
+    return Web3.to_checksum_address(hashlib.sha256(f"{seed}:{label}".encode()).digest()[:20])
+
+
+def voter_keys(voters: int, seed: int) -> list:
+    """One throwaway private key per voter, for VOTER_PRIVATE_KEYS."""
+    return ['0x' + hashlib.sha256(f"bench:{seed}:voter{i}".encode()).hexdigest() for i in range(voters)]
+
+
+def seed_election(voters: int, candidates: int, seed: int, contract_address: str = None, voter_wallets: list = None):
+    """
+    Create an open election with `candidates` candidate accounts (one party
+    each) and `voters` voters, each with a pending OTP. Every account shares
+    one password hash. Voter i gets `voter_wallets[i]`, or a random address.
+    """
+    password = make_password(None)
+    election = Election.objects.create(
+        name=f"Benchmark election {seed}",
+        description="Seeded by benchmark_vote_path.",
+        start_date=now() - timedelta(hours=1),
+        end_date=now() + timedelta(days=1),
+        contract_address=contract_address or _address(seed, 'contract'),
+    )
+
+    def users(prefix, role, count, offset, wallets=None):
+        CustomUser.objects.bulk_create([
+            CustomUser(
+                username=f"{prefix}{i}", email=f"{prefix}{i}@bench.invalid", password=password,
+                role=role, voter_id=f"{prefix.upper()}{i:08d}", phone_number=f"{offset + i:010d}",
+                wallet_address=wallets[i] if wallets else _address(seed, f"{prefix}{i}"),
+                is_staff=False, is_verified=True,
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        # bulk_create only fills in primary keys on some databases
+        return list(CustomUser.objects.filter(username__startswith=prefix).order_by('id'))
+
+    candidate_users = users('cand', 'candidate', candidates, 8_000_000_000)
+    Party.objects.bulk_create(
+        [Party(name=f"Benchmark party {seed}-{i}") for i in range(candidates)], batch_size=1000
+    )
+    parties = list(Party.objects.filter(name__startswith=f"Benchmark party {seed}-").order_by('id'))
+    voter_users = users('voter', 'voter', voters, 9_000_000_000, voter_wallets)
+    OTP.objects.bulk_create(
+        [OTP(phone_number=user.phone_number, otp=BENCHMARK_OTP) for user in voter_users], batch_size=1000
+    )
+    return election, list(zip(candidate_users, parties)), voter_users
+
+
+# ——— Driver ——————————————————————————————————
+
+def run_concurrently(items, work, concurrency: int) -> float:
+    """Call `work(item)` for every item on `concurrency` threads; returns the wall time."""
+    items = iter(items)
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    item = next(items, None)
+                if item is None:
+                    return
+                work(item)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, name=f'bench-{i}') for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def drain():
+    """Settle every accepted ballot the way the configured VOTE_SUBMISSION_MODE does in production."""
+    if settings.VOTE_SUBMISSION_MODE == 'queued':
+        run_worker(poll_interval=0.01, once=True, tracker=ConfirmationTracker())
+    elif settings.VOTE_SUBMISSION_MODE == 'batched':
+        run_anchorer(interval=0, poll_interval=0.01, once=True)
+
+
+def vote_outcomes(election) -> dict:
+    """Ballots still standing in `election`, and the benchmark voters' vote transactions by status."""
+    statuses = dict(
+        BlockchainTransaction.objects.filter(sender__role='voter')
+        .values_list('status').annotate(n=Count('id')).order_by()
+    )
+    return {
+        'accepted': Vote.objects.filter(election=election).count(),
+        'mined': sum(statuses.get(s, 0) for s in (BlockchainTransaction.STATUS_MINED,
+                                                  BlockchainTransaction.STATUS_CONFIRMED)),
+        'by_status': statuses,
+    }
+
+
+def run(voters: int, candidates: int, concurrency: int, seed: int,
+        contract_address: str = None, voter_wallets: list = None) -> dict:
+    """
+    Seed an election, register its candidates, run every voter's flow and
+    drain the queue. Returns the report.
+    """
+    factory = APIRequestFactory()
+    recorder = StageRecorder(RpcCounter(get_web3().provider))
+    rng = Random(seed)
+
+    seed_started = time.perf_counter()
+    election, candidate_entries, voter_users = seed_election(
+        voters, candidates, seed, contract_address, voter_wallets
+    )
+    tokens = {user.id: AuthToken.objects.create(user)[1] for user, _ in candidate_entries}
+    seed_duration = time.perf_counter() - seed_started
+
+    # ① candidates register through CandidateViewSet, which adds them on chain
+    def register(entry):
+        user, party = entry
+        request = factory.post('/api/candidates/', {
+            'election': election.id, 'party_id': party.id, 'manifesto': "Benchmark manifesto",
+        }, format='json', HTTP_AUTHORIZATION=f"Token {tokens[user.id]}")
+        recorder.call('register_candidate', candidate_view, request)
+
+    recorder.durations['register_candidate'] = run_concurrently(candidate_entries, register, concurrency)
+    open_voting_on_chain(election)
+    candidate_ids = list(Candidate.objects.filter(election=election).values_list('id', flat=True))
+    if not candidate_ids:
+        raise RuntimeError("No candidate could be registered; see the register_candidate stage")
+    choices = {user.id: rng.choice(candidate_ids) for user in voter_users}
+
+    # ② every voter logs in with their OTP, votes and reads the standings
+    def flow(user):
+        response = recorder.call('login', login_view, factory.post(
+            '/api/auth/phone-login/', {'phone_number': user.phone_number, 'otp': BENCHMARK_OTP}, format='json',
+        ))
+        if response is None or response.status_code != 200:
+            return
+        recorder.call('vote', vote_view, factory.post(
+            '/api/votes/', {'election': election.id, 'candidate_id': choices[user.id]}, format='json',
+            HTTP_AUTHORIZATION=f"Token {response.data['token']}",
+        ))
+        recorder.call('result', result_view, factory.get(f'/api/voting-results/{election.id}/'),
+                      election_id=election.id)
+
+    # PhoneOTPLoginAPI prints every token it issues
+    with contextlib.redirect_stdout(io.StringIO()):
+        flows_duration = run_concurrently(voter_users, flow, concurrency)
+    for stage in ('login', 'vote', 'result'):
+        recorder.durations[stage] = flows_duration
+
+    # ③ the worker or anchorer puts what the vote stage only accepted on chain
+    drain_started = time.perf_counter()
+    drain()
+    drain_duration = time.perf_counter() - drain_started
+    time_to_mined = flows_duration + drain_duration
+    votes = vote_outcomes(election)
+
+    return {
+        'benchmark': 'vote_path',
+        'revision': git_revision(),
+        'created_at': now().isoformat(),
+        'parameters': {'voters': voters, 'candidates': candidates, 'concurrency': concurrency, 'seed': seed},
+        'settings': {
+            name: getattr(settings, name) for name in (
+                'CHAIN_BACKEND', 'CHAIN_SIM_BLOCK_TIME', 'CHAIN_SIM_LATENCY', 'CHAIN_SIM_FAILURE_RATE',
+                'VOTE_SUBMISSION_MODE', 'VOTING_RESULTS_SOURCE', 'SIGNING_PROCESSES', 'CHAIN_MAX_CONCURRENCY',
+            )
+        },
+        'database': connection.vendor,
+        'seed_duration_s': round(seed_duration, 4),
+        'flows': {
+            'count': len(voter_users),
+            'duration_s': round(flows_duration, 4),
+            'throughput_fps': round(len(voter_users) / flows_duration, 2),
+        },
+        # from the first flow until the last accepted ballot was mined (or failed)
+        'mining': {
+            'drain_s': round(drain_duration, 4),
+            'time_to_mined_s': round(time_to_mined, 4),
+            'mined_per_s': round(votes['mined'] / time_to_mined, 2),
+        },
+        'votes': votes,
+        'stages': recorder.summary(),
+    }
+
+
+def git_revision() -> str:
+    """Commit of the checkout being benchmarked, or None outside a git work tree."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(report: dict, baseline: dict) -> list:
+    """`(stage, metric, baseline, current, change)` rows for the headline metrics."""
+    rows = []
+    if 'mining' in report and 'mining' in baseline:
+        for metric in ('time_to_mined_s', 'mined_per_s'):
+            old, new = baseline['mining'][metric], report['mining'][metric]
+            rows.append(('end_to_end', metric, old, new, (new - old) / old if old else None))
+    for stage, current in report['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if not previous:
+            continue
+        for metric, get in (
+            ('throughput_rps', lambda s: s['throughput_rps']),
+            ('p50_ms', lambda s: s['latency_ms']['p50']),
+            ('p95_ms', lambda s: s['latency_ms']['p95']),
+            ('p99_ms', lambda s: s['latency_ms']['p99']),
+            ('queries/req', lambda s: s['sql_queries']['per_request']),
+            ('rpc/req', lambda s: s['rpc']['round_trips_per_request']),
+        ):
+            old, new = get(previous), get(current)
+            change = (new - old) / old if old else None
+            rows.append((stage, metric, old, new, change))
+    return rows
@@ -1,23 +1,115 @@
 import os
-import json
+import logging
+import threading
+import time
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from hexbytes import HexBytes
 from web3 import Web3
+from web3.exceptions import TimeExhausted, TransactionNotFound
+from .models import Candidate, Election, SignerNonce
+from .chain_cache import ChainMetadataCache
+from .fees import bump_fees, fee_history_params, fee_params, max_fee_per_gas
+from .multicall import AggregateRead
+from .signer_pool import configured_keys, get_signer_pool, private_key_for
+from .rpc_batch import RpcBatch, RpcCallError, to_int
+from .tx_signing import sign_transaction, vote_calldata
+from .web3_provider import get_async_web3, get_contract, get_web3, load_abi, load_bytecode
+
+logger = logging.getLogger(__name__)
+
+# Seconds between receipt lookups in wait_for_receipt (web3's own default).
+RECEIPT_POLL_INTERVAL = 0.1
 
 # ——— Initialization —————————————————————————————
+#
+# Nothing here talks to the node or reads the ABI at import time. The client
+# and contract are built on first use, so `manage.py` commands and worker
+# boot don't wait on (or fail without) a reachable chain node.
+
+def get_voting_contract():
+    """Return the shared VotingContract instance, building it on first use."""
+    if not settings.CONTRACT_ADDRESS:
+        raise ImproperlyConfigured("VOTING_CONTRACT_ADDRESS is not set")
+    return get_contract(settings.CONTRACT_ADDRESS)
+
+
+def get_election_contract(election=None):
+    """VotingContract for `election` (instance or id); the shared one when None."""
+    if election is None:
+        return get_voting_contract()
+    return get_contract(election_contract_address(election))
 
-w3 = Web3(Web3.HTTPProvider(settings.WEB3_PROVIDER_URI))
 
-# Load and instantiate contract
-with open(settings.CONTRACT_ABI_PATH) as f:
-    contract_json = json.load(f)
-voting_contract = w3.eth.contract(
-    address=Web3.to_checksum_address(settings.CONTRACT_ADDRESS),
-    abi=contract_json['abi']
+def __getattr__(name):
+    # Keep `from main.blockchain import w3, voting_contract` working lazily.
+    if name == 'w3':
+        return get_web3()
+    if name == 'voting_contract':
+        return get_voting_contract()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Chain constants and fee data, shared by every request in this process.
+chain_cache = ChainMetadataCache(
+    block_number_loader=lambda: get_web3().eth.block_number,
+    async_block_number_loader=lambda: get_async_web3().eth.block_number,
+    block_ttl=settings.CHAIN_CACHE_BLOCK_TTL,
+    max_entries=settings.CHAIN_CACHE_MAX_ENTRIES,
 )
 
 def default_account() -> str:
     """Return the first account from Ganache."""
-    return w3.eth.accounts[0]
+    return chain_cache.get('accounts', lambda: get_web3().eth.accounts)[0]
+
+
+# ——— Health Probe ———————————————————————————————————
+#
+# Run in a background thread from core.wsgi / core.asgi so a worker can
+# start serving immediately and report chain status once the node answers.
+
+chain_health = {'status': 'unknown', 'block_number': None, 'error': '', 'checked_at': None}
+_probe_lock = threading.Lock()
+_probe_thread = None
+
+
+def probe_chain() -> dict:
+    """Check the node once and warm the client, chain id and contract."""
+    try:
+        block_number = get_web3().eth.block_number
+        get_chain_id()
+        if settings.CONTRACT_ADDRESS:
+            get_voting_contract()
+        if configured_keys():
+            get_signer_pool().refresh_balances(get_web3())
+        chain_health.update(status='ok', block_number=block_number, error='')
+    except Exception as e:
+        chain_health.update(status='unavailable', error=str(e))
+    chain_health['checked_at'] = time.time()
+    return dict(chain_health)
+
+
+def _probe_loop(interval: float):
+    while True:
+        probe_chain()
+        time.sleep(interval)
+
+
+def start_health_probe(interval: float = None):
+    """Start the background probe once per process; 0 disables it."""
+    global _probe_thread
+    if interval is None:
+        interval = settings.CHAIN_HEALTH_PROBE_INTERVAL
+    if interval <= 0:
+        return
+    with _probe_lock:
+        if _probe_thread is None:
+            _probe_thread = threading.Thread(
+                target=_probe_loop, args=(interval,), name='chain-health-probe', daemon=True
+            )
+            _probe_thread.start()
 
 
 # ——— Helpers ——————————————————————————————————————
@@ -26,102 +118,582 @@ def get_balance(address: str) -> float:
     """
     Returns the ETH balance of `address` (in Ether).
     """
-    checksum = w3.to_checksum_address(address)
-    balance_wei = w3.eth.get_balance(checksum)
-    return w3.from_wei(balance_wei, 'ether')
+    checksum = Web3.to_checksum_address(address)
+    balance_wei = get_web3().eth.get_balance(checksum)
+    return Web3.from_wei(balance_wei, 'ether')
 
 
-# ——— On‑chain Operations ——————————————————————————
+def get_chain_id() -> int:
+    """The chain id never changes for a running node, so it is cached forever."""
+    return chain_cache.get('chain_id', lambda: get_web3().eth.chain_id)
 
-def add_candidate_to_chain(candidate_id: int):
-    """Add a candidate to the on‑chain registry."""
-    acct = default_account()
-    nonce = w3.eth.get_transaction_count(acct)
-    tx = voting_contract.functions.addCandidate(candidate_id).build_transaction({
-        'from': acct,
-        'nonce': nonce,
-        'chainId': w3.eth.chain_id,
-        'gas': 300_000,
-        'gasPrice': w3.eth.gas_price,
-    })
-
-    pk = os.getenv('PRIVATE_KEY')
-    if not pk:
-        raise RuntimeError("PRIVATE_KEY not set in environment")
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=pk)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-    return w3.eth.wait_for_transaction_receipt(tx_hash)
 
+def get_gas_price() -> int:
+    """Current gas price, reloaded when it expires or a new block arrives."""
+    return chain_cache.get(
+        'gas_price', lambda: get_web3().eth.gas_price,
+        ttl=settings.CHAIN_CACHE_GAS_PRICE_TTL, per_block=True,
+    )
+
+
+def _fee_history(result):
+    # nodes without eth_feeHistory get an empty (cached) history: legacy fees
+    return {} if isinstance(result, RpcCallError) else result
+
+
+def get_fee_params() -> dict:
+    """Fee fields for a new transaction, from the cached fee history and gas price."""
+    if settings.FEE_STRATEGY == 'legacy':
+        return fee_params(None, get_gas_price())
+
+    def load():
+        batch = rpc_batch()
+        batch.request('eth_feeHistory', fee_history_params())
+        return _fee_history(batch.execute()[0])
+
+    history = chain_cache.get('fee_history', load, ttl=settings.CHAIN_CACHE_GAS_PRICE_TTL, per_block=True)
+    return fee_params(history, get_gas_price())
 
-def open_voting_on_chain():
-    """Switch the contract state to open voting."""
-    acct = default_account()
-    nonce = w3.eth.get_transaction_count(acct)
-    tx = voting_contract.functions.openVoting().build_transaction({
-        'from': acct,
-        'nonce': nonce,
-        'chainId': w3.eth.chain_id,
-        'gas': 200_000,
-        'gasPrice': w3.eth.gas_price,
-    })
-
-    pk = os.getenv('PRIVATE_KEY')
-    if not pk:
-        raise RuntimeError("PRIVATE_KEY not set in environment")
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=pk)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-    return w3.eth.wait_for_transaction_receipt(tx_hash)
 
+def rpc_batch() -> RpcBatch:
+    """Start a JSON-RPC batch against the shared Web3 connection."""
+    return RpcBatch(get_web3())
 
-def vote_on_chain(voter_address: str, candidate_id: int):
+
+def prefetch_vote_metadata(voter_address: str, candidate_id: int, contract=None):
     """
-    Cast a vote for `candidate_id` from `voter_address`.
-    Raises if the account balance cannot cover the gas cost.
+    Load the vote gas estimate, plus whichever of gas price, fee history and
+    balance are not cached yet, in a single batched round trip. Returns the
+    values keyed like the cache (the estimate under `'gas_estimate'`);
+    failed lookups come back as exceptions and are not cached.
     """
-    checksum = w3.to_checksum_address(voter_address)
-    # 1) Estimate gas
+    checksum = Web3.to_checksum_address(voter_address)
+    contract = contract or get_voting_contract()
+    specs = {
+        'gas_price': (settings.CHAIN_CACHE_GAS_PRICE_TTL, True),
+        'fee_history': (settings.CHAIN_CACHE_GAS_PRICE_TTL, True),
+        ('balance', checksum): (settings.CHAIN_CACHE_BALANCE_TTL, True),
+    }
+    requests = {
+        'gas_price': ('eth_gasPrice', [], to_int),
+        'fee_history': ('eth_feeHistory', fee_history_params(), None),
+        ('balance', checksum): ('eth_getBalance', [checksum, 'latest'], to_int),
+    }
+    if settings.FEE_STRATEGY == 'legacy':
+        del specs['fee_history'], requests['fee_history']
+    # Never cached: the estimate reverting is what stops a wallet that has
+    # already voted, and each wallet votes once, so it would never be reused.
+    estimate = ('eth_estimateGas', [{
+        'from': checksum,
+        'to': contract.address,
+        'data': HexBytes(vote_calldata(candidate_id)).to_0x_hex(),
+    }], to_int)
+
+    loaded = {}
+
+    def load(missing):
+        batch = rpc_batch()
+        for key in missing:
+            method, params, formatter = requests[key]
+            batch.request(method, params, formatter)
+        batch.request(*estimate)
+        *values, loaded['gas_estimate'] = batch.execute()
+        values = dict(zip(missing, values))
+        if 'fee_history' in values:
+            values['fee_history'] = _fee_history(values['fee_history'])
+        return values
+
+    # a wallet's balance is rarely cached yet, so the estimate usually rides
+    # along in that batch; otherwise it is sent on its own
+    meta = chain_cache.get_many(specs, load)
+    if 'gas_estimate' not in loaded:
+        batch = rpc_batch()
+        batch.request(*estimate)
+        loaded['gas_estimate'], = batch.execute()
+    return {**meta, **loaded}
+
+
+# ——— Contract Registry ——————————————————————————————
+#
+# Each Election can own its VotingContract, so elections keep separate
+# on-chain state and votes for different elections never touch the same
+# storage. Addresses are resolved once per process and the contract
+# objects are cached by address in main.web3_provider.
+
+_election_addresses = {}
+
+
+def cached_contract_address(election):
+    """The already-resolved contract address of `election`, or None."""
+    return _election_addresses.get(getattr(election, 'pk', election))
+
+
+def election_contract_address(election) -> str:
+    """
+    Resolve the contract address of `election` (instance or id). Elections
+    without one use the shared contract, or get a new contract deployed when
+    ELECTION_CONTRACTS is 'per_election'.
+    """
+    election_id = getattr(election, 'pk', election)
+    address = _election_addresses.get(election_id)
+    if address:
+        return address
+
+    address = Election.objects.filter(pk=election_id).values_list('contract_address', flat=True).first()
+    if address is None:
+        raise Election.DoesNotExist(f"Election {election_id} does not exist")
+    if not address:
+        if settings.ELECTION_CONTRACTS == 'per_election':
+            address = deploy_election_contract(election_id)
+        elif settings.CONTRACT_ADDRESS:
+            address = settings.CONTRACT_ADDRESS
+        else:
+            raise ImproperlyConfigured("VOTING_CONTRACT_ADDRESS is not set")
+    address = Web3.to_checksum_address(address)
+    _election_addresses[election_id] = address
+    return address
+
+
+def attach_election_contract(election_id: int, address: str) -> str:
+    """Point `election_id` at an already deployed VotingContract."""
+    address = Web3.to_checksum_address(address)
+    Election.objects.filter(pk=election_id).update(contract_address=address)
+    _election_addresses[election_id] = address
+    return address
+
+
+def deploy_election_contract(election_id: int) -> str:
+    """
+    Deploy a VotingContract for `election_id` and record its address. If
+    another worker records one first, that address wins and ours is left
+    unused.
+    """
+    existing = Election.objects.filter(pk=election_id).values_list('contract_address', flat=True).first()
+    if existing:
+        return existing
+
+    factory = get_web3().eth.contract(
+        abi=load_abi(settings.CONTRACT_ABI_PATH), bytecode=load_bytecode(settings.CONTRACT_ABI_PATH)
+    )
+    receipt = send_pooled_transaction(factory.constructor(), 1_500_000)
+    address = Web3.to_checksum_address(receipt.contractAddress)
+
+    if not Election.objects.filter(pk=election_id, contract_address='').update(contract_address=address):
+        winner = Election.objects.get(pk=election_id).contract_address
+        logger.warning("Election %s already got contract %s; %s is unused", election_id, winner, address)
+        return winner
+    logger.info("Deployed VotingContract %s for election %s", address, election_id)
+    return address
+
+
+# ——— Nonce Management ——————————————————————————————
+#
+# Nonces are handed out from a SignerNonce row instead of asking the node
+# for `get_transaction_count` before every transaction. The row is bumped
+# with a single UPDATE, which takes the row (or, on SQLite, database) write
+# lock first, so gunicorn workers never receive the same nonce. After a
+# failed send the counter is only ever moved forward; a nonce that never
+# reached the node is given back or filled (see recover_nonce).
+
+NONCE_ERRORS = ('nonce too low', 'already known', 'replacement transaction underpriced',
+                'nonce too high', 'invalid nonce', 'incorrect nonce')
+
+# Widest nonce gap fill_nonce_gap fills with transactions; wider ones reset the counter.
+NONCE_GAP_LIMIT = 16
+
+
+def reserve_nonce(address: str) -> int:
+    """Reserve and return the next unused nonce for `address`."""
+    address = Web3.to_checksum_address(address)
+    while True:
+        with transaction.atomic():
+            updated = SignerNonce.objects.filter(address=address).update(
+                next_nonce=F('next_nonce') + 1
+            )
+            if updated:
+                return SignerNonce.objects.get(address=address).next_nonce - 1
+
+        # First transaction from this account: seed the counter from the chain.
+        chain_nonce = get_web3().eth.get_transaction_count(address, 'pending')
+        try:
+            with transaction.atomic():
+                SignerNonce.objects.create(address=address, next_nonce=chain_nonce + 1)
+            return chain_nonce
+        except IntegrityError:
+            # Another worker seeded it first; take the next one from its row.
+            continue
+
+
+def advance_nonce(address: str, chain_nonce: int) -> bool:
+    """
+    Move the local counter of `address` up to `chain_nonce`, never back:
+    nonces reserved by other workers but not yet broadcast are not in the
+    node's count, so lowering the counter would hand them out twice.
+    """
+    return bool(SignerNonce.objects.filter(address=address, next_nonce__lt=chain_nonce).update(next_nonce=chain_nonce))
+
+
+def release_nonce(address: str, nonce: int) -> bool:
+    """Give back an unused `nonce`, if nothing was reserved after it."""
+    return bool(SignerNonce.objects.filter(address=address, next_nonce=nonce + 1).update(next_nonce=nonce))
+
+
+def fill_nonce_gap(address: str, upto: int, private_key: str) -> int:
+    """
+    Use up every nonce below `upto` that the node has not seen with a
+    zero-value transfer to self, so transactions queued behind the gap can
+    be mined. A gap wider than NONCE_GAP_LIMIT means the node lost its state
+    (e.g. a reset dev chain), so the counter is moved back to the chain
+    instead. Returns the number of nonces filled.
+    """
+    w3 = get_web3()
+    chain_nonce = w3.eth.get_transaction_count(address, 'pending')
+    if upto <= chain_nonce:
+        return 0
+    if upto - chain_nonce > NONCE_GAP_LIMIT:
+        logger.error("Node is %s nonces behind %s; resetting its counter to %s",
+                     upto - chain_nonce, address, chain_nonce)
+        SignerNonce.objects.filter(address=address, next_nonce__gt=chain_nonce).update(next_nonce=chain_nonce)
+        return 0
+
+    fees = get_fee_params()
+    for nonce in range(chain_nonce, upto):
+        tx = {'to': address, 'value': 0, 'gas': 21_000, 'nonce': nonce, 'chainId': get_chain_id(), **fees}
+        w3.eth.send_raw_transaction(sign_transaction(tx, private_key))
+        logger.warning("Filled nonce gap of %s at %s", address, nonce)
+    return upto - chain_nonce
+
+
+def recover_nonce(address: str, nonce: int, private_key: str):
+    """
+    Settle the counter after the send at `nonce` failed. A nonce the chain
+    has already used moves the counter forward; an unused one is given
+    back, or filled when later nonces are already out.
+    """
+    chain_nonce = get_web3().eth.get_transaction_count(address, 'pending')
+    if chain_nonce > nonce:
+        advance_nonce(address, chain_nonce)
+    elif not release_nonce(address, nonce):
+        fill_nonce_gap(address, nonce + 1, private_key)
+
+
+def _is_nonce_error(exc: Exception) -> bool:
+    message = str(exc).lower()
+    return any(marker in message for marker in NONCE_ERRORS)
+
+
+def send_contract_transaction(contract_function, sender: str, tx_params: dict, private_key: str = None):
+    """
+    Build, sign and broadcast `contract_function` from `sender` with a
+    locally reserved nonce. Returns the transaction hash without waiting.
+    A rejected nonce triggers one resync-and-retry. Signs with PRIVATE_KEY
+    unless `private_key` is given.
+    """
+    return send_transaction(contract_function.build_transaction, sender, tx_params, private_key)
+
+
+def send_transaction(build, sender: str, tx_params: dict, private_key: str = None):
+    """
+    `send_contract_transaction` for any transaction: `build` turns the
+    params, with sender, nonce and chain id filled in, into the dict to sign.
+    """
+    pk = signing_key(private_key)
+    sender = Web3.to_checksum_address(sender)
+    for attempt in range(2):
+        nonce = reserve_nonce(sender)
+        try:
+            tx = build(with_nonce(tx_params, sender, nonce, get_chain_id()))
+            return get_web3().eth.send_raw_transaction(sign_transaction(tx, pk))
+        except Exception as e:
+            if not settle_failed_send(sender, nonce, pk, e, attempt):
+                raise
+
+
+def replace_transaction(tx_hash):
+    """
+    Re-send a still pending transaction at the same nonce with bumped fees.
+    Returns the new hash, or None when it is no longer pending, its sender's
+    key is not configured or the node refuses the replacement.
+    """
+    w3 = get_web3()
     try:
-        gas_est = voting_contract.functions.vote(candidate_id).estimate_gas({'from': checksum})
+        pending = w3.eth.get_transaction(tx_hash)
+    except TransactionNotFound:
+        return None
+    private_key = replacement_key(pending, tx_hash)
+    if private_key is None:
+        return None
+    fill_gap_below(pending, tx_hash, private_key)
+    tx = replacement_tx(pending, get_chain_id(), get_fee_params())
+    try:
+        replacement = w3.eth.send_raw_transaction(sign_transaction(tx, private_key))
     except Exception as e:
-        raise RuntimeError(f"Gas estimation failed: {e}")
+        return replacement_failed(tx_hash, e)
+    return replaced(tx_hash, replacement)
+
+
+# ——— Transaction building ——————————————————————————————
+#
+# The steps of sending, replacing and waiting on a transaction that don't
+# talk to the node, shared with the AsyncWeb3 versions in main.async_blockchain.
+
+def signing_key(private_key: str = None) -> str:
+    pk = private_key or os.getenv('PRIVATE_KEY')
+    if not pk:
+        raise RuntimeError("PRIVATE_KEY not set in environment")
+    return pk
+
+
+def with_nonce(tx_params: dict, sender: str, nonce: int, chain_id: int) -> dict:
+    return {**tx_params, 'from': sender, 'nonce': nonce, 'chainId': chain_id}
+
+
+def settle_failed_send(sender: str, nonce: int, private_key: str, error: Exception, attempt: int) -> bool:
+    """Settle the nonce of a failed send; returns True when the send should be retried once."""
+    logger.warning("Sending tx from %s with nonce %s failed: %s", sender, nonce, error)
+    try:
+        recover_nonce(sender, nonce, private_key)
+    except Exception as recovery_error:
+        # e.g. the node is down; a stuck later transaction fills the gap (see replace_transaction)
+        logger.warning("Recovering nonce %s of %s failed: %s", nonce, sender, recovery_error)
+    return not attempt and _is_nonce_error(error)
+
+
+def replacement_key(pending, tx_hash):
+    """Key to re-sign the `pending` transaction with, or None when it is mined or the key is not configured."""
+    if pending.get('blockNumber') is not None:
+        return None
+    private_key = private_key_for(pending['from'])
+    if private_key is None:
+        logger.warning("No key for %s; cannot replace %s", pending['from'], HexBytes(tx_hash).to_0x_hex())
+    return private_key
+
+
+def fill_gap_below(pending, tx_hash, private_key: str):
+    # a transaction can also be stuck behind a nonce that never reached the node
+    try:
+        fill_nonce_gap(pending['from'], pending['nonce'], private_key)
+    except Exception as e:
+        logger.warning("Filling the nonce gap below %s failed: %s", HexBytes(tx_hash).to_0x_hex(), e)
+
+
+def replacement_tx(pending, chain_id: int, fees: dict) -> dict:
+    """`pending` again, at the same nonce, with fees bumped over both its own and `fees`."""
+    return {
+        'from': pending['from'],
+        'to': pending['to'],
+        'nonce': pending['nonce'],
+        'gas': pending['gas'],
+        'value': pending['value'],
+        'data': pending['input'],
+        'chainId': chain_id,
+        **bump_fees(pending, fees),
+    }
+
+
+def replacement_failed(tx_hash, error: Exception):
+    # typically the original was mined in the meantime
+    logger.warning("Replacing %s failed: %s", HexBytes(tx_hash).to_0x_hex(), error)
+    return None
+
+
+def replaced(tx_hash, replacement):
+    logger.info("Replaced stuck transaction %s with %s", HexBytes(tx_hash).to_0x_hex(), replacement.to_0x_hex())
+    return replacement
+
+
+class ReceiptWait:
+    """
+    Deadlines of one `wait_for_receipt` call: every hash the transaction
+    has been sent under, the overall timeout and when to replace it next.
+    """
+
+    def __init__(self, tx_hash, timeout: float = None):
+        self.timeout = settings.VOTE_RECEIPT_TIMEOUT if timeout is None else timeout
+        self.hashes = [HexBytes(tx_hash)]
+        self.started = time.monotonic()
+        self.replace_at = self.started + settings.FEE_REPLACEMENT_DEADLINE
+
+    def stuck(self):
+        """Raise TimeExhausted once out of time; else the hash to replace now, if any."""
+        now = time.monotonic()
+        if now - self.started >= self.timeout:
+            raise TimeExhausted(
+                f"Transaction {self.hashes[-1].to_0x_hex()} is not in the chain after {self.timeout} seconds"
+            )
+        if settings.FEE_REPLACEMENT_DEADLINE and now >= self.replace_at and len(self.hashes) <= settings.FEE_MAX_REPLACEMENTS:
+            self.replace_at = now + settings.FEE_REPLACEMENT_DEADLINE
+            return self.hashes[-1]
+        return None
 
-    # 2) Compute total gas cost
-    gas_price = w3.eth.gas_price
-    total_cost = gas_price * gas_est
+    def replaced(self, replacement):
+        if replacement is not None:
+            self.hashes.append(HexBytes(replacement))
 
-    # 3) Balance check
-    balance = w3.eth.get_balance(checksum)
+
+def vote_cost(voter_address: str, gas_est, fees, balance) -> int:
+    """
+    Worst-case cost of a vote. Raises when a lookup came back as an
+    exception or the balance cannot cover the cost.
+    """
+    if isinstance(gas_est, Exception):
+        raise RuntimeError(f"Gas estimation failed: {gas_est}")
+    for value in (fees, balance):
+        if isinstance(value, Exception):
+            raise value
+    total_cost = max_fee_per_gas(fees) * gas_est
     if balance < total_cost:
+        chain_cache.invalidate(('balance', voter_address))
         raise RuntimeError(
             f"Insufficient funds: balance={balance} wei, needed={total_cost} wei"
         )
+    return total_cost
 
-    # 4) Build & sign
-    nonce = w3.eth.get_transaction_count(checksum)
-    tx = voting_contract.functions.vote(candidate_id).build_transaction({
-        'from': checksum,
-        'nonce': nonce,
-        'chainId': w3.eth.chain_id,
+
+def vote_tx_params(contract, candidate_id: int, gas_est: int, fees: dict) -> dict:
+    """The vote call, with the calldata encoded once per candidate."""
+    return {
+        'to': contract.address,
+        'value': 0,
+        'data': vote_calldata(candidate_id),
         'gas': gas_est,
-        'gasPrice': gas_price,
-    })
+        **fees,
+    }
 
-    pk = os.getenv('PRIVATE_KEY')
-    if not pk:
-        raise RuntimeError("PRIVATE_KEY not set in environment")
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=pk)
 
-    # 5) Send & wait
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-    return w3.eth.wait_for_transaction_receipt(tx_hash)
+def vote_sent(voter_address: str, total_cost: int):
+    # Charge the worst-case cost against the cached balance so back-to-back
+    # votes within one block are still checked against what is left.
+    chain_cache.update(('balance', voter_address), lambda b: b - total_cost)
+
+
+def send_pooled_transaction(contract_function, gas: int):
+    """
+    Send an administrative transaction from the signer pool and wait for
+    its receipt. The account counts as busy until then; fees are read once
+    it is held, so a wait for a free signer doesn't leave them stale.
+    """
+    with get_signer_pool().acquire() as signer:
+        tx_params = {'gas': gas, **get_fee_params()}
+        tx_hash = send_contract_transaction(contract_function, signer.address, tx_params, signer.private_key)
+        return wait_for_receipt(tx_hash)
+
+
+# ——— On‑chain Operations ——————————————————————————
+
+def add_candidate_to_chain(candidate_id: int, election=None):
+    """Add a candidate to the on‑chain registry of `election`'s contract."""
+    return send_pooled_transaction(get_election_contract(election).functions.addCandidate(candidate_id), 300_000)
+
+
+def open_voting_on_chain(election=None):
+    """Switch the contract state to open voting."""
+    return send_pooled_transaction(get_election_contract(election).functions.openVoting(), 200_000)
+
+
+def send_vote_transaction(voter_address: str, candidate_id: int, election=None):
+    """
+    Sign and broadcast a vote for `candidate_id` from `voter_address`
+    to `election`'s contract without waiting for it to be mined. Returns
+    the transaction hash. Raises if the balance cannot cover the gas cost.
+    """
+    checksum = Web3.to_checksum_address(voter_address)
+    contract = get_election_contract(election)
+    meta = prefetch_vote_metadata(checksum, candidate_id, contract)
+    # 1) Check the balance against the worst-case gas cost
+    gas_est = meta['gas_estimate']
+    fees = meta['gas_price']
+    if not isinstance(fees, Exception):
+        history = meta.get('fee_history')
+        fees = fee_params(None if isinstance(history, Exception) else history, fees)
+    total_cost = vote_cost(checksum, gas_est, fees, meta[('balance', checksum)])
+
+    # 2) Build, sign & send; a custodial voter wallet signs its own ballot,
+    # PRIVATE_KEY signs the rest
+    tx_hash = send_transaction(
+        dict, checksum, vote_tx_params(contract, candidate_id, gas_est, fees), private_key_for(checksum)
+    )
+    vote_sent(checksum, total_cost)
+    return tx_hash
+
+
+def anchor_merkle_root(root: bytes, on_sent=None):
+    """
+    Publish a vote batch's Merkle root as the data of a zero-value
+    transaction from a pool account to itself. `on_sent(tx_hash)` is called
+    once it is broadcast, before waiting. Returns the receipt.
+    """
+    with get_signer_pool().acquire() as signer:
+        tx_hash = send_transaction(dict, signer.address, {
+            'to': Web3.to_checksum_address(signer.address),
+            'value': 0,
+            'data': Web3.to_hex(root),
+            'gas': 30_000,
+            **get_fee_params(),
+        }, signer.private_key)
+        if on_sent is not None:
+            on_sent(tx_hash)
+        return wait_for_receipt(tx_hash)
+
+
+def vote_on_chain(voter_address: str, candidate_id: int, election=None):
+    """
+    Cast a vote for `candidate_id` from `voter_address` and block until
+    the transaction is mined.
+    """
+    tx_hash = send_vote_transaction(voter_address, candidate_id, election)
+    return wait_for_receipt(tx_hash)
+
+
+def wait_for_receipt(tx_hash, timeout: float = None):
+    """
+    Block until `tx_hash` is mined and return its receipt. A transaction
+    still pending after FEE_REPLACEMENT_DEADLINE seconds is replaced with
+    bumped fees (at most FEE_MAX_REPLACEMENTS times); the receipt of
+    whichever version is mined is returned.
+    """
+    w3 = get_web3()
+    wait = ReceiptWait(tx_hash, timeout)
+    while True:
+        for candidate in wait.hashes:
+            try:
+                return w3.eth.get_transaction_receipt(candidate)
+            except TransactionNotFound:
+                pass
+        stuck = wait.stuck()
+        if stuck is not None:
+            wait.replaced(replace_transaction(stuck))
+        time.sleep(RECEIPT_POLL_INTERVAL)
 
 
 def get_winner(election_id):
-    # Call the getWinner function on the blockchain
-    winner = voting_contract.functions.getWinner().call()
+    # Call the getWinner function on the election's contract
+    winner = get_election_contract(election_id).functions.getWinner().call()
     return winner
 
 def get_total_votes(election_id):
-    # Call the getTotalVotes function on the blockchain
-    total_votes = voting_contract.functions.getTotalVotes().call()
-    return total_votes
\ No newline at end of file
+    # The contract has no getTotalVotes, so add up the election's candidates
+    candidate_ids = Candidate.objects.filter(election_id=election_id).values_list('id', flat=True)
+    _, candidate_votes = fetch_winner_and_votes(list(candidate_ids), election_id)
+    return sum(candidate_votes)
+
+
+# ——— Aggregated reads ——————————————————————————————————
+
+def winner_and_votes(results):
+    """Split `[getWinner, candidateVotes...]` read results; winner is None while voting is open."""
+    winner, *candidate_votes = results
+    for votes in candidate_votes:
+        if isinstance(votes, RpcCallError):
+            raise votes
+    # getWinner reverts with "Voting is still open" until closeVoting
+    return (None if isinstance(winner, RpcCallError) else winner), candidate_votes
+
+def fetch_winner_and_votes(candidate_ids, election=None):
+    """`getWinner` plus every candidate's `candidateVotes` in a single round trip."""
+    contract = get_election_contract(election)
+    reads = AggregateRead(get_web3(), cache=chain_cache)
+    reads.add(contract.functions.getWinner())
+    for candidate_id in candidate_ids:
+        reads.add(contract.functions.candidateVotes(candidate_id))
+    return winner_and_votes(reads.execute())
\ No newline at end of file
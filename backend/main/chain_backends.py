@@ -0,0 +1,200 @@
+"""
+Chain backends, chosen with CHAIN_BACKEND. A backend builds the providers
+behind `main.web3_provider.get_web3` and `get_async_web3`, so the rest of
+the app is the same whichever one is in use:
+
+- 'rpc': JSON-RPC over HTTP to WEB3_PROVIDER_URI, with failover across
+  WEB3_PROVIDER_URIS.
+- 'tester': an in-process EVM (eth-tester on py-evm) running the real
+  VotingContract bytecode. Needs `eth-tester[py-evm]`.
+- 'simulator': `main.chain_sim`, a deterministic model of the contract
+  with configurable block time and failure injection.
+
+The last two need no node, so the Django side can be benchmarked offline.
+"""
+import itertools
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from eth_account import Account
+from web3 import AsyncWeb3
+from web3.providers.async_base import AsyncBaseProvider
+# imports eth_tester itself only when a provider is built
+from web3.providers.eth_tester import EthereumTesterProvider
+
+from .chain_sim import AsyncSimulatedProvider, SimulatedProvider, get_simulated_chain
+from .web3_failover import AsyncFailoverHTTPProvider, FailoverHTTPProvider
+
+logger = logging.getLogger(__name__)
+
+
+class ChainBackend:
+    name = None
+
+    def provider(self, endpoint_uri: str):
+        raise NotImplementedError
+
+    def async_provider(self, endpoint_uri: str, timeout):
+        raise NotImplementedError
+
+
+class RpcBackend(ChainBackend):
+    name = 'rpc'
+
+    def _failover_uris(self, endpoint_uri: str) -> list:
+        """Every configured node when `endpoint_uri` is the default one and extras are set."""
+        if endpoint_uri != settings.WEB3_PROVIDER_URI or not settings.WEB3_PROVIDER_URIS:
+            return None
+        return list(dict.fromkeys([endpoint_uri, *settings.WEB3_PROVIDER_URIS]))
+
+    def provider(self, endpoint_uri: str):
+        from .web3_provider import PooledHTTPProvider
+
+        uris = self._failover_uris(endpoint_uri)
+        return FailoverHTTPProvider(uris) if uris else PooledHTTPProvider(endpoint_uri)
+
+    def async_provider(self, endpoint_uri: str, timeout):
+        uris = self._failover_uris(endpoint_uri)
+        if uris:
+            return AsyncFailoverHTTPProvider(uris, request_kwargs={'timeout': timeout})
+        return AsyncWeb3.AsyncHTTPProvider(endpoint_uri, request_kwargs={'timeout': timeout})
+
+
+class SimulatorBackend(ChainBackend):
+    name = 'simulator'
+
+    def provider(self, endpoint_uri: str):
+        return SimulatedProvider(get_simulated_chain())
+
+    def async_provider(self, endpoint_uri: str, timeout):
+        return AsyncSimulatedProvider(get_simulated_chain())
+
+
+# ——— eth-tester ——————————————————————————————————
+
+# Requests web3's tester middleware fills a default 'from' into.
+_FROM_DEFAULT_METHODS = ('eth_call', 'eth_estimateGas', 'eth_sendTransaction', 'eth_createAccessList')
+
+
+class TesterBackend(ChainBackend):
+    """
+    One in-process EVM shared by the sync and async clients. On start it
+    deploys VotingContract from the first test account, so the address is
+    the same on every run; it then funds PRIVATE_KEY, SIGNER_PRIVATE_KEYS
+    and VOTER_PRIVATE_KEYS from the prefunded test accounts.
+    """
+    name = 'tester'
+    FUNDING = 10 ** 21  # 1000 ether per configured key
+
+    def __init__(self):
+        from eth_tester import EthereumTester
+        from web3.providers.eth_tester.defaults import API_ENDPOINTS
+        from web3.providers.eth_tester.middleware import request_formatters, result_formatters
+
+        self.tester = EthereumTester()
+        self.api_endpoints = API_ENDPOINTS
+        self.request_formatters = request_formatters
+        self.result_formatters = result_formatters
+        self._ids = itertools.count()
+        # py-evm is not thread-safe
+        self._lock = threading.Lock()
+        self.contract_address = self._deploy()
+        self._fund()
+
+    def _deploy(self) -> str:
+        from .web3_provider import load_bytecode
+
+        owner = self.tester.get_accounts()[0]
+        tx_hash = self.tester.send_transaction({
+            'from': owner, 'data': load_bytecode(settings.CONTRACT_ABI_PATH), 'gas': 3_000_000,
+        })
+        address = self.tester.get_transaction_receipt(tx_hash)['contract_address']
+        logger.info("eth-tester: VotingContract deployed at %s", address)
+        return address
+
+    def _fund(self):
+        from .signer_pool import configured_keys, voter_keys
+
+        owner = self.tester.get_accounts()[0]
+        for key in {*configured_keys(), *voter_keys().values(), os.getenv('PRIVATE_KEY')} - {None, ''}:
+            self.tester.send_transaction({
+                'from': owner, 'to': Account.from_key(key).address, 'value': self.FUNDING, 'gas': 21_000,
+            })
+
+    def request(self, method: str, params) -> dict:
+        """
+        One JSON-RPC request against the EVM. web3 normally formats these in
+        middleware, which raw RpcBatch requests skip, so it happens here.
+        """
+        from web3.providers.eth_tester.main import _make_request
+
+        params = list(params or [])
+        if method in _FROM_DEFAULT_METHODS and params and not params[0].get('from'):
+            params[0] = {**params[0], 'from': self.tester.get_accounts()[0]}
+        if method in self.request_formatters:
+            params = self.request_formatters[method](params)
+        with self._lock:
+            response = _make_request(method, params, self.api_endpoints, self.tester, repr(next(self._ids)))
+        if 'result' in response and method in self.result_formatters:
+            response = {**response, 'result': self.result_formatters[method](response['result'])}
+        return response
+
+    def provider(self, endpoint_uri: str):
+        return TesterProvider(self)
+
+    def async_provider(self, endpoint_uri: str, timeout):
+        return AsyncTesterProvider(self)
+
+
+class TesterProvider(EthereumTesterProvider):
+    _middleware = ()  # formatting happens in TesterBackend.request
+
+    def __init__(self, backend: TesterBackend):
+        super().__init__(backend.tester)
+        self.backend = backend
+
+    def make_request(self, method, params):
+        return self.backend.request(method, params)
+
+    def make_batch_request(self, requests):
+        return [self.backend.request(method, params) for method, params in requests]
+
+
+class AsyncTesterProvider(AsyncBaseProvider):
+    def __init__(self, backend: TesterBackend):
+        super().__init__()
+        self.backend = backend
+
+    async def make_request(self, method, params):
+        return self.backend.request(method, params)
+
+    async def make_batch_request(self, requests):
+        return [self.backend.request(method, params) for method, params in requests]
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        return True
+
+
+# ——— Selection ——————————————————————————————————
+
+BACKENDS = {backend.name: backend for backend in (RpcBackend, TesterBackend, SimulatorBackend)}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_chain_backend() -> ChainBackend:
+    """The process-wide backend named by CHAIN_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if settings.CHAIN_BACKEND not in BACKENDS:
+                    raise ImproperlyConfigured(
+                        f"CHAIN_BACKEND must be one of {', '.join(BACKENDS)}, not {settings.CHAIN_BACKEND!r}"
+                    )
+                _backend = BACKENDS[settings.CHAIN_BACKEND]()
+    return _backend
@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+
+class ChainMetadataCache:
+    """
+    Process-local cache for chain metadata such as the chain id, gas price
+    and gas estimates.
+
+    Every entry has its own TTL (None means it never expires). Entries
+    stored with `per_block=True` are also dropped as soon as the chain head
+    moves past the block they were loaded in. The head itself is cached for
+    `block_ttl` seconds, so block-scoped keys cost at most one
+    `eth_blockNumber` per interval instead of one RPC per lookup.
+
+    At most `max_entries` keys are kept: stale entries are dropped when
+    they are read, and the least recently used ones make room for new keys.
+    """
+
+    BLOCK_NUMBER_KEY = 'block_number'
+
+    def __init__(self, block_number_loader=None, block_ttl: float = 1.0, clock=time.monotonic,
+                 async_block_number_loader=None, max_entries: int = 10_000):
+        self._block_number_loader = block_number_loader
+        self._async_block_number_loader = async_block_number_loader
+        self._block_ttl = block_ttl
+        self._clock = clock
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = defaultdict(int)
+        self._misses = defaultdict(int)
+
+    def _label(self, key):
+        # counters are grouped per kind of key, e.g. ('balance', '0x…') -> 'balance'
+        return key[0] if isinstance(key, tuple) else key
+
+    def _lookup(self, key, block_number):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at, loaded_block = entry
+        if (expires_at is not None and self._clock() >= expires_at) or (
+            loaded_block is not None and block_number is not None and loaded_block != block_number
+        ):
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def current_block(self):
+        """Return the chain head, refreshed at most once per `block_ttl`."""
+        if self._block_number_loader is None:
+            return None
+        return self.get(self.BLOCK_NUMBER_KEY, self._block_number_loader, ttl=self._block_ttl)
+
+    def _count(self, key, block_number):
+        label = self._label(key)
+        with self._lock:
+            found, value = self._lookup(key, block_number)
+            if found:
+                self._hits[label] += 1
+            else:
+                self._misses[label] += 1
+            return found, value
+
+    def get(self, key, loader, ttl: float = None, per_block: bool = False):
+        """Return the cached value for `key`, calling `loader()` on a miss."""
+        block_number = self.current_block() if per_block else None
+        found, value = self._count(key, block_number)
+        if found:
+            return value
+
+        value = loader()
+        self.set(key, value, ttl=ttl, block_number=block_number)
+        return value
+
+    async def acurrent_block(self):
+        if self._async_block_number_loader is None:
+            return None
+        return await self.aget(self.BLOCK_NUMBER_KEY, self._async_block_number_loader, ttl=self._block_ttl)
+
+    async def aget(self, key, loader, ttl: float = None, per_block: bool = False):
+        """Async `get`: `loader()` returns an awaitable. Entries are shared with `get`."""
+        block_number = await self.acurrent_block() if per_block else None
+        found, value = self._count(key, block_number)
+        if found:
+            return value
+
+        value = await loader()
+        self.set(key, value, ttl=ttl, block_number=block_number)
+        return value
+
+    def get_many(self, specs: dict, loader) -> dict:
+        """
+        Resolve several keys at once. `specs` maps key -> (ttl, per_block);
+        `loader(missing_keys)` must return a dict of the missing values, so
+        all misses can be fetched together (e.g. in one RPC batch). Values
+        that are exceptions are returned but not cached.
+        """
+        block_number = self.current_block() if any(pb for _, pb in specs.values()) else None
+        results, missing = {}, []
+        with self._lock:
+            for key, (ttl, per_block) in specs.items():
+                found, value = self._lookup(key, block_number if per_block else None)
+                if found:
+                    self._hits[self._label(key)] += 1
+                    results[key] = value
+                else:
+                    self._misses[self._label(key)] += 1
+                    missing.append(key)
+
+        if missing:
+            loaded = loader(missing)
+            for key in missing:
+                value = loaded[key]
+                results[key] = value
+                if not isinstance(value, Exception):
+                    ttl, per_block = specs[key]
+                    self.set(key, value, ttl=ttl, block_number=block_number if per_block else None)
+        return results
+
+    def set(self, key, value, ttl: float = None, block_number=None):
+        expires_at = self._clock() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at, block_number)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def update(self, key, fn):
+        """Replace a cached value with `fn(value)`, keeping its expiry. No-op on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, loaded_block = entry
+                self._entries[key] = (fn(value), expires_at, loaded_block)
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when `key` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            labels = sorted(set(self._hits) | set(self._misses))
+            return {
+                'entries': len(self._entries),
+                'hits': sum(self._hits.values()),
+                'misses': sum(self._misses.values()),
+                'keys': {
+                    label: {'hits': self._hits[label], 'misses': self._misses[label]}
+                    for label in labels
+                },
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits.clear()
+            self._misses.clear()
@@ -0,0 +1,580 @@
+"""
+Deterministic in-process chain for load tests (CHAIN_BACKEND='simulator').
+
+SimulatedChain answers the JSON-RPC methods this app uses and models
+VotingContract in Python:
+
+- Every account starts funded.
+- Nonces, fee and replacement rules behave like a node's.
+- Contracts are created on deploy, or on the first VotingContract call
+  to an address. VOTING_CONTRACT_ADDRESS can therefore be any address.
+- Reverts carry Solidity's reason strings.
+
+A block is mined every CHAIN_SIM_BLOCK_TIME seconds, or right after each
+transaction when that setting is 0. Each call can be slowed by
+CHAIN_SIM_LATENCY seconds. CHAIN_SIM_FAILURE_RATE of calls fail as if the
+connection dropped; the failures are drawn from CHAIN_SIM_SEED, so a run
+can be repeated.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import defaultdict
+
+import rlp
+from django.conf import settings
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_account._utils.legacy_transactions import Transaction
+from eth_account.typed_transactions import TypedTransaction
+from eth_utils import function_signature_to_4byte_selector, keccak, to_checksum_address
+from hexbytes import HexBytes
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.providers.base import JSONBaseProvider
+
+from .rpc_batch import to_int
+
+CHAIN_ID = 1337
+GENESIS_TIMESTAMP = 1_700_000_000
+BASE_FEE = 10 ** 9
+PRIORITY_FEE = 10 ** 9
+INITIAL_BALANCE = 10 ** 24
+BLOCK_GAS_LIMIT = 30_000_000
+# Gas charged per call; estimates return the same figures.
+TRANSFER_GAS = 21_000
+CALL_GAS = {'vote': 75_000, 'addCandidate': 70_000, 'openVoting': 45_000, 'closeVoting': 30_000}
+DEPLOY_GAS = 500_000
+DEV_ACCOUNT = to_checksum_address(keccak(text='simulator')[12:])
+# Stand-in runtime code reported by eth_getCode for simulated contracts.
+CONTRACT_CODE = '0x6080604052'
+
+SELECTORS = {
+    function_signature_to_4byte_selector(signature): name
+    for signature, name in [
+        ('vote(uint256)', 'vote'),
+        ('addCandidate(uint256)', 'addCandidate'),
+        ('openVoting()', 'openVoting'),
+        ('closeVoting()', 'closeVoting'),
+        ('candidateVotes(uint256)', 'candidateVotes'),
+        ('candidates(uint256)', 'candidates'),
+        ('votes(address)', 'votes'),
+        ('votingOpen()', 'votingOpen'),
+        ('getWinner()', 'getWinner'),
+    ]
+}
+VOTE_CAST_TOPIC = keccak(text='VoteCast(address,uint256)')
+STATUS_CHANGED_TOPIC = keccak(text='VotingStatusChanged(bool)')
+ERROR_SELECTOR = function_signature_to_4byte_selector('Error(string)')
+
+
+class RpcError(Exception):
+    """A JSON-RPC error answer, as opposed to a failed connection."""
+
+    def __init__(self, message: str, code: int = -32000, data: str = None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+
+    def as_dict(self) -> dict:
+        error = {'code': self.code, 'message': str(self)}
+        if self.data:
+            error['data'] = self.data
+        return error
+
+
+class Revert(RpcError):
+    def __init__(self, reason: str):
+        data = HexBytes(ERROR_SELECTOR + encode(['string'], [reason])).to_0x_hex()
+        super().__init__(f"execution reverted: {reason}", code=3, data=data)
+
+
+def _hex(value) -> str:
+    return hex(value) if isinstance(value, int) else HexBytes(value).to_0x_hex()
+
+
+class VotingState:
+    """Storage of one simulated VotingContract, with its functions."""
+
+    def __init__(self):
+        self.votes = {}
+        self.candidate_votes = defaultdict(int)
+        self.candidates = []
+        self.voting_open = False
+
+    def transact(self, name: str, args: tuple, sender: str, dry_run: bool = False) -> list:
+        """Run a state-changing function; returns its logs as (topic, data) pairs."""
+        if name == 'vote':
+            (candidate,) = args
+            if not self.voting_open:
+                raise Revert("Voting is not open")
+            if self.votes.get(sender):
+                raise Revert("Voter has already voted")
+            if not dry_run:
+                self.candidate_votes[candidate] += 1
+                self.votes[sender] = candidate
+            return [(VOTE_CAST_TOPIC, encode(['address', 'uint256'], [sender, candidate]))]
+        if name == 'addCandidate':
+            if self.voting_open:
+                raise Revert("Voting is already open")
+            if not dry_run:
+                self.candidates.append(args[0])
+            return []
+        if name in ('openVoting', 'closeVoting'):
+            opening = name == 'openVoting'
+            if self.voting_open == opening:
+                raise Revert("Voting is already open" if opening else "Voting is already closed")
+            if not dry_run:
+                self.voting_open = opening
+            return [(STATUS_CHANGED_TOPIC, encode(['bool'], [opening]))]
+        raise Revert("")
+
+    def view(self, name: str, args: tuple) -> bytes:
+        if name == 'candidateVotes':
+            return encode(['uint256'], [self.candidate_votes[args[0]]])
+        if name == 'candidates':
+            if args[0] >= len(self.candidates):
+                raise Revert("")
+            return encode(['uint256'], [self.candidates[args[0]]])
+        if name == 'votes':
+            return encode(['uint256'], [self.votes.get(to_checksum_address(args[0]), 0)])
+        if name == 'votingOpen':
+            return encode(['bool'], [self.voting_open])
+        if name == 'getWinner':
+            if self.voting_open:
+                raise Revert("Voting is still open")
+            winner, most = 0, 0
+            for candidate in self.candidates:
+                if self.candidate_votes[candidate] > most:
+                    winner, most = candidate, self.candidate_votes[candidate]
+            return encode(['uint256'], [winner])
+        raise Revert("")
+
+
+INPUT_TYPES = {
+    'vote': ['uint256'], 'addCandidate': ['uint256'], 'candidateVotes': ['uint256'],
+    'candidates': ['uint256'], 'votes': ['address'],
+}
+
+
+def _decode_call(data: bytes):
+    """`(function name, args)` for VotingContract calldata, or None for anything else."""
+    name = SELECTORS.get(bytes(data[:4]))
+    if name is None:
+        return None
+    return name, decode(INPUT_TYPES.get(name, []), bytes(data[4:]))
+
+
+def decode_raw_transaction(raw: bytes) -> dict:
+    """Fields of a signed transaction, plus its sender and hash."""
+    raw = HexBytes(raw)
+    if raw[0] <= 0x7f:
+        fields = TypedTransaction.from_bytes(raw).as_dict()
+    else:
+        fields = rlp.decode(bytes(raw), Transaction).as_dict()
+        v = fields['v']
+        fields['chainId'] = (v - 35) // 2 if v >= 35 else None
+    fields['from'] = Account.recover_transaction(raw)
+    fields['hash'] = HexBytes(keccak(raw))
+    fields['to'] = to_checksum_address(fields['to']) if fields.get('to') else None
+    return fields
+
+
+class SimulatedChain:
+    """One chain per process; every method is serialised on a lock."""
+
+    def __init__(self, block_time: float = 0):
+        self.block_time = block_time
+        self._lock = threading.RLock()
+        self._started = time.monotonic()
+        self.blocks = []
+        self.pending = []
+        self.transactions = {}
+        self.receipts = {}
+        self.logs = []
+        self.nonces = defaultdict(int)
+        self.spent = defaultdict(int)
+        self.contracts = {}
+        self._mine()  # genesis
+
+    # ——— Blocks ———
+
+    def _mine(self):
+        number = len(self.blocks)
+        parent = self.blocks[-1]['hash'] if self.blocks else HexBytes(bytes(32))
+        included, gas_used = [], 0
+        progress = True
+        # take every transaction whose nonce is next in line, in arrival order
+        while progress:
+            progress = False
+            for tx in list(self.pending):
+                if tx['nonce'] == self.nonces[tx['from']] and gas_used + tx['gas'] <= BLOCK_GAS_LIMIT:
+                    self.pending.remove(tx)
+                    included.append(tx)
+                    self.nonces[tx['from']] += 1
+                    gas_used += tx['gas']
+                    progress = True
+
+        block_hash = HexBytes(keccak(number.to_bytes(32, 'big') + parent + b''.join(tx['hash'] for tx in included)))
+        block = {
+            'number': number,
+            'hash': block_hash,
+            'parentHash': parent,
+            'timestamp': GENESIS_TIMESTAMP + int(number * max(self.block_time, 1)),
+            'transactions': [tx['hash'] for tx in included],
+            'gasUsed': 0,
+        }
+        self.blocks.append(block)
+        for index, tx in enumerate(included):
+            block['gasUsed'] += self._execute(tx, block, index, block['gasUsed'])
+
+    def _catch_up(self):
+        if self.block_time <= 0:
+            return
+        due = int((time.monotonic() - self._started) / self.block_time)
+        while len(self.blocks) - 1 < due:
+            self._mine()
+
+    def _block(self, tag):
+        if tag in ('latest', 'pending', 'safe', 'finalized', None):
+            return self.blocks[-1]
+        if tag == 'earliest':
+            return self.blocks[0]
+        number = to_int(tag)
+        return self.blocks[number] if 0 <= number < len(self.blocks) else None
+
+    # ——— Execution ———
+
+    def _contract_address(self, sender: str, nonce: int) -> str:
+        return to_checksum_address(keccak(rlp.encode([HexBytes(sender), nonce]))[12:])
+
+    def _run(self, tx: dict, dry_run: bool):
+        """Apply `tx`; returns (gas used, logs, created contract address)."""
+        if not tx.get('to'):
+            address = self._contract_address(tx['from'], tx['nonce'])
+            if not dry_run:
+                self.contracts[address] = VotingState()
+            return DEPLOY_GAS, [], address
+        call = _decode_call(tx.get('data') or b'')
+        if call is None:
+            return TRANSFER_GAS, [], None
+        name, args = call
+        if name not in CALL_GAS:
+            return TRANSFER_GAS, [], None
+        state = self.contracts.get(tx['to']) or VotingState()
+        logs = state.transact(name, args, tx['from'], dry_run)
+        if not dry_run:
+            self.contracts.setdefault(tx['to'], state)
+        return CALL_GAS[name], logs, None
+
+    def _execute(self, tx: dict, block: dict, index: int, cumulative: int) -> int:
+        try:
+            gas_used, logs, created = self._run(tx, dry_run=False)
+            status = 1
+        except Revert:
+            gas_used, logs, created, status = CALL_GAS.get(_decode_call(tx['data'])[0], TRANSFER_GAS), [], None, 0
+        if 'gasPrice' in tx:
+            price = tx['gasPrice']
+        else:
+            price = min(tx['maxFeePerGas'], BASE_FEE + tx['maxPriorityFeePerGas'])
+        self.spent[tx['from']] += gas_used * price + tx.get('value', 0)
+
+        entries = []
+        for topic, data in logs:
+            entry = {
+                'address': tx['to'],
+                'topics': [_hex(topic)],
+                'data': _hex(data),
+                'blockNumber': hex(block['number']),
+                'blockHash': _hex(block['hash']),
+                'transactionHash': _hex(tx['hash']),
+                'transactionIndex': hex(index),
+                'logIndex': hex(len(self.logs)),
+                'removed': False,
+            }
+            self.logs.append(entry)
+            entries.append(entry)
+
+        self.receipts[tx['hash']] = {
+            'transactionHash': _hex(tx['hash']),
+            'transactionIndex': hex(index),
+            'blockHash': _hex(block['hash']),
+            'blockNumber': hex(block['number']),
+            'from': tx['from'],
+            'to': tx['to'],
+            'contractAddress': created,
+            'cumulativeGasUsed': hex(cumulative + gas_used),
+            'gasUsed': hex(gas_used),
+            'effectiveGasPrice': hex(price),
+            'status': hex(status),
+            'logs': entries,
+            'logsBloom': _hex(bytes(256)),
+            'type': hex(tx.get('type', 0)),
+        }
+        return gas_used
+
+    # ——— JSON-RPC ———
+
+    def request(self, method: str, params):
+        with self._lock:
+            self._catch_up()
+            handler = getattr(self, 'rpc_' + method, None)
+            if handler is None:
+                raise RpcError(f"the method {method} does not exist/is not available", code=-32601)
+            return handler(*params)
+
+    def rpc_eth_chainId(self):
+        return hex(CHAIN_ID)
+
+    def rpc_net_version(self):
+        return str(CHAIN_ID)
+
+    def rpc_web3_clientVersion(self):
+        return 'BlockchainEvoting/simulator'
+
+    def rpc_eth_accounts(self):
+        return [DEV_ACCOUNT]
+
+    def rpc_eth_blockNumber(self):
+        return hex(len(self.blocks) - 1)
+
+    def rpc_eth_gasPrice(self):
+        return hex(BASE_FEE + PRIORITY_FEE)
+
+    def rpc_eth_maxPriorityFeePerGas(self):
+        return hex(PRIORITY_FEE)
+
+    def rpc_eth_feeHistory(self, count, newest, percentiles=()):
+        newest = self._block(newest)['number']
+        count = min(to_int(count), newest + 1)
+        return {
+            'oldestBlock': hex(newest - count + 1),
+            'baseFeePerGas': [hex(BASE_FEE)] * (count + 1),
+            'gasUsedRatio': [0.5] * count,
+            'reward': [[hex(PRIORITY_FEE) for _ in percentiles]] * count,
+        }
+
+    def rpc_eth_getBalance(self, address, block='latest'):
+        return hex(INITIAL_BALANCE - self.spent[to_checksum_address(address)])
+
+    def rpc_eth_getTransactionCount(self, address, block='latest'):
+        address = to_checksum_address(address)
+        nonce = self.nonces[address]
+        if block == 'pending':
+            queued = {tx['nonce'] for tx in self.pending if tx['from'] == address}
+            while nonce in queued:
+                nonce += 1
+        return hex(nonce)
+
+    def rpc_eth_getCode(self, address, block='latest'):
+        return CONTRACT_CODE if to_checksum_address(address) in self.contracts else '0x'
+
+    def _call_fields(self, tx: dict) -> dict:
+        return {
+            'from': to_checksum_address(tx['from']) if tx.get('from') else to_checksum_address(bytes(20)),
+            'to': to_checksum_address(tx['to']) if tx.get('to') else None,
+            'data': HexBytes(tx.get('data') or tx.get('input') or b''),
+            'nonce': self.nonces[to_checksum_address(tx['from'])] if tx.get('from') else 0,
+        }
+
+    def rpc_eth_estimateGas(self, tx, block='latest'):
+        gas_used, _, _ = self._run(self._call_fields(tx), dry_run=True)
+        return hex(gas_used)
+
+    def rpc_eth_call(self, tx, block='latest'):
+        fields = self._call_fields(tx)
+        call = _decode_call(fields['data'])
+        if call is None or fields['to'] is None:
+            return '0x'
+        name, args = call
+        if name in CALL_GAS:
+            self._run(fields, dry_run=True)
+            return '0x'
+        return _hex(self.contracts.get(fields['to'], VotingState()).view(name, args))
+
+    def rpc_eth_sendRawTransaction(self, raw):
+        tx = decode_raw_transaction(raw)
+        if tx['chainId'] not in (None, CHAIN_ID):
+            raise RpcError(f"invalid chain id {tx['chainId']}")
+        if tx['hash'] in self.transactions:
+            raise RpcError("already known")
+        if tx['nonce'] < self.nonces[tx['from']]:
+            raise RpcError(f"nonce too low: next nonce {self.nonces[tx['from']]}, tx nonce {tx['nonce']}")
+
+        def max_fee(t):
+            return t.get('maxFeePerGas', t.get('gasPrice'))
+
+        for queued in self.pending:
+            if queued['from'] == tx['from'] and queued['nonce'] == tx['nonce']:
+                # same rule as geth: a replacement must pay at least 10% more
+                if max_fee(tx) * 10 < max_fee(queued) * 11:
+                    raise RpcError("replacement transaction underpriced")
+                self.pending.remove(queued)
+                del self.transactions[queued['hash']]  # dropped, like on a real node
+                break
+        self.pending.append(tx)
+        self.transactions[tx['hash']] = tx
+        if self.block_time <= 0:
+            self._mine()
+        return _hex(tx['hash'])
+
+    def rpc_eth_getTransactionReceipt(self, tx_hash):
+        return self.receipts.get(HexBytes(tx_hash))
+
+    def rpc_eth_getTransactionByHash(self, tx_hash):
+        tx = self.transactions.get(HexBytes(tx_hash))
+        if tx is None:
+            return None
+        receipt = self.receipts.get(tx['hash'])
+        view = {
+            'hash': _hex(tx['hash']),
+            'from': tx['from'],
+            'to': tx['to'],
+            'nonce': hex(tx['nonce']),
+            'gas': hex(tx['gas']),
+            'value': hex(tx.get('value', 0)),
+            'input': _hex(tx.get('data') or b''),
+            'type': hex(tx.get('type', 0)),
+            'chainId': hex(CHAIN_ID),
+            'blockNumber': receipt['blockNumber'] if receipt else None,
+            'blockHash': receipt['blockHash'] if receipt else None,
+            'transactionIndex': receipt['transactionIndex'] if receipt else None,
+        }
+        for field in ('gasPrice', 'maxFeePerGas', 'maxPriorityFeePerGas'):
+            if field in tx:
+                view[field] = hex(tx[field])
+        return view
+
+    def _block_view(self, block, full: bool):
+        if block is None:
+            return None
+        return {
+            'number': hex(block['number']),
+            'hash': _hex(block['hash']),
+            'parentHash': _hex(block['parentHash']),
+            'timestamp': hex(block['timestamp']),
+            'gasLimit': hex(BLOCK_GAS_LIMIT),
+            'gasUsed': hex(block['gasUsed']),
+            'baseFeePerGas': hex(BASE_FEE),
+            'miner': to_checksum_address(bytes(20)),
+            'difficulty': '0x0',
+            'extraData': '0x',
+            'logsBloom': _hex(bytes(256)),
+            'transactions': [
+                self.rpc_eth_getTransactionByHash(h) if full else _hex(h) for h in block['transactions']
+            ],
+        }
+
+    def rpc_eth_getBlockByNumber(self, tag, full=False):
+        return self._block_view(self._block(tag), full)
+
+    def rpc_eth_getBlockByHash(self, block_hash, full=False):
+        block_hash = HexBytes(block_hash)
+        return self._block_view(next((b for b in self.blocks if b['hash'] == block_hash), None), full)
+
+    def rpc_eth_getLogs(self, query):
+        first = self._block(query.get('fromBlock', 'latest'))['number']
+        last = self._block(query.get('toBlock', 'latest'))['number']
+        addresses = query.get('address')
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        addresses = {to_checksum_address(a) for a in addresses or ()}
+        wanted = (query.get('topics') or [None])[0]
+        if isinstance(wanted, str):
+            wanted = [wanted]
+        wanted = {HexBytes(t) for t in wanted or ()}
+        return [
+            log for log in self.logs
+            if first <= to_int(log['blockNumber']) <= last
+            and (not addresses or log['address'] in addresses)
+            and (not wanted or HexBytes(log['topics'][0]) in wanted)
+        ]
+
+
+# ——— Providers ———————————————————————————————————
+
+_chain = None
+_chain_lock = threading.Lock()
+
+
+def get_simulated_chain() -> SimulatedChain:
+    global _chain
+    if _chain is None:
+        with _chain_lock:
+            if _chain is None:
+                _chain = SimulatedChain(settings.CHAIN_SIM_BLOCK_TIME)
+    return _chain
+
+
+class _Faults:
+    """Seeded latency and connection failures shared by both providers."""
+
+    def __init__(self):
+        self.latency = settings.CHAIN_SIM_LATENCY
+        self.failure_rate = settings.CHAIN_SIM_FAILURE_RATE
+        self._random = random.Random(settings.CHAIN_SIM_SEED)
+        self._lock = threading.Lock()
+
+    def check(self, method: str):
+        if self.failure_rate:
+            with self._lock:
+                failed = self._random.random() < self.failure_rate
+            if failed:
+                raise ConnectionError(f"Simulated node failure on {method}")
+
+
+def _respond(chain, request_id, method, params) -> dict:
+    try:
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': chain.request(method, list(params or []))}
+    except RpcError as e:
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': e.as_dict()}
+
+
+class SimulatedProvider(JSONBaseProvider):
+    def __init__(self, chain: SimulatedChain = None, **kwargs):
+        super().__init__(**kwargs)
+        self.chain = chain or get_simulated_chain()
+        self.faults = _Faults()
+
+    def __str__(self):
+        return "Simulated chain"
+
+    def make_request(self, method, params):
+        if self.faults.latency:
+            time.sleep(self.faults.latency)
+        self.faults.check(method)
+        return _respond(self.chain, next(self.request_counter), method, params)
+
+    def make_batch_request(self, requests):
+        if self.faults.latency:
+            time.sleep(self.faults.latency)
+        self.faults.check('batch')
+        return [_respond(self.chain, next(self.request_counter), method, params) for method, params in requests]
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return True
+
+
+class AsyncSimulatedProvider(AsyncJSONBaseProvider):
+    def __init__(self, chain: SimulatedChain = None, **kwargs):
+        super().__init__(**kwargs)
+        self.chain = chain or get_simulated_chain()
+        self.faults = _Faults()
+
+    def __str__(self):
+        return "Async simulated chain"
+
+    async def make_request(self, method, params):
+        if self.faults.latency:
+            await asyncio.sleep(self.faults.latency)
+        self.faults.check(method)
+        return _respond(self.chain, next(self.request_counter), method, params)
+
+    async def make_batch_request(self, requests):
+        if self.faults.latency:
+            await asyncio.sleep(self.faults.latency)
+        self.faults.check('batch')
+        return [_respond(self.chain, next(self.request_counter), method, params) for method, params in requests]
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        return True
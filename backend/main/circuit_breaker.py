@@ -0,0 +1,231 @@
+"""
+Circuit breaker and admission control for requests that wait on the chain.
+
+The breaker state lives in a CircuitBreakerState row, so every worker sees
+it (each process re-reads it at most every CHAIN_BREAKER_STATE_TTL
+seconds). After CHAIN_BREAKER_FAILURE_THRESHOLD consecutive node failures,
+the breaker opens, and chain-bound requests get 503 + Retry-After without
+touching the node. Once CHAIN_BREAKER_RESET_TIMEOUT seconds have passed,
+one request is let through as a trial. If it succeeds, the breaker closes;
+if it fails, the breaker opens again.
+
+Each process also admits at most CHAIN_MAX_CONCURRENCY chain-bound
+requests at a time and sheds the rest. A stalled node therefore ties up a
+few threads, not the whole worker, and read-only endpoints keep answering.
+Async views don't hold a thread while they wait, so they are capped
+separately, per event loop, at CHAIN_MAX_ASYNC_CONCURRENCY.
+
+A node failure inside a guarded block is answered with 503 as well: the
+Retry-After is the breaker's cooldown if that failure opened it.
+"""
+import asyncio
+import math
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from datetime import timedelta
+
+import aiohttp
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from web3.exceptions import BadResponseFormat, ProviderConnectionError, RequestTimedOut, TimeExhausted
+
+from .models import CircuitBreakerState
+
+CHAIN = 'chain'
+
+# Signs that the node is down or stalled: transport errors, HTTP errors and
+# unreadable RPC responses. Reverts and rejected transactions mean the node
+# answered, and local errors (a missing file, say) aren't the node's, so
+# neither counts.
+CHAIN_FAILURES = (
+    ConnectionError, TimeoutError,
+    requests.ConnectionError, requests.Timeout, requests.HTTPError,
+    aiohttp.ClientConnectionError, aiohttp.ClientResponseError,
+    ProviderConnectionError, RequestTimedOut, BadResponseFormat, TimeExhausted,
+)
+
+
+class ChainUnavailable(APIException):
+    """503 with a Retry-After header (DRF sends `wait` as Retry-After)."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The blockchain node is unavailable. Please retry later."
+    default_code = 'chain_unavailable'
+
+    def __init__(self, detail=None, wait: float = None):
+        super().__init__(detail)
+        self.wait = max(1, math.ceil(wait)) if wait else None
+
+
+# ——— Breaker ——————————————————————————————————
+
+# Each process re-reads a breaker row at most every CHAIN_BREAKER_STATE_TTL
+# seconds; its own failures and successes update the copy right away.
+_states = {}
+
+
+def _remember(breaker: CircuitBreakerState) -> CircuitBreakerState:
+    _states[breaker.name] = (breaker, time.monotonic())
+    return breaker
+
+
+def _forget(name: str):
+    _states.pop(name, None)
+
+
+def _state(name: str) -> CircuitBreakerState:
+    cached = _states.get(name)
+    if cached is not None and time.monotonic() - cached[1] < settings.CHAIN_BREAKER_STATE_TTL:
+        return cached[0]
+    breaker, _ = CircuitBreakerState.objects.get_or_create(name=name)
+    return _remember(breaker)
+
+
+def allow(name: str = CHAIN) -> CircuitBreakerState:
+    """
+    Return the breaker row if a call may go ahead, else raise
+    ChainUnavailable. When the breaker is open and its cooldown has run
+    out, only the worker whose UPDATE flips it to half-open gets through.
+    The returned row is shared within the process; don't modify it.
+    """
+    breaker = _state(name)
+    if breaker.state == CircuitBreakerState.STATE_CLOSED:
+        return breaker
+
+    retry_at = breaker.opened_at + timedelta(seconds=settings.CHAIN_BREAKER_RESET_TIMEOUT)
+    if retry_at > now():
+        raise ChainUnavailable(wait=(retry_at - now()).total_seconds())
+    trial_at = now()
+    claimed = CircuitBreakerState.objects.filter(
+        pk=breaker.pk, state=breaker.state, opened_at=breaker.opened_at
+    ).update(state=CircuitBreakerState.STATE_HALF_OPEN, opened_at=trial_at)
+    if not claimed:
+        _forget(name)
+        raise ChainUnavailable(wait=settings.CHAIN_BREAKER_RESET_TIMEOUT)
+    # the rest of this process waits out the trial too
+    return _remember(CircuitBreakerState(
+        pk=breaker.pk, name=name, state=CircuitBreakerState.STATE_HALF_OPEN,
+        failures=breaker.failures, opened_at=trial_at,
+    ))
+
+
+def record_success(breaker: CircuitBreakerState):
+    # skip the write in the common case of a closed breaker with a clean record
+    if breaker.state != CircuitBreakerState.STATE_CLOSED or breaker.failures:
+        CircuitBreakerState.objects.filter(pk=breaker.pk).update(
+            state=CircuitBreakerState.STATE_CLOSED, failures=0, opened_at=None
+        )
+        _remember(CircuitBreakerState(pk=breaker.pk, name=breaker.name))
+
+
+def record_failure(breaker: CircuitBreakerState) -> bool:
+    """Count a node failure; returns whether the breaker is now open."""
+    with transaction.atomic():
+        CircuitBreakerState.objects.filter(pk=breaker.pk).update(failures=F('failures') + 1)
+        current = CircuitBreakerState.objects.get(pk=breaker.pk)
+        tripped = current.failures >= settings.CHAIN_BREAKER_FAILURE_THRESHOLD
+        if current.state == CircuitBreakerState.STATE_HALF_OPEN or (
+            tripped and current.state == CircuitBreakerState.STATE_CLOSED
+        ):
+            current.state = CircuitBreakerState.STATE_OPEN
+            current.opened_at = now()
+            current.save(update_fields=['state', 'opened_at', 'updated_at'])
+    _remember(current)
+    return current.state == CircuitBreakerState.STATE_OPEN
+
+
+def record_inconclusive(breaker: CircuitBreakerState):
+    """The call failed for another reason: hand a half-open trial to the next request."""
+    if breaker.state == CircuitBreakerState.STATE_HALF_OPEN:
+        expired = now() - timedelta(seconds=settings.CHAIN_BREAKER_RESET_TIMEOUT)
+        CircuitBreakerState.objects.filter(
+            pk=breaker.pk, state=CircuitBreakerState.STATE_HALF_OPEN
+        ).update(state=CircuitBreakerState.STATE_OPEN, opened_at=expired)
+        _forget(breaker.name)
+
+
+# ——— Admission ——————————————————————————————————
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+def _get_slots() -> threading.BoundedSemaphore:
+    global _slots
+    if _slots is None:
+        with _slots_lock:
+            if _slots is None:
+                _slots = threading.BoundedSemaphore(settings.CHAIN_MAX_CONCURRENCY)
+    return _slots
+
+
+# one per event loop: asyncio primitives must not be shared between loops
+_async_slots = weakref.WeakKeyDictionary()
+
+
+def _get_async_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _async_slots.get(loop)
+    if slots is None:
+        slots = _async_slots[loop] = asyncio.Semaphore(settings.CHAIN_MAX_ASYNC_CONCURRENCY)
+    return slots
+
+
+def _busy() -> ChainUnavailable:
+    return ChainUnavailable(
+        "Too many requests are waiting on the blockchain. Please retry shortly.",
+        wait=settings.CHAIN_BUSY_RETRY_AFTER,
+    )
+
+
+def _node_failed(opened: bool) -> ChainUnavailable:
+    return ChainUnavailable(
+        wait=settings.CHAIN_BREAKER_RESET_TIMEOUT if opened else settings.CHAIN_BUSY_RETRY_AFTER
+    )
+
+
+@contextmanager
+def chain_guard(name: str = CHAIN):
+    """Run the block as a chain-bound request: admitted, breaker-checked and recorded."""
+    if not _get_slots().acquire(blocking=False):
+        raise _busy()
+    try:
+        breaker = allow(name)
+        try:
+            yield
+        except CHAIN_FAILURES as e:
+            raise _node_failed(record_failure(breaker)) from e
+        except Exception:
+            record_inconclusive(breaker)
+            raise
+        record_success(breaker)
+    finally:
+        _get_slots().release()
+
+
+@asynccontextmanager
+async def achain_guard(name: str = CHAIN):
+    """Async `chain_guard` for the views in main.async_views."""
+    slots = _get_async_slots()
+    if slots.locked():
+        raise _busy()
+    await slots.acquire()  # free, so this returns at once
+    try:
+        breaker = await sync_to_async(allow)(name)
+        try:
+            yield
+        except CHAIN_FAILURES as e:
+            raise _node_failed(await sync_to_async(record_failure)(breaker)) from e
+        except Exception:
+            await sync_to_async(record_inconclusive)(breaker)
+            raise
+        await sync_to_async(record_success)(breaker)
+    finally:
+        slots.release()
@@ -0,0 +1,270 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from hexbytes import HexBytes
+
+from .blockchain import get_web3, rpc_batch
+from .fee_watchdog import StuckTransactionWatchdog
+from .models import BlockchainTransaction, VoteBatch
+from .rpc_batch import RpcCallError, to_int
+from .vote_queue import mark_failed
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on calls sent in one JSON-RPC batch.
+MAX_BATCH_SIZE = 100
+
+
+def _rpc_hash(tx_hash: str) -> str:
+    return HexBytes(tx_hash).to_0x_hex()
+
+
+def _fetch_receipts(hashes) -> dict:
+    """Map each hash to its raw receipt (None if not mined) using batched calls."""
+    receipts = {}
+    hashes = list(hashes)
+    for start in range(0, len(hashes), MAX_BATCH_SIZE):
+        chunk = hashes[start:start + MAX_BATCH_SIZE]
+        batch = rpc_batch()
+        for tx_hash in chunk:
+            batch.request('eth_getTransactionReceipt', [_rpc_hash(tx_hash)])
+        for tx_hash, receipt in zip(chunk, batch.execute()):
+            if isinstance(receipt, RpcCallError):
+                logger.warning("Receipt lookup for %s failed: %s", tx_hash, receipt)
+                continue
+            receipts[tx_hash] = receipt
+    return receipts
+
+
+def _abandoned(stale) -> set:
+    """
+    Primary keys of the timed-out `(tx, hashes)` pairs in `stale` that can
+    be failed: none of their hashes is known to the node any more, or their
+    nonce was mined by another transaction. Anything still in the mempool,
+    mined since the receipt lookup, or whose lookup fails is kept.
+    """
+    lookups = [(tx, tx_hash) for tx, hashes in stale for tx_hash in hashes]
+    pending, unknown = {}, set()
+    for start in range(0, len(lookups), MAX_BATCH_SIZE):
+        chunk = lookups[start:start + MAX_BATCH_SIZE]
+        batch = rpc_batch()
+        for _, tx_hash in chunk:
+            batch.request('eth_getTransactionByHash', [_rpc_hash(tx_hash)])
+        for (tx, tx_hash), found in zip(chunk, batch.execute()):
+            if isinstance(found, RpcCallError):
+                logger.warning("Transaction lookup for %s failed: %s", tx_hash, found)
+                unknown.add(tx.pk)
+            elif found:
+                pending.setdefault(tx.pk, found)
+
+    abandoned = {tx.pk for tx, _ in stale if tx.pk not in pending and tx.pk not in unknown}
+    waiting = [
+        (pk, found) for pk, found in pending.items()
+        if pk not in unknown and found.get('blockNumber') is None
+    ]
+    for start in range(0, len(waiting), MAX_BATCH_SIZE):
+        chunk = waiting[start:start + MAX_BATCH_SIZE]
+        batch = rpc_batch()
+        for _, found in chunk:
+            batch.request('eth_getTransactionCount', [found['from'], 'latest'], to_int)
+        for (pk, found), mined_nonce in zip(chunk, batch.execute()):
+            if isinstance(mined_nonce, RpcCallError):
+                logger.warning("Nonce lookup for %s failed: %s", found['from'], mined_nonce)
+            elif mined_nonce > to_int(found['nonce']):
+                abandoned.add(pk)
+    return abandoned
+
+
+class ConfirmationTracker:
+    """
+    Follows the chain head and settles sent vote transactions in bulk.
+
+    Every new block is fetched once (hashes only) and matched against the
+    set of 'sent' rows; only the matches have their receipts read, in one
+    batch per block range. Mined rows become 'confirmed' once they are
+    `confirmations` blocks deep, after a batched re-check that their receipt
+    is still in the same block (a reorg sends them back to 'sent'). RPC cost
+    therefore grows with the number of blocks, not pending transactions.
+
+    Transactions broadcast before the tracker started, or missed while it
+    was catching up, are picked up by a periodic receipt sweep. Stuck ones
+    are handed to the `watchdog` for a fee bump on every poll.
+    """
+
+    def __init__(self, confirmations: int = None, sweep_interval: float = None, watchdog=None):
+        self.confirmations = max(1, confirmations or settings.VOTE_CONFIRMATIONS)
+        self.sweep_interval = sweep_interval or settings.CONFIRMATION_SWEEP_INTERVAL
+        self.watchdog = watchdog or StuckTransactionWatchdog()
+        self.last_block = None
+        self._last_sweep = None
+
+    def _sent(self):
+        """Sent rows keyed by their current hash and any hash they replaced."""
+        sent = {}
+        # batched votes have no transaction of their own (see confirm_batches)
+        for tx in BlockchainTransaction.objects.filter(status=BlockchainTransaction.STATUS_SENT, batch__isnull=True):
+            sent[tx.transaction_hash] = tx
+            for old_hash in tx.data.get('replaced', []):
+                sent[old_hash] = tx
+        return sent
+
+    def _settle(self, tx, receipt, tx_hash: str = None):
+        if tx_hash and tx_hash != tx.transaction_hash:
+            # an earlier version won the nonce
+            tx.transaction_hash = tx_hash
+        if to_int(receipt['status']) != 1:
+            tx.save(update_fields=['transaction_hash', 'updated_at'])
+            mark_failed(tx, "Transaction reverted")
+            return
+        tx.status = BlockchainTransaction.STATUS_MINED
+        tx.block_number = to_int(receipt['blockNumber'])
+        tx.save(update_fields=['transaction_hash', 'status', 'block_number', 'updated_at'])
+
+    def scan_blocks(self, first: int, last: int):
+        """Match the transactions of blocks `first`..`last` against sent rows."""
+        for start in range(first, last + 1, MAX_BATCH_SIZE):
+            end = min(start + MAX_BATCH_SIZE - 1, last)
+            batch = rpc_batch()
+            for number in range(start, end + 1):
+                batch.request('eth_getBlockByNumber', [hex(number), False])
+            blocks = batch.execute(raise_errors=True)
+
+            # Load the sent set after fetching the blocks, so a hash saved
+            # while the request was in flight is still matched.
+            sent = self._sent()
+            if not sent:
+                continue
+            included = {
+                HexBytes(tx_hash).to_0x_hex()
+                for block in blocks if block
+                for tx_hash in block['transactions']
+            }
+            matched = [h for h in included if h in sent]
+            receipts = _fetch_receipts(matched)
+            for tx_hash in matched:
+                receipt = receipts.get(tx_hash)
+                if receipt:
+                    self._settle(sent[tx_hash], receipt, tx_hash)
+
+    def sweep(self):
+        """
+        Look up receipts of all sent rows directly. Rows past the receipt
+        timeout are failed only once the node has dropped them or their
+        nonce went to another transaction; a (replacement) transaction still
+        waiting in the mempool stays sent.
+        """
+        sent = self._sent()
+        if not sent:
+            return
+        receipts = _fetch_receipts(sent)
+        cutoff = timezone.now() - timedelta(seconds=settings.VOTE_RECEIPT_TIMEOUT)
+        by_tx = {}
+        for tx_hash, tx in sent.items():
+            by_tx.setdefault(tx.pk, (tx, []))[1].append(tx_hash)
+        stale = []
+        for tx, hashes in by_tx.values():
+            mined = next((h for h in hashes if receipts.get(h)), None)
+            if mined:
+                self._settle(tx, receipts[mined], mined)
+            elif all(h in receipts for h in hashes) and tx.updated_at < cutoff:
+                stale.append((tx, hashes))
+        if not stale:
+            return
+        abandoned = _abandoned(stale)
+        for tx, _ in stale:
+            if tx.pk in abandoned:
+                mark_failed(tx, "Receipt not available")
+
+    def confirm(self, head: int):
+        """Promote mined rows that are at least `confirmations` blocks deep."""
+        depth_limit = head - self.confirmations + 1
+        mined = list(BlockchainTransaction.objects.filter(
+            status=BlockchainTransaction.STATUS_MINED,
+            batch__isnull=True,
+            block_number__isnull=False,
+            block_number__lte=depth_limit,
+        ))
+        if not mined:
+            return
+
+        receipts = _fetch_receipts(tx.transaction_hash for tx in mined)
+        confirmed = []
+        for tx in mined:
+            if tx.transaction_hash not in receipts:
+                continue  # lookup failed; retry on the next block
+            receipt = receipts[tx.transaction_hash]
+            if receipt is None:
+                # dropped by a reorg; wait for it to be mined again
+                tx.status = BlockchainTransaction.STATUS_SENT
+                tx.block_number = None
+                tx.save(update_fields=['status', 'block_number', 'updated_at'])
+            elif to_int(receipt['blockNumber']) != tx.block_number:
+                tx.block_number = to_int(receipt['blockNumber'])
+                tx.save(update_fields=['block_number', 'updated_at'])
+            else:
+                confirmed.append(tx.pk)
+
+        BlockchainTransaction.objects.filter(
+            pk__in=confirmed, status=BlockchainTransaction.STATUS_MINED
+        ).update(status=BlockchainTransaction.STATUS_CONFIRMED, updated_at=timezone.now())
+
+    def confirm_batches(self, head: int):
+        """
+        Promote the votes of anchored batches once the anchor transaction is
+        `confirmations` blocks deep. Their own transaction_hash is a Merkle
+        leaf, so the batch's anchor receipt is what gets re-checked.
+        """
+        depth_limit = head - self.confirmations + 1
+        batches = list(VoteBatch.objects.filter(
+            status=VoteBatch.STATUS_MINED,
+            block_number__lte=depth_limit,
+            leaves__status=BlockchainTransaction.STATUS_MINED,
+        ).distinct())
+        if not batches:
+            return
+
+        receipts = _fetch_receipts(batch.transaction_hash for batch in batches)
+        for batch in batches:
+            receipt = receipts.get(batch.transaction_hash)
+            if receipt is None:
+                continue  # lookup failed or dropped by a reorg; retry on the next block
+            block_number = to_int(receipt['blockNumber'])
+            if block_number != batch.block_number:
+                batch.block_number = block_number
+                batch.save(update_fields=['block_number'])
+                batch.leaves.update(block_number=block_number, updated_at=timezone.now())
+                continue
+            batch.leaves.filter(status=BlockchainTransaction.STATUS_MINED).update(
+                status=BlockchainTransaction.STATUS_CONFIRMED, updated_at=timezone.now()
+            )
+
+    def poll(self):
+        """Process any blocks added since the last call. Cheap when the head has not moved."""
+        head = get_web3().eth.block_number
+        now = time.monotonic()
+        if self._last_sweep is None or now - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+            self._last_sweep = now
+        elif self.last_block is not None and head > self.last_block:
+            self.scan_blocks(self.last_block + 1, head)
+
+        if head != self.last_block:
+            self.confirm(head)
+            self.confirm_batches(head)
+            self.last_block = head
+
+        self.watchdog.check()
+
+    def run(self, poll_interval: float = None):
+        poll_interval = poll_interval or settings.CONFIRMATION_POLL_INTERVAL
+        while True:
+            close_old_connections()
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Confirmation tracker poll failed")
+            time.sleep(poll_interval)
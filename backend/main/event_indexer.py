@@ -0,0 +1,204 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
+
+from .blockchain import get_voting_contract, get_web3, rpc_batch
+from .models import ContractEvent, IndexedBlock, IndexerCursor
+from .rpc_batch import RpcCallError, to_int
+
+logger = logging.getLogger(__name__)
+
+
+class EventIndexer:
+    """
+    Mirrors VotingContract logs into ContractEvent rows.
+
+    Logs are pulled with `eth_getLogs` in block ranges of `chunk_size`. The
+    range is halved whenever the node refuses a query as too large, and
+    doubled again (up to `chunk_size`) after each full range that succeeds.
+    Each range is committed together with its block cursor, so a restart
+    resumes from the last committed block. The hashes of the last
+    `reorg_depth` indexed blocks are kept. If the cursor block's hash
+    changes, events past the newest block still on the canonical chain are
+    rolled back and re-indexed.
+    """
+
+    def __init__(self, contract=None, start_block: int = None, chunk_size: int = None, reorg_depth: int = None):
+        self.contract = contract or get_voting_contract()
+        self.address = self.contract.address
+        self.start_block = settings.INDEXER_START_BLOCK if start_block is None else start_block
+        self.max_chunk_size = self.chunk_size = chunk_size or settings.INDEXER_CHUNK_SIZE
+        self.reorg_depth = reorg_depth or settings.INDEXER_REORG_DEPTH
+        self.events = {
+            HexBytes(event_abi_to_log_topic(abi)): getattr(self.contract.events, abi['name'])()
+            for abi in self.contract.abi if abi['type'] == 'event'
+        }
+
+    @property
+    def cursor(self) -> IndexerCursor:
+        cursor, _ = IndexerCursor.objects.get_or_create(
+            contract_address=self.address, defaults={'last_block': self.start_block - 1}
+        )
+        return cursor
+
+    # ——— Reorgs ——————————————————————————————————
+
+    def _canonical_hashes(self, numbers) -> dict:
+        batch = rpc_batch()
+        for number in numbers:
+            batch.request('eth_getBlockByNumber', [hex(number), False])
+        return {
+            number: block['hash'] if block else None
+            for number, block in zip(numbers, batch.execute(raise_errors=True))
+        }
+
+    def _fork_point(self) -> int:
+        """Newest indexed block that is still on the canonical chain."""
+        known = list(
+            IndexedBlock.objects.filter(contract_address=self.address).order_by('-number')
+        )
+        canonical = self._canonical_hashes([b.number for b in known])
+        for block in known:
+            if canonical[block.number] == block.hash:
+                return block.number
+        logger.warning("Reorg deeper than %s blocks; reindexing from block %s", self.reorg_depth, self.start_block)
+        return self.start_block - 1
+
+    @transaction.atomic
+    def rollback(self, to_block: int):
+        """Forget everything indexed after `to_block`."""
+        ContractEvent.objects.filter(contract_address=self.address, block_number__gt=to_block).delete()
+        IndexedBlock.objects.filter(contract_address=self.address, number__gt=to_block).delete()
+        IndexerCursor.objects.filter(contract_address=self.address).update(last_block=to_block)
+
+    def check_reorg(self, cursor) -> bool:
+        """Roll back if the cursor block was replaced; returns True when it was."""
+        stored = IndexedBlock.objects.filter(contract_address=self.address, number=cursor.last_block).first()
+        if stored is None:
+            return False
+        if self._canonical_hashes([stored.number])[stored.number] == stored.hash:
+            return False
+        fork = self._fork_point()
+        logger.warning("Chain reorg detected at block %s; rolling back to %s", cursor.last_block, fork)
+        self.rollback(fork)
+        return True
+
+    # ——— Indexing ——————————————————————————————————
+
+    def _fetch(self, first: int, last: int):
+        """Logs of `first`..`last` plus the hash of `last`, in one batch."""
+        batch = rpc_batch()
+        batch.request('eth_getLogs', [{
+            'address': self.address,
+            'fromBlock': hex(first),
+            'toBlock': hex(last),
+            'topics': [[HexBytes(topic).to_0x_hex() for topic in self.events]],
+        }])
+        batch.request('eth_getBlockByNumber', [hex(last), False])
+        logs, block = batch.execute()
+        if isinstance(logs, RpcCallError):
+            raise logs
+        if isinstance(block, RpcCallError):
+            raise block
+        if block is None:
+            # e.g. a load-balanced node that is a block behind; retried on the next poll
+            raise RpcCallError('eth_getBlockByNumber', f"block {last} is not available")
+        return logs, block['hash']
+
+    def _to_row(self, log) -> ContractEvent:
+        decoded = self.events[HexBytes(log['topics'][0])].process_log(log)
+        args = dict(decoded['args'])
+        return ContractEvent(
+            contract_address=self.address,
+            event=decoded['event'],
+            block_number=to_int(log['blockNumber']),
+            block_hash=HexBytes(log['blockHash']).to_0x_hex(),
+            transaction_hash=HexBytes(log['transactionHash']).to_0x_hex(),
+            log_index=to_int(log['logIndex']),
+            args=args,
+            voter=args.get('voter', ''),
+            candidate=args.get('candidate'),
+        )
+
+    @transaction.atomic
+    def _store(self, rows, last: int, last_hash: str):
+        ContractEvent.objects.bulk_create(rows, ignore_conflicts=True)
+        hashes = {row.block_number: row.block_hash for row in rows}
+        hashes[last] = last_hash
+        IndexedBlock.objects.bulk_create(
+            [IndexedBlock(contract_address=self.address, number=n, hash=h) for n, h in hashes.items()],
+            update_conflicts=True, unique_fields=['contract_address', 'number'], update_fields=['hash'],
+        )
+        IndexedBlock.objects.filter(
+            contract_address=self.address, number__lt=last - self.reorg_depth
+        ).delete()
+        IndexerCursor.objects.filter(contract_address=self.address).update(last_block=last)
+
+    def step(self, head: int = None) -> int:
+        """Index the next chunk up to `head`; returns the number of new events."""
+        if head is None:
+            head = get_web3().eth.block_number
+        cursor = self.cursor
+        if self.check_reorg(cursor):
+            cursor.refresh_from_db()
+        if cursor.last_block >= head:
+            return 0
+
+        first = cursor.last_block + 1
+        last = min(head, first + self.chunk_size - 1)
+        try:
+            logs, last_hash = self._fetch(first, last)
+        except RpcCallError as e:
+            if e.code is not None and last > first:
+                # most nodes cap the size of a getLogs response
+                self.chunk_size = max(1, (last - first + 1) // 2)
+                logger.info("eth_getLogs refused %s-%s (%s); chunk size now %s", first, last, e.message, self.chunk_size)
+                return 0
+            raise
+
+        if last - first + 1 == self.chunk_size < self.max_chunk_size:
+            self.chunk_size = min(self.max_chunk_size, self.chunk_size * 2)
+
+        rows = [self._to_row(log) for log in logs if log['topics'] and HexBytes(log['topics'][0]) in self.events]
+        self._store(rows, last, HexBytes(last_hash).to_0x_hex())
+        return len(rows)
+
+    def catch_up(self):
+        """Index until the cursor reaches the current head."""
+        head = get_web3().eth.block_number
+        while self.cursor.last_block < head:
+            self.step(head)
+
+    def run(self, poll_interval: float = None):
+        poll_interval = poll_interval or settings.INDEXER_POLL_INTERVAL
+        while True:
+            close_old_connections()
+            try:
+                self.catch_up()
+            except Exception:
+                logger.exception("Event indexer step failed")
+            time.sleep(poll_interval)
+
+
+def vote_counts(contract_address: str = None, candidate_ids=None) -> tuple:
+    """
+    `(votes per on-chain candidate id, last indexed block)` according to the
+    local VoteCast index, read together so the counts match the cursor.
+    The block is None when the contract has never been indexed.
+    """
+    contract_address = contract_address or get_voting_contract().address
+    with transaction.atomic():
+        cursor = IndexerCursor.objects.filter(contract_address=contract_address).first()
+        if cursor is None:
+            return {}, None
+        events = ContractEvent.objects.filter(
+            contract_address=contract_address, event='VoteCast', block_number__lte=cursor.last_block
+        )
+        if candidate_ids is not None:
+            events = events.filter(candidate__in=candidate_ids)
+        return dict(events.values_list('candidate').annotate(votes=Count('id')).order_by()), cursor.last_block
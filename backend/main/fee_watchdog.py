@@ -0,0 +1,50 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from hexbytes import HexBytes
+
+from .blockchain import replace_transaction
+from .models import BlockchainTransaction
+
+logger = logging.getLogger(__name__)
+
+
+class StuckTransactionWatchdog:
+    """
+    Replaces queued vote transactions that have sat in the mempool longer
+    than FEE_REPLACEMENT_DEADLINE seconds: same nonce, fees bumped by
+    FEE_BUMP_PERCENT (or up to the current suggestion), at most
+    FEE_MAX_REPLACEMENTS times per vote. The receipt row follows the newest
+    hash. Earlier hashes are kept in `data['replaced']`, so the
+    ConfirmationTracker still settles the vote if an older version is the
+    one that gets mined.
+    """
+
+    def __init__(self, deadline: float = None):
+        self.deadline = settings.FEE_REPLACEMENT_DEADLINE if deadline is None else deadline
+
+    def stuck(self):
+        cutoff = timezone.now() - timedelta(seconds=self.deadline)
+        return BlockchainTransaction.objects.filter(
+            status=BlockchainTransaction.STATUS_SENT, updated_at__lt=cutoff
+        ).order_by('id')
+
+    def check(self) -> int:
+        """Replace every stuck transaction once; returns how many were replaced."""
+        if not self.deadline:
+            return 0
+        replaced = 0
+        for tx in self.stuck():
+            previous = tx.data.get('replaced', [])
+            if len(previous) >= settings.FEE_MAX_REPLACEMENTS:
+                continue
+            new_hash = replace_transaction(HexBytes(tx.transaction_hash))
+            if new_hash is None:
+                continue  # mined or dropped meanwhile; the tracker settles it
+            tx.data['replaced'] = previous + [tx.transaction_hash]
+            tx.transaction_hash = new_hash.to_0x_hex()
+            tx.save(update_fields=['transaction_hash', 'data', 'updated_at'])
+            replaced += 1
+        return replaced
@@ -0,0 +1,67 @@
+"""
+Transaction fee strategy. Fees come from `eth_feeHistory` (cached per
+block in `main.blockchain.chain_cache`): the next block's base fee plus the
+median FEE_PRIORITY_PERCENTILE tip of the last FEE_HISTORY_BLOCKS blocks.
+Nodes without a base fee or without eth_feeHistory, such as older
+Ganache, get a legacy gasPrice instead.
+"""
+import math
+
+from django.conf import settings
+from web3 import Web3
+
+from .rpc_batch import to_int
+
+
+def fee_history_params() -> list:
+    return [settings.FEE_HISTORY_BLOCKS, 'latest', [settings.FEE_PRIORITY_PERCENTILE]]
+
+
+def fee_params(history, gas_price: int) -> dict:
+    """
+    Fee fields for a transaction: maxFeePerGas/maxPriorityFeePerGas, or
+    gasPrice when FEE_STRATEGY is 'legacy' or `history` (raw eth_feeHistory
+    result, may be empty) has no base fee.
+    """
+    base_fees = (history or {}).get('baseFeePerGas') or []
+    if settings.FEE_STRATEGY == 'legacy' or not base_fees or not to_int(base_fees[-1]):
+        return {'gasPrice': gas_price}
+
+    # the last entry is the base fee of the block after the newest one
+    base_fee = to_int(base_fees[-1])
+    tips = sorted(to_int(reward[0]) for reward in history.get('reward') or [] if reward)
+    tip = max(tips[len(tips) // 2] if tips else 0, Web3.to_wei(settings.FEE_MIN_PRIORITY_FEE_GWEI, 'gwei'))
+    return {
+        'maxPriorityFeePerGas': tip,
+        # headroom for the base fee to keep rising for a few blocks
+        'maxFeePerGas': int(base_fee * settings.FEE_BASE_FEE_MULTIPLIER) + tip,
+    }
+
+
+def max_fee_per_gas(fees: dict) -> int:
+    """Most the sender can pay per unit of gas with these fees."""
+    return fees['maxFeePerGas'] if 'maxFeePerGas' in fees else fees['gasPrice']
+
+
+def bump_fees(pending: dict, current: dict) -> dict:
+    """
+    Fees for a replacement of `pending` (a transaction as returned by
+    eth_getTransactionByHash): at least FEE_BUMP_PERCENT above the old ones,
+    which nodes require to accept a replacement, and never below the
+    current suggestion.
+    """
+    factor = 1 + settings.FEE_BUMP_PERCENT / 100
+
+    def bumped(value):
+        return math.ceil(to_int(value) * factor)
+
+    old_price = pending.get('gasPrice')
+    if 'maxFeePerGas' in current:
+        old_fee = pending.get('maxFeePerGas') or old_price
+        old_tip = pending.get('maxPriorityFeePerGas') or old_price
+        tip = max(bumped(old_tip), current['maxPriorityFeePerGas'])
+        return {
+            'maxPriorityFeePerGas': tip,
+            'maxFeePerGas': max(bumped(old_fee), current['maxFeePerGas'], tip),
+        }
+    return {'gasPrice': max(bumped(old_price or pending['maxFeePerGas']), current['gasPrice'])}
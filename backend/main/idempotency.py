@@ -0,0 +1,168 @@
+import functools
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils.timezone import now
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+REPLAY_HEADER = 'Idempotent-Replayed'
+
+_MISMATCH = (422, {"detail": "This Idempotency-Key was already used with a different request."})
+_IN_PROGRESS = (409, {"detail": "A request with this Idempotency-Key is still in progress. Retry later."})
+
+
+def fingerprint(data) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _try_claim(user, key: str, endpoint: str, digest: str):
+    """
+    One attempt at taking `key`. Returns the new in-progress record when
+    this request should run, a (status, body) answer when it must not, or
+    None when a lapsed or vanished claim was cleared and it is worth retrying.
+    """
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user, key=key, endpoint=endpoint, fingerprint=digest,
+                # lease for the first attempt; a crashed worker frees the key when it runs out
+                expires_at=now() + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT),
+            )
+    except IntegrityError:
+        pass
+
+    existing = IdempotencyKey.objects.filter(user=user, key=key, endpoint=endpoint).first()
+    if existing is None:
+        return None
+    if existing.expires_at <= now():
+        IdempotencyKey.objects.filter(pk=existing.pk, expires_at__lte=now()).delete()
+        return None
+    if existing.fingerprint != digest:
+        return _MISMATCH
+    if existing.response_status is not None:
+        return existing.response_status, existing.response_body
+    return _IN_PROGRESS
+
+
+def claim(user, key: str, endpoint: str, digest: str):
+    """
+    Take `key` for this request. Returns (record, None) to go ahead or
+    (None, (status, body)) to answer without running the request; an
+    attempt still in flight gets 409 straight away instead of a wait.
+    """
+    for _ in range(3):
+        outcome = _try_claim(user, key, endpoint, digest)
+        if isinstance(outcome, IdempotencyKey):
+            return outcome, None
+        if outcome is not None:
+            return None, outcome
+    # the key keeps changing hands under us
+    return None, _IN_PROGRESS
+
+
+aclaim = sync_to_async(claim)
+
+
+def _lease(record: IdempotencyKey):
+    # a lapsed lease is deleted and re-claimed as a new row, so the pk names its holder
+    return IdempotencyKey.objects.filter(pk=record.pk, response_status__isnull=True)
+
+
+def release(record: IdempotencyKey):
+    """Free the key after a failed attempt, unless the lease has already passed to a retry."""
+    _lease(record).delete()
+
+
+def complete(record: IdempotencyKey, status: int, body) -> bool:
+    """
+    Store the response for replay, client errors included; server errors
+    free the key so a retry runs again. Returns False when the lease ran out first and the key is
+    now another attempt's.
+    """
+    if status >= 500:
+        release(record)
+        return True
+    updated = _lease(record).update(
+        response_status=status, response_body=body,
+        expires_at=now() + timedelta(seconds=settings.IDEMPOTENCY_TTL),
+    )
+    if not updated:
+        logger.warning(
+            "Idempotency-Key %r on %s outlived its lease; its response was not stored", record.key, record.endpoint
+        )
+    return bool(updated)
+
+
+def purge_expired() -> int:
+    return IdempotencyKey.objects.filter(expires_at__lte=now()).delete()[0]
+
+
+# ——— View integration ——————————————————————————————
+
+def idempotent(endpoint: str):
+    """
+    Decorator for a DRF view method. Requests from an authenticated user
+    with an Idempotency-Key header run once per key; retries get the
+    stored response back, or 409 while the first attempt is running.
+    DRF exceptions are stored as the response they render to.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get('Idempotency-Key')
+            if not key or not request.user.is_authenticated:
+                return view_method(self, request, *args, **kwargs)
+
+            record, answer = claim(request.user, key, endpoint, fingerprint(request.data))
+            if answer is not None:
+                return Response(answer[1], status=answer[0], headers={REPLAY_HEADER: 'true'})
+            try:
+                response = view_method(self, request, *args, **kwargs)
+            except APIException as exc:
+                try:
+                    response = self.handle_exception(exc)
+                except Exception:
+                    release(record)
+                    raise
+            except Exception:
+                release(record)
+                raise
+            complete(record, response.status_code, response.data)
+            return response
+        return wrapper
+    return decorator
+
+
+async def arun_idempotent(request, user, endpoint: str, data, handler):
+    """`idempotent` for the async views: `handler()` returns a JsonResponse."""
+    key = request.headers.get('Idempotency-Key')
+    if not key:
+        return await handler()
+
+    record, answer = await aclaim(user, key, endpoint, fingerprint(data))
+    if answer is not None:
+        response = JsonResponse(answer[1], status=answer[0], safe=False)
+        response[REPLAY_HEADER] = 'true'
+        return response
+    try:
+        response = await handler()
+    except APIException as exc:
+        # answer as DRF's exception handler would, so the error can be stored
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        response = JsonResponse(detail, status=exc.status_code, safe=False)
+    except Exception:
+        await sync_to_async(release)(record)
+        raise
+    await sync_to_async(complete)(record, response.status_code, json.loads(response.content))
+    return response
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .tally import election_tallies
+
+logger = logging.getLogger(__name__)
+
+
+class _Subscriber:
+    """Per-connection mailbox. Unsent changes are merged, so a slow client only ever gets the latest counts."""
+
+    def __init__(self):
+        self.changes = {}
+        self.ready = asyncio.Event()
+
+    def push(self, changes: dict):
+        self.changes.update(changes)
+        self.ready.set()
+
+    async def next(self, timeout: float):
+        """Wait up to `timeout` seconds for changes; returns {} on timeout."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self.ready.clear()
+        changes, self.changes = self.changes, {}
+        return changes
+
+
+class ElectionFeed:
+    """
+    One producer per election and process. Every `interval` seconds it
+    reads the election's CandidateTally rows once and pushes the candidates
+    whose count changed to every subscriber. However many votes land in an
+    interval, subscribers get at most one update per interval, and the
+    database sees one query no matter how many clients are listening.
+    """
+
+    def __init__(self, election_id: int, interval: float):
+        self.election_id = election_id
+        self.interval = interval
+        self.tallies = None
+        self.subscribers = set()
+        self._task = None
+
+    async def subscribe(self) -> _Subscriber:
+        if self.tallies is None:
+            self.tallies = await sync_to_async(election_tallies)(self.election_id)
+        subscriber = _Subscriber()
+        self.subscribers.add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._produce())
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def _produce(self):
+        while self.subscribers:
+            await asyncio.sleep(self.interval)
+            try:
+                tallies = await sync_to_async(election_tallies)(self.election_id)
+            except Exception:
+                logger.exception("Live results refresh failed for election %s", self.election_id)
+                continue
+            changes = {
+                candidate_id: votes for candidate_id, votes in tallies.items()
+                if self.tallies.get(candidate_id) != votes
+            }
+            self.tallies = tallies
+            if changes:
+                for subscriber in list(self.subscribers):
+                    subscriber.push(changes)
+        # nobody is listening any more; the next subscriber reloads a fresh snapshot
+        self.tallies = None
+
+
+_feeds = {}
+
+
+def get_feed(election_id: int) -> ElectionFeed:
+    feed = _feeds.get(election_id)
+    if feed is None:
+        feed = _feeds[election_id] = ElectionFeed(election_id, settings.LIVE_RESULTS_INTERVAL)
+    return feed
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_results(election_id: int):
+    """
+    Server-sent events for one election: a `snapshot` with every candidate's
+    count, then a `delta` with the changed counts whenever they move.
+    """
+    feed = get_feed(election_id)
+    subscriber = await feed.subscribe()
+    try:
+        tallies = dict(feed.tallies)
+        yield _sse('snapshot', {
+            'election': election_id, 'tallies': tallies, 'total_votes': sum(tallies.values()),
+        })
+        while True:
+            changes = await subscriber.next(settings.LIVE_RESULTS_KEEPALIVE)
+            if not changes:
+                yield ": keepalive\n\n"
+                continue
+            tallies.update(changes)
+            yield _sse('delta', {
+                'election': election_id, 'changes': changes, 'total_votes': sum(tallies.values()),
+            })
+    finally:
+        feed.unsubscribe(subscriber)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from main.vote_batches import run_anchorer
+
+
+class Command(BaseCommand):
+    help = "Anchor batched votes on chain as Merkle roots."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Votes per batch (VOTE_BATCH_SIZE).")
+        parser.add_argument('--interval', type=float,
+                            help="Anchor a smaller batch once its oldest vote has waited this many seconds.")
+        parser.add_argument('--poll-interval', type=float, help="Seconds to sleep when nothing is due.")
+        parser.add_argument('--once', action='store_true', help="Anchor every outstanding vote and exit.")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Vote anchorer started.")
+        run_anchorer(
+            batch_size=options['batch_size'],
+            interval=options['interval'],
+            poll_interval=options['poll_interval'],
+            once=options['once'],
+        )
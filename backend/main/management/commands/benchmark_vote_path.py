@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from eth_account import Account
+
+from main import benchmark
+from main.chain_backends import get_chain_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test candidate registration and the login -> vote -> result flow against a local "
+        "chain stand-in, in a throwaway database. Writes a JSON report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=200)
+        parser.add_argument('--candidates', type=int, default=10)
+        parser.add_argument('--concurrency', type=int, default=8, help="Flows running at once.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--backend', choices=['simulator', 'tester'], default='simulator',
+                            help="eth-tester has no transaction pool and rejects transactions sent out of "
+                                 "nonce order; use --concurrency 1 with 'tester'.")
+        parser.add_argument('--block-time', type=float, default=0,
+                            help="Seconds between simulator blocks (0 mines each transaction at once).")
+        parser.add_argument('--mode', choices=['sync', 'queued', 'batched'], default='queued',
+                            help="VOTE_SUBMISSION_MODE to benchmark. Queued and batched ballots are "
+                                 "drained inside the timed window.")
+        parser.add_argument('--results-source', choices=['tally', 'chain', 'index'], default=None,
+                            help="VOTING_RESULTS_SOURCE (default: the configured one).")
+        parser.add_argument('--output', default='vote_path_benchmark.json')
+        parser.add_argument('--baseline', help="Earlier report to compare against.")
+
+    def handle(self, *args, **options):
+        if options['voters'] < 1 or options['candidates'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--voters, --candidates and --concurrency must be at least 1")
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        # a throwaway signing key for the stand-in chain, unless one is configured
+        os.environ.setdefault('PRIVATE_KEY', '0x' + hashlib.sha256(f"bench:{options['seed']}".encode()).hexdigest())
+        overrides = {
+            'CHAIN_BACKEND': options['backend'],
+            'CHAIN_SIM_BLOCK_TIME': options['block_time'],
+            'VOTE_SUBMISSION_MODE': options['mode'],
+            'VOTING_RESULTS_SOURCE': options['results_source'] or settings.VOTING_RESULTS_SOURCE,
+        }
+        wallets = None
+        if options['mode'] != 'batched':
+            # the contract takes one ballot per account, so every voter signs
+            # their own vote transaction (batched votes are anchored by a relayer)
+            keys = benchmark.voter_keys(options['voters'], options['seed'])
+            overrides['VOTER_PRIVATE_KEYS'] = ','.join(keys)
+            wallets = [Account.from_key(key).address for key in keys]
+        with override_settings(**overrides):
+            old_name = self._create_database()
+            try:
+                # after the override, so eth-tester funds the voter keys
+                backend = get_chain_backend()
+                report = benchmark.run(
+                    options['voters'], options['candidates'], options['concurrency'], options['seed'],
+                    contract_address=getattr(backend, 'contract_address', None), voter_wallets=wallets,
+                )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self._print(report)
+        if baseline is not None:
+            self._print_comparison(benchmark.compare(report, baseline))
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def _create_database(self):
+        """Create and migrate a test database; returns the name to restore afterwards."""
+        old_name = connection.settings_dict['NAME']
+        test = connection.settings_dict.setdefault('TEST', {})
+        if connection.vendor == 'sqlite' and not test.get('NAME'):
+            # a file, not :memory:, so every worker thread sees the same database
+            test['NAME'] = os.path.join(tempfile.gettempdir(), 'vote_path_benchmark.sqlite3')
+        self.stdout.write("Creating benchmark database...")
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        return old_name
+
+    def _print(self, report):
+        flows, mining, votes = report['flows'], report['mining'], report['votes']
+        self.stdout.write(
+            f"{flows['count']} flows in {flows['duration_s']:.2f}s ({flows['throughput_fps']} flows/s), "
+            f"{votes['accepted']} votes accepted"
+        )
+        self.stdout.write(
+            f"{votes['mined']} votes mined {mining['time_to_mined_s']:.2f}s after the first flow "
+            f"({mining['mined_per_s']} votes/s; drain {mining['drain_s']:.2f}s)"
+        )
+        self.stdout.write(f"{'stage':<20}{'reqs':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+                          f"{'p99 ms':>9}{'sql/req':>9}{'rpc/req':>9}")
+        for stage, s in report['stages'].items():
+            latency = s['latency_ms']
+            self.stdout.write(
+                f"{stage:<20}{s['requests']:>7}{s['errors']:>8}{s['throughput_rps']:>9}{latency['p50']:>9.1f}"
+                f"{latency['p95']:>9.1f}{latency['p99']:>9.1f}{s['sql_queries']['per_request']:>9}"
+                f"{s['rpc']['round_trips_per_request']:>9}"
+            )
+
+    def _print_comparison(self, rows):
+        self.stdout.write("Change against the baseline:")
+        for stage, metric, old, new, change in rows:
+            delta = f"{change:+.1%}" if change is not None else "n/a"
+            self.stdout.write(f"  {stage:<20}{metric:<16}{old!s:>10} -> {new!s:<10} {delta}")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.blockchain import attach_election_contract, deploy_election_contract, election_contract_address
+from main.models import Election
+
+
+class Command(BaseCommand):
+    help = "Show, deploy or attach the VotingContract used by an election."
+
+    def add_arguments(self, parser):
+        parser.add_argument('election', type=int)
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument('--deploy', action='store_true', help="Deploy a new contract if the election has none.")
+        group.add_argument('--attach', metavar='ADDRESS', help="Use an already deployed contract.")
+
+    def handle(self, *args, **options):
+        election_id = options['election']
+        if not Election.objects.filter(pk=election_id).exists():
+            raise CommandError(f"Election {election_id} does not exist")
+
+        if options['attach']:
+            address = attach_election_contract(election_id, options['attach'])
+        elif options['deploy']:
+            address = deploy_election_contract(election_id)
+        else:
+            address = election_contract_address(election_id)
+        self.stdout.write(f"Election {election_id}: {address}")
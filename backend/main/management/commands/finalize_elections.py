@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from main.models import Election
+from main.VotingResult import finalize_result
+
+
+class Command(BaseCommand):
+    help = "Freeze the results of every ended election that has no final snapshot yet."
+
+    def handle(self, *args, **options):
+        pending = Election.objects.filter(end_date__lte=now()).exclude(votingresult__is_final=True)
+        for election in pending:
+            result = finalize_result(election.id, election)
+            if result is None:
+                self.stdout.write(f"{election.name}: votes still settling on the chain, skipped")
+                continue
+            self.stdout.write(f"{election.name}: {result.total_votes} votes, hash {result.content_hash}")
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.synthetic_data import ElectionDataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic elections, candidates, voters, votes and vote transactions "
+        "for query-plan testing. Meant for a scratch database: it appends, and never deletes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=1_000_000)
+        parser.add_argument('--elections', type=int, default=5)
+        parser.add_argument('--candidates', type=int, default=500, help="Candidates per election.")
+        parser.add_argument('--parties', type=int, default=1000)
+        parser.add_argument('--turnout', type=float, default=0.6,
+                            help="Chance that a voter votes in each election.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10_000, help="Voters written per transaction.")
+        parser.add_argument('--password', help="Password of every generated account (default: unusable).")
+
+    def handle(self, *args, **options):
+        if options['candidates'] > options['parties']:
+            raise CommandError("--parties must be at least --candidates: a party fields one candidate per election")
+        if not 0 <= options['turnout'] <= 1:
+            raise CommandError("--turnout must be between 0 and 1")
+
+        generator = ElectionDataGenerator(
+            voters=options['voters'], elections=options['elections'], candidates=options['candidates'],
+            parties=options['parties'], turnout=options['turnout'], seed=options['seed'],
+            batch_size=options['batch_size'], password=options['password'],
+        )
+        started = time.monotonic()
+        ballots = generator.create_ballots()
+        self.stdout.write(
+            f"Created {options['elections']} elections with {options['elections'] * options['candidates']} candidates."
+        )
+
+        votes = 0
+        for voters, batch_votes in generator.create_votes(ballots):
+            votes += batch_votes
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"{voters}/{options['voters']} voters, {votes} votes ({voters / elapsed:.0f} voters/s)")
+
+        generator.finish(ballots)
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {options['voters']} voters and {votes} votes in {time.monotonic() - started:.0f}s."
+        ))
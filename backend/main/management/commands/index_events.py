@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from main.blockchain import get_election_contract
+from main.event_indexer import EventIndexer
+
+
+class Command(BaseCommand):
+    help = "Index VotingContract events into the local database, resuming from the stored cursor."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--election', type=int, help="Index this election's contract instead of the shared one.")
+        parser.add_argument('--start-block', type=int, help="First block to index when no cursor exists yet.")
+        parser.add_argument('--chunk-size', type=int, help="Blocks per eth_getLogs query.")
+        parser.add_argument('--poll-interval', type=float, help="Seconds to wait for new blocks once caught up.")
+        parser.add_argument('--once', action='store_true', help="Catch up to the current head and exit.")
+
+    def handle(self, *args, **options):
+        indexer = EventIndexer(
+            contract=get_election_contract(options['election']),
+            start_block=options['start_block'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(f"Indexing {indexer.address} from block {indexer.cursor.last_block + 1}.")
+        if options['once']:
+            indexer.catch_up()
+            self.stdout.write(f"Indexed up to block {indexer.cursor.last_block}.")
+            return
+        indexer.run(poll_interval=options['poll_interval'])
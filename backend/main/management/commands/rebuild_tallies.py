@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from main.models import Election
+from main.tally import rebuild_tallies
+
+
+class Command(BaseCommand):
+    help = "Recompute CandidateTally rows from the votes table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--election', type=int, help="Only rebuild this election's tallies.")
+
+    def handle(self, *args, **options):
+        election = None
+        if options['election']:
+            election = Election.objects.get(id=options['election'])
+        count = rebuild_tallies(election)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} candidate tallies."))
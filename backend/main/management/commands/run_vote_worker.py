@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from main.confirmations import ConfirmationTracker
+from main.vote_queue import run_worker
+
+
+class Command(BaseCommand):
+    help = "Submit queued votes to the chain and record their receipts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help="Transactions in flight at once.")
+        parser.add_argument('--poll-interval', type=float, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit.")
+        parser.add_argument('--no-tracker', action='store_true',
+                            help="Only broadcast; settle receipts with a separate track_confirmations process.")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Vote worker started.")
+        run_worker(
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+            once=options['once'],
+            tracker=None if options['no_tracker'] else ConfirmationTracker(),
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from main.confirmations import ConfirmationTracker
+
+
+class Command(BaseCommand):
+    help = "Follow new blocks and mark sent vote transactions as mined and confirmed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--confirmations', type=int, help="Blocks deep before a vote counts as confirmed.")
+        parser.add_argument('--poll-interval', type=float, help="Seconds between chain head checks.")
+        parser.add_argument('--once', action='store_true', help="Run a single poll and exit.")
+
+    def handle(self, *args, **options):
+        tracker = ConfirmationTracker(confirmations=options['confirmations'])
+        if options['once']:
+            tracker.poll()
+            return
+        self.stdout.write(f"Tracking confirmations ({tracker.confirmations} block(s)).")
+        tracker.run(poll_interval=options['poll_interval'])
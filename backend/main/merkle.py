@@ -0,0 +1,64 @@
+from eth_abi import encode
+from eth_utils import keccak
+from hexbytes import HexBytes
+
+# Leaves and inner nodes hash different preimages, so an inner node can
+# never be presented as a leaf (a second-preimage attack on the tree).
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def vote_leaf(election_id: int, voter_address: str, candidate_id: int, salt: bytes) -> bytes:
+    """
+    Commitment to one ballot: keccak256(0x00 ++ abi.encode(election, voter,
+    candidate, salt)), so it can be recomputed in Solidity as well. The
+    random salt keeps the choice from being guessed from the leaf.
+    """
+    return keccak(LEAF_PREFIX + encode(
+        ['uint256', 'address', 'uint256', 'bytes32'],
+        [election_id, voter_address, candidate_id, salt],
+    ))
+
+
+def _hash_pair(a: bytes, b: bytes) -> bytes:
+    # sorted pairs, as in OpenZeppelin's MerkleProof, so a proof needs no left/right flags
+    return keccak(NODE_PREFIX + a + b) if a <= b else keccak(NODE_PREFIX + b + a)
+
+
+class MerkleTree:
+    """
+    Binary keccak256 tree over `leaves` (32-byte hashes, in order). A node
+    without a sibling is carried up to the next level unchanged.
+    """
+
+    def __init__(self, leaves):
+        if not leaves:
+            raise ValueError("A Merkle tree needs at least one leaf")
+        self.levels = [[HexBytes(leaf) for leaf in leaves]]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            self.levels.append([
+                _hash_pair(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                for i in range(0, len(level), 2)
+            ])
+
+    @property
+    def root(self) -> bytes:
+        return bytes(self.levels[-1][0])
+
+    def proof(self, index: int) -> list:
+        """Sibling hashes from leaf `index` up to the root."""
+        siblings = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                siblings.append(bytes(level[sibling]))
+            index //= 2
+        return siblings
+
+
+def verify_proof(leaf: bytes, proof, root: bytes) -> bool:
+    node = bytes(HexBytes(leaf))
+    for sibling in proof:
+        node = _hash_pair(node, bytes(HexBytes(sibling)))
+    return node == bytes(HexBytes(root))
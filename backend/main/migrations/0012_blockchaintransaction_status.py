@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_votingresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blockchaintransaction',
+            name='block_number',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='blockchaintransaction',
+            name='error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        # Rows written before queued submission existed were all mined
+        # synchronously, so backfill them as such before switching the default.
+        migrations.AddField(
+            model_name='blockchaintransaction',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('submitted', 'Submitted'), ('mined', 'Mined'), ('failed', 'Failed')], db_index=True, default='mined', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='blockchaintransaction',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('submitted', 'Submitted'), ('mined', 'Mined'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='blockchaintransaction',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_signernonce'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='blockchaintransaction',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('submitted', 'Submitted'), ('sent', 'Sent'), ('mined', 'Mined'), ('confirmed', 'Confirmed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_blockchaintransaction_confirmed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexerCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contract_address', models.CharField(max_length=42, unique=True)),
+                ('last_block', models.BigIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ContractEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contract_address', models.CharField(max_length=42)),
+                ('event', models.CharField(max_length=64)),
+                ('block_number', models.PositiveBigIntegerField()),
+                ('block_hash', models.CharField(max_length=66)),
+                ('transaction_hash', models.CharField(db_index=True, max_length=66)),
+                ('log_index', models.PositiveIntegerField()),
+                ('args', models.JSONField(default=dict)),
+                ('voter', models.CharField(blank=True, db_index=True, default='', max_length=42)),
+                ('candidate', models.PositiveBigIntegerField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['contract_address', 'event', 'block_number'], name='main_contra_contrac_2acab6_idx')],
+                'unique_together': {('transaction_hash', 'log_index')},
+            },
+        ),
+        migrations.CreateModel(
+            name='IndexedBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contract_address', models.CharField(max_length=42)),
+                ('number', models.PositiveBigIntegerField()),
+                ('hash', models.CharField(max_length=66)),
+            ],
+            options={
+                'unique_together': {('contract_address', 'number')},
+            },
+        ),
+    ]
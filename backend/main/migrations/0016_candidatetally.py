@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_tallies(apps, schema_editor):
+    Candidate = apps.get_model('main', 'Candidate')
+    CandidateTally = apps.get_model('main', 'CandidateTally')
+    Vote = apps.get_model('main', 'Vote')
+    counts = dict(Vote.objects.values_list('candidate_id').annotate(n=Count('id')).order_by())
+    CandidateTally.objects.bulk_create([
+        CandidateTally(candidate_id=candidate_id, election_id=election_id, votes=counts.get(candidate_id, 0))
+        for candidate_id, election_id in Candidate.objects.values_list('id', 'election_id')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_contract_event_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateTally',
+            fields=[
+                ('candidate', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tally', serialize=False, to='main.candidate')),
+                ('votes', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='main.election')),
+            ],
+        ),
+        migrations.RunPython(backfill_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0016_candidatetally'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='votingresult',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='votingresult',
+            name='is_final',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='votingresult',
+            name='tallies',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddConstraint(
+            model_name='votingresult',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_final', True)), fields=('election',), name='one_final_result_per_election'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_votingresult_final'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='election',
+            name='contract_address',
+            field=models.CharField(blank=True, default='', max_length=42),
+        ),
+    ]
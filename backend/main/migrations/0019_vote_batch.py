@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_election_contract_address'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blockchaintransaction',
+            name='leaf_index',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='blockchaintransaction',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('submitted', 'Submitted'), ('sent', 'Sent'), ('committed', 'Committed'), ('mined', 'Mined'), ('confirmed', 'Confirmed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='VoteBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('merkle_root', models.CharField(blank=True, db_index=True, default='', max_length=66)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('mined', 'Mined'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10)),
+                ('transaction_hash', models.CharField(blank=True, default='', max_length=66)),
+                ('block_number', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('anchored_at', models.DateTimeField(blank=True, null=True)),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vote_batches', to='main.election')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='blockchaintransaction',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leaves', to='main.votebatch'),
+        ),
+    ]
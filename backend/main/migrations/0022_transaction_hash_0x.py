@@ -0,0 +1,46 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:02
+
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
+
+
+def _prefixed(tx_hash):
+    return tx_hash if tx_hash.startswith('0x') else '0x' + tx_hash
+
+
+def add_prefix(apps, schema_editor):
+    BlockchainTransaction = apps.get_model('main', 'BlockchainTransaction')
+    BlockchainTransaction.objects.exclude(transaction_hash__startswith='0x').update(
+        transaction_hash=Concat(Value('0x'), 'transaction_hash')
+    )
+    # hashes a fee-bumped transaction was sent under before (see main.fee_watchdog)
+    for tx in BlockchainTransaction.objects.filter(data__has_key='replaced'):
+        tx.data['replaced'] = [_prefixed(h) for h in tx.data['replaced']]
+        tx.save(update_fields=['data'])
+
+
+def strip_prefix(apps, schema_editor):
+    BlockchainTransaction = apps.get_model('main', 'BlockchainTransaction')
+    BlockchainTransaction.objects.filter(transaction_hash__startswith='0x').update(
+        transaction_hash=Substr('transaction_hash', 3)
+    )
+    for tx in BlockchainTransaction.objects.filter(data__has_key='replaced'):
+        tx.data['replaced'] = [h.removeprefix('0x') for h in tx.data['replaced']]
+        tx.save(update_fields=['data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0021_circuitbreakerstate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='blockchaintransaction',
+            name='transaction_hash',
+            field=models.CharField(max_length=66, unique=True),
+        ),
+        migrations.RunPython(add_prefix, strip_prefix),
+    ]
@@ -118,6 +118,10 @@ class Election(models.Model):
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # VotingContract holding this election's ballots; empty means the shared
+    # VOTING_CONTRACT_ADDRESS or, with ELECTION_CONTRACTS=per_election, one
+    # deployed on first use (see main.blockchain.election_contract_address).
+    contract_address = models.CharField(max_length=42, blank=True, default='')
 
     def __str__(self):
         return self.name
@@ -151,12 +155,40 @@ class Candidate(models.Model):
 
 
 class BlockchainTransaction(models.Model):
-    transaction_hash = models.CharField(max_length=64, unique=True)
+    STATUS_PENDING = 'pending'
+    STATUS_SUBMITTED = 'submitted'
+    STATUS_SENT = 'sent'
+    STATUS_COMMITTED = 'committed'
+    STATUS_MINED = 'mined'
+    STATUS_CONFIRMED = 'confirmed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SUBMITTED, 'Submitted'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_COMMITTED, 'Committed'),
+        (STATUS_MINED, 'Mined'),
+        (STATUS_CONFIRMED, 'Confirmed'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    # 0x-prefixed hex, like every hash stored by this app
+    transaction_hash = models.CharField(max_length=66, unique=True)
     sender = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='sent_transactions')
     receiver = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='received_transactions')
     timestamp = models.DateTimeField(auto_now_add=True)
     data = models.JSONField()
-    
+    # pending -> submitted (claimed by a worker) -> sent (broadcast) -> mined
+    # -> confirmed (VOTE_CONFIRMATIONS deep, see main.confirmations).
+    # Synchronous votes start out as mined. Batched votes go committed ->
+    # mined once the Merkle root of their VoteBatch is anchored.
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    block_number = models.PositiveBigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+    batch = models.ForeignKey('VoteBatch', on_delete=models.SET_NULL, null=True, blank=True, related_name='leaves')
+    leaf_index = models.PositiveIntegerField(null=True, blank=True)
+
     def __str__(self):
         return self.transaction_hash
     
@@ -167,7 +199,35 @@ class BlockchainTransaction(models.Model):
     
     def generate_hash(self):
         data_string = json.dumps(self.data, sort_keys=True) + str(self.timestamp)
-        return hashlib.sha256(data_string.encode()).hexdigest()
+        return '0x' + hashlib.sha256(data_string.encode()).hexdigest()
+
+
+class VoteBatch(models.Model):
+    """
+    Merkle root over committed votes of one election, anchored on chain in a
+    single transaction (see main.vote_batches).
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_MINED = 'mined'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_MINED, 'Mined'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    election = models.ForeignKey(Election, on_delete=models.CASCADE, related_name='vote_batches')
+    merkle_root = models.CharField(max_length=66, blank=True, default='', db_index=True)
+    size = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    transaction_hash = models.CharField(max_length=66, blank=True, default='')
+    block_number = models.PositiveBigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    anchored_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.election.name} batch {self.pk} ({self.size} votes)"
 
 
 class Vote(models.Model):
@@ -199,6 +259,145 @@ class VotingResult(models.Model):
     winner = models.ForeignKey('Candidate', on_delete=models.CASCADE, null=True, blank=True)
     total_votes = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Final results are frozen once the election has ended (see main.VotingResult)
+    is_final = models.BooleanField(default=False)
+    tallies = models.JSONField(default=dict)
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['election'], condition=models.Q(is_final=True), name='one_final_result_per_election'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.election.name} - {self.winner.user.username if self.winner else 'No winner'}"
+
+    def save(self, *args, **kwargs):
+        if self.pk and VotingResult.objects.filter(pk=self.pk, is_final=True).exists():
+            raise ValidationError("A finalized voting result cannot be changed.")
+        super().save(*args, **kwargs)
+
+    def compute_hash(self):
+        payload = {
+            'election': self.election_id,
+            'winner': self.winner_id,
+            'total_votes': self.total_votes,
+            'tallies': {str(k): v for k, v in self.tallies.items()},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+class SignerNonce(models.Model):
+    """
+    Next nonce to hand out for a signing account. Shared by every worker
+    process through the database so concurrent submissions never collide.
+    """
+    address = models.CharField(max_length=42, unique=True)
+    next_nonce = models.PositiveBigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.address} -> {self.next_nonce}"
+
+
+class CircuitBreakerState(models.Model):
+    """
+    State of a circuit breaker around the chain (see main.circuit_breaker),
+    shared by every worker process through the database.
+    """
+    STATE_CLOSED = 'closed'
+    STATE_OPEN = 'open'
+    STATE_HALF_OPEN = 'half_open'
+    STATE_CHOICES = [
+        (STATE_CLOSED, 'Closed'),
+        (STATE_OPEN, 'Open'),
+        (STATE_HALF_OPEN, 'Half-open'),
+    ]
+
+    name = models.CharField(max_length=50, unique=True)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=STATE_CLOSED)
+    failures = models.PositiveIntegerField(default=0)
+    # when the breaker opened, or when the half-open trial call started
+    opened_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.state} ({self.failures} failures)"
+
+
+class ContractEvent(models.Model):
+    """A VotingContract log, mirrored locally by `manage.py index_events`."""
+    contract_address = models.CharField(max_length=42)
+    event = models.CharField(max_length=64)
+    block_number = models.PositiveBigIntegerField()
+    block_hash = models.CharField(max_length=66)
+    transaction_hash = models.CharField(max_length=66, db_index=True)
+    log_index = models.PositiveIntegerField()
+    args = models.JSONField(default=dict)
+    # Denormalised VoteCast arguments for audit and tally lookups
+    voter = models.CharField(max_length=42, blank=True, default='', db_index=True)
+    candidate = models.PositiveBigIntegerField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        unique_together = ('transaction_hash', 'log_index')
+        indexes = [models.Index(fields=['contract_address', 'event', 'block_number'])]
+
+    def __str__(self):
+        return f"{self.event} @ {self.block_number}:{self.log_index}"
+
+
+class IndexedBlock(models.Model):
+    """Hash of a recently indexed block, kept to detect reorgs."""
+    contract_address = models.CharField(max_length=42)
+    number = models.PositiveBigIntegerField()
+    hash = models.CharField(max_length=66)
+
+    class Meta:
+        unique_together = ('contract_address', 'number')
+
+
+class IndexerCursor(models.Model):
+    """Last block whose events have been indexed for a contract."""
+    contract_address = models.CharField(max_length=42, unique=True)
+    last_block = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.contract_address} @ {self.last_block}"
+
+
+class CandidateTally(models.Model):
+    """
+    Running vote count per candidate, kept in step with Vote rows inside the
+    same transaction (see main.tally). Rebuild with `manage.py rebuild_tallies`.
+    """
+    candidate = models.OneToOneField(Candidate, on_delete=models.CASCADE, primary_key=True, related_name='tally')
+    election = models.ForeignKey(Election, on_delete=models.CASCADE, related_name='tallies')
+    votes = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.candidate} - {self.votes}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Outcome of a POST sent with an Idempotency-Key header, replayed to
+    retries of the same request (see main.idempotency). The response is
+    empty while the first attempt is still running.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    endpoint = models.CharField(max_length=50)
+    fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'endpoint', 'key')
 
     def __str__(self):
-        return f"{self.election.name} - {self.winner.user.username if self.winner else 'No winner'}"
\ No newline at end of file
+        return f"{self.endpoint} {self.key} ({self.response_status or 'in progress'})"
@@ -0,0 +1,108 @@
+from django.conf import settings
+from web3 import Web3
+
+from .rpc_batch import RpcBatch, RpcCallError, encode_call
+
+# Minimal Multicall3 ABI (https://github.com/mds1/multicall): just aggregate3.
+MULTICALL3_ABI = [{
+    'name': 'aggregate3',
+    'type': 'function',
+    'stateMutability': 'payable',
+    'inputs': [{
+        'name': 'calls', 'type': 'tuple[]', 'components': [
+            {'name': 'target', 'type': 'address'},
+            {'name': 'allowFailure', 'type': 'bool'},
+            {'name': 'callData', 'type': 'bytes'},
+        ],
+    }],
+    'outputs': [{
+        'name': 'returnData', 'type': 'tuple[]', 'components': [
+            {'name': 'success', 'type': 'bool'},
+            {'name': 'returnData', 'type': 'bytes'},
+        ],
+    }],
+}]
+
+
+class AggregateRead:
+    """
+    Resolves many contract reads in one round trip.
+
+        reads = AggregateRead(get_web3())
+        reads.add(contract.functions.getWinner())
+        reads.add(contract.functions.candidateVotes(1))
+        winner, votes = reads.execute()
+
+    When a Multicall3 contract is deployed at MULTICALL3_ADDRESS, all reads
+    go out as a single `eth_call` to `aggregate3`, and the node runs them in
+    one EVM call. Local chains without it, such as Ganache, get one JSON-RPC
+    batch of plain `eth_call`s instead. Either way the results come back in
+    order, and a reverted read yields an `RpcCallError` in its slot.
+    """
+
+    def __init__(self, w3, cache=None):
+        self.w3 = w3
+        self.cache = cache  # ChainMetadataCache remembering whether Multicall3 is deployed
+        self._calls = []
+
+    def add(self, contract_function) -> int:
+        self._calls.append(contract_function)
+        return len(self._calls) - 1
+
+    def _multicall_address(self):
+        address = settings.MULTICALL3_ADDRESS
+        return Web3.to_checksum_address(address) if address else None
+
+    def _aggregate(self, address, calls):
+        # sent as a raw eth_call, skipping web3's per-call middleware round trips
+        encoded = [encode_call(fn) for fn in calls]
+        multicall = self.w3.eth.contract(address=address, abi=MULTICALL3_ABI)
+        batch = RpcBatch(self.w3)
+        batch.call(multicall.functions.aggregate3([(to, True, data) for to, data, _ in encoded]))
+        return encoded, batch
+
+    def _decode(self, calls, encoded, returned):
+        results = []
+        for fn, (_, _, decode_output), (success, data) in zip(calls, encoded, returned):
+            if not success:
+                results.append(RpcCallError('eth_call', f"{fn.fn_name} reverted"))
+                continue
+            try:
+                results.append(decode_output(data))
+            except Exception as e:
+                results.append(RpcCallError('eth_call', e))
+        return results
+
+    def _batch(self, calls) -> RpcBatch:
+        batch = RpcBatch(self.w3)
+        for fn in calls:
+            batch.call(fn)
+        return batch
+
+    def execute(self) -> list:
+        calls, self._calls = self._calls, []
+        if not calls:
+            return []
+        address = self._multicall_address()
+
+        def has_code():
+            return len(self.w3.eth.get_code(address)) > 0
+
+        if address and (self.cache.get(('multicall', address), has_code) if self.cache else has_code()):
+            encoded, batch = self._aggregate(address, calls)
+            return self._decode(calls, encoded, batch.execute(raise_errors=True)[0])
+        return self._batch(calls).execute()
+
+    async def async_execute(self) -> list:
+        calls, self._calls = self._calls, []
+        if not calls:
+            return []
+        address = self._multicall_address()
+
+        async def has_code():
+            return len(await self.w3.eth.get_code(address)) > 0
+
+        if address and await (self.cache.aget(('multicall', address), has_code) if self.cache else has_code()):
+            encoded, batch = self._aggregate(address, calls)
+            return self._decode(calls, encoded, (await batch.async_execute(raise_errors=True))[0])
+        return await self._batch(calls).async_execute()
@@ -0,0 +1,153 @@
+from eth_abi import decode, encode
+from eth_utils import to_bytes, to_hex
+from eth_utils.abi import function_abi_to_4byte_selector, get_abi_input_types, get_abi_output_types
+
+
+class RpcCallError(Exception):
+    """Error returned by the node for a single call inside a batch."""
+
+    def __init__(self, method: str, error):
+        self.method = method
+        if isinstance(error, dict):
+            self.code = error.get('code')
+            self.message = error.get('message', str(error))
+        else:
+            self.code = None
+            self.message = str(error)
+        super().__init__(f"{method} failed: {self.message}")
+
+
+def to_int(value):
+    return int(value, 16) if isinstance(value, str) else value
+
+
+def encode_call(contract_function):
+    """
+    Return `(to, calldata, decode)` for a bound contract function, where
+    `decode(raw_bytes)` turns the call's return data into Python values.
+    """
+    abi = contract_function.abi
+    data = function_abi_to_4byte_selector(abi) + encode(
+        get_abi_input_types(abi), contract_function.args
+    )
+    output_types = get_abi_output_types(abi)
+
+    def decode_output(raw):
+        values = decode(output_types, raw)
+        return values[0] if len(values) == 1 else values
+
+    return contract_function.address, data, decode_output
+
+
+class RpcBatch:
+    """
+    Collects independent JSON-RPC calls and sends them as one HTTP batch.
+
+        batch = RpcBatch(w3)
+        batch.request('eth_gasPrice', formatter=to_int)
+        batch.call(contract.functions.candidateVotes(1))
+        gas_price, votes = batch.execute(raise_errors=True)
+
+    `execute` (or `async_execute` for an AsyncWeb3 client) returns results
+    in the order the calls were added. A call the node rejects yields an
+    `RpcCallError` in its slot instead of failing the whole batch. Providers
+    or nodes without batch support fall back to sending the calls one by one.
+    """
+
+    def __init__(self, w3):
+        self.w3 = w3
+        self._calls = []
+
+    def __len__(self):
+        return len(self._calls)
+
+    def request(self, method: str, params=(), formatter=None) -> int:
+        """Queue a raw RPC call; returns its index in the result list."""
+        self._calls.append((method, list(params), formatter))
+        return len(self._calls) - 1
+
+    def call(self, contract_function, block_identifier='latest') -> int:
+        """Queue an `eth_call` of a bound contract function (e.g. `fn(1)`)."""
+        to, data, decode_output = encode_call(contract_function)
+        return self.request(
+            'eth_call',
+            [{'to': to, 'data': to_hex(data)}, block_identifier],
+            lambda raw: decode_output(to_bytes(hexstr=raw)),
+        )
+
+    def _format(self, method, response, formatter):
+        if 'error' in response:
+            return RpcCallError(method, response['error'])
+        try:
+            result = response.get('result')
+            return formatter(result) if formatter else result
+        except Exception as e:
+            return RpcCallError(method, e)
+
+    def _send_one_by_one(self, payload):
+        responses = []
+        for method, params in payload:
+            try:
+                responses.append(self.w3.provider.make_request(method, params))
+            except Exception as e:
+                responses.append({'error': {'message': str(e)}})
+        return responses
+
+    def _results(self, calls, responses, raise_errors):
+        results = [
+            self._format(method, response, formatter)
+            for (method, _, formatter), response in zip(calls, responses)
+        ]
+        if raise_errors:
+            for result in results:
+                if isinstance(result, RpcCallError):
+                    raise result
+        return results
+
+    def execute(self, raise_errors: bool = False) -> list:
+        calls, self._calls = self._calls, []
+        if not calls:
+            return []
+
+        payload = [(method, params) for method, params, _ in calls]
+        if len(payload) == 1 or not hasattr(self.w3.provider, 'make_batch_request'):
+            responses = self._send_one_by_one(payload)
+        else:
+            try:
+                responses = self.w3.provider.make_batch_request(payload)
+            except Exception:
+                responses = None
+            # Nodes that reject batching answer with a single error object.
+            if not isinstance(responses, list) or len(responses) != len(payload):
+                responses = self._send_one_by_one(payload)
+
+        return self._results(calls, responses, raise_errors)
+
+    # -- async (AsyncWeb3 clients) -- #
+
+    async def _async_send_one_by_one(self, payload):
+        responses = []
+        for method, params in payload:
+            try:
+                responses.append(await self.w3.provider.make_request(method, params))
+            except Exception as e:
+                responses.append({'error': {'message': str(e)}})
+        return responses
+
+    async def async_execute(self, raise_errors: bool = False) -> list:
+        calls, self._calls = self._calls, []
+        if not calls:
+            return []
+
+        payload = [(method, params) for method, params, _ in calls]
+        if len(payload) == 1:
+            responses = await self._async_send_one_by_one(payload)
+        else:
+            try:
+                responses = await self.w3.provider.make_batch_request(payload)
+            except Exception:
+                responses = None
+            if not isinstance(responses, list) or len(responses) != len(payload):
+                responses = await self._async_send_one_by_one(payload)
+
+        return self._results(calls, responses, raise_errors)
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from .models import * 
 from django.contrib.auth import get_user_model 
 from rest_framework.validators import UniqueTogetherValidator
+from web3 import Web3
 
 User = get_user_model()
 
@@ -109,7 +110,18 @@ class CandidateSerializer(serializers.ModelSerializer):
 class BlockchainTransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = BlockchainTransaction
-        fields = ['id', 'transaction_hash', 'sender', 'receiver', 'timestamp', 'data']
+        fields = ['id', 'transaction_hash', 'sender', 'receiver', 'timestamp', 'data',
+                  'status', 'block_number']
+
+class VoteReceiptSerializer(serializers.ModelSerializer):
+    receipt_id = serializers.IntegerField(source='id', read_only=True)
+    election = serializers.IntegerField(source='data.election', read_only=True, default=None)
+    candidate = serializers.IntegerField(source='data.candidate', read_only=True, default=None)
+
+    class Meta:
+        model = BlockchainTransaction
+        fields = ['receipt_id', 'status', 'transaction_hash', 'block_number', 'error',
+                  'election', 'candidate', 'batch', 'timestamp', 'updated_at']
 
 class VoteSerializer(serializers.ModelSerializer):
     voter = serializers.HiddenField(default=serializers.CurrentUserDefault())
@@ -137,6 +149,12 @@ class VoteSerializer(serializers.ModelSerializer):
             )
         ]
 
+    def validate(self, attrs):
+        # every submission mode casts or commits the ballot from this address
+        if not Web3.is_address(attrs['voter'].wallet_address or ''):
+            raise serializers.ValidationError("Your account has no valid wallet address to vote from.")
+        return attrs
+
     def create(self, validated_data):
         candidate_obj = validated_data.pop('candidate_id')
         transaction = validated_data.pop('transaction')
@@ -162,4 +180,12 @@ class VerifyOtpSerializer(serializers.Serializer):
 class VotingResultSerializer(serializers.ModelSerializer):
     class Meta:
         model = VotingResult
-        fields = ['id', 'election', 'winner', 'total_votes', 'created_at']
\ No newline at end of file
+        fields = ['id', 'election', 'winner', 'total_votes', 'tallies', 'is_final', 'content_hash', 'created_at']
+
+class ContractEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ContractEvent
+        fields = [
+            'id', 'event', 'block_number', 'block_hash', 'transaction_hash',
+            'log_index', 'voter', 'candidate', 'args',
+        ]
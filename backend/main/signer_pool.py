@@ -0,0 +1,203 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from eth_account import Account
+from web3 import Web3
+
+from .models import SignerNonce
+from .rpc_batch import RpcBatch, to_int
+
+logger = logging.getLogger(__name__)
+
+
+class Signer:
+    def __init__(self, private_key: str):
+        self.private_key = private_key
+        self.address = Account.from_key(private_key).address
+        self.pending = 0   # transactions handed out by this process and not yet released
+        self.sent = 0
+        # from the last refresh_balances(): wei, and how many of the account's
+        # nonces other processes have handed out that are not mined yet
+        self.balance = None
+        self.backlog = 0
+
+    def as_dict(self) -> dict:
+        return {
+            'address': self.address,
+            'pending': self.pending,
+            'backlog': self.backlog,
+            'sent': self.sent,
+            'balance': self.balance,
+        }
+
+
+class SignerPool:
+    """
+    Relayer accounts for contract administration transactions.
+
+    One sender's transactions are ordered strictly by nonce. Spreading the
+    work across accounts, each with its own SignerNonce counter, lets them
+    be mined in parallel. `acquire()` picks an account round-robin or the
+    one with the fewest transactions in flight, counting those of other
+    worker processes as of the last refresh. Accounts whose last known
+    balance is below SIGNER_MIN_BALANCE are skipped until they are funded.
+
+    With a `web3` loader, `acquire()` refreshes the balances itself once
+    they are `refresh_interval` seconds old, so worker commands without the
+    health probe keep them current too.
+    """
+
+    def __init__(self, private_keys, strategy: str = 'least_pending', min_balance: int = 0,
+                 web3=None, refresh_interval: float = 0):
+        if not private_keys:
+            raise RuntimeError("PRIVATE_KEY not set in environment")
+        self.signers = [Signer(key) for key in private_keys]
+        self.strategy = strategy
+        self.min_balance = min_balance
+        self.web3 = web3
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._next = 0
+        self._refreshed_at = None
+        self._refreshing = False
+
+    def _funded(self):
+        return [
+            s for s in self.signers
+            if s.balance is None or s.balance >= self.min_balance
+        ]
+
+    def _pick(self) -> Signer:
+        candidates = self._funded()
+        if not candidates:
+            raise RuntimeError("Every signer account is below the minimum balance")
+        # rotate the starting point so ties are spread round-robin as well
+        start = self._next % len(candidates)
+        self._next += 1
+        rotated = candidates[start:] + candidates[:start]
+        if self.strategy == 'round_robin':
+            return rotated[0]
+        return min(rotated, key=lambda s: s.pending + s.backlog)
+
+    def _refresh_if_stale(self):
+        if self.web3 is None or self.refresh_interval <= 0:
+            return
+        with self._lock:
+            fresh = self._refreshed_at is not None and time.monotonic() - self._refreshed_at < self.refresh_interval
+            if fresh or self._refreshing:
+                return
+            self._refreshing = True
+        try:
+            self.refresh_balances(self.web3())
+        except Exception as e:
+            logger.warning("Refreshing signer balances failed: %s", e)
+            self._refreshed_at = time.monotonic()  # retried after the interval, not on every acquire
+        finally:
+            self._refreshing = False
+
+    @contextmanager
+    def acquire(self, refresh: bool = True):
+        """
+        Reserve a signer for one transaction; hold it until the receipt is in.
+        `refresh=False` skips the (blocking) balance refresh.
+        """
+        if refresh:
+            self._refresh_if_stale()
+        with self._lock:
+            signer = self._pick()
+            signer.pending += 1
+            signer.sent += 1
+        try:
+            yield signer
+        finally:
+            with self._lock:
+                signer.pending -= 1
+
+    def refresh_balances(self, w3):
+        """
+        Reload every account's balance and mined nonce in one batched round
+        trip. Nonces reserved in SignerNonce beyond the mined one, less this
+        process's own pending transactions, are the other workers' backlog.
+        """
+        batch = RpcBatch(w3)
+        for signer in self.signers:
+            batch.request('eth_getBalance', [signer.address, 'latest'], to_int)
+            batch.request('eth_getTransactionCount', [signer.address, 'latest'], to_int)
+        results = batch.execute()
+        reserved = dict(
+            SignerNonce.objects.filter(address__in=[s.address for s in self.signers])
+            .values_list('address', 'next_nonce')
+        )
+        for i, signer in enumerate(self.signers):
+            balance, mined = results[2 * i], results[2 * i + 1]
+            if not isinstance(mined, Exception) and signer.address in reserved:
+                signer.backlog = max(0, reserved[signer.address] - mined - signer.pending)
+            if isinstance(balance, Exception):
+                continue
+            if balance < self.min_balance and (signer.balance is None or signer.balance >= self.min_balance):
+                logger.warning("Signer %s is low on funds (%s wei); skipping it", signer.address, balance)
+            signer.balance = balance
+        self._refreshed_at = time.monotonic()
+
+    def stats(self) -> list:
+        with self._lock:
+            return [s.as_dict() for s in self.signers]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configured_keys() -> list:
+    keys = [k.strip() for k in settings.SIGNER_PRIVATE_KEYS.split(',') if k.strip()]
+    if not keys and os.getenv('PRIVATE_KEY'):
+        keys = [os.getenv('PRIVATE_KEY')]
+    return keys
+
+
+@lru_cache(maxsize=None)
+def _address_of(key: str) -> str:
+    return Account.from_key(key).address
+
+
+def voter_keys() -> dict:
+    """Custodial voter keys from VOTER_PRIVATE_KEYS, by address."""
+    return _voter_keys(settings.VOTER_PRIVATE_KEYS)
+
+
+@lru_cache(maxsize=1)
+def _voter_keys(raw: str) -> dict:
+    return {_address_of(key): key for key in (k.strip() for k in raw.split(',')) if key}
+
+
+def private_key_for(address: str):
+    """Configured key (a voter key, a pool key or PRIVATE_KEY) that signs for `address`, or None."""
+    address = Web3.to_checksum_address(address)
+    key = voter_keys().get(address)
+    if key:
+        return key
+    for key in configured_keys() + [os.getenv('PRIVATE_KEY')]:
+        if key and _address_of(key) == address:
+            return key
+    return None
+
+
+def get_signer_pool() -> SignerPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from .web3_provider import get_web3
+                _pool = SignerPool(
+                    configured_keys(),
+                    strategy=settings.SIGNER_SELECTION,
+                    min_balance=Web3.to_wei(settings.SIGNER_MIN_BALANCE, 'ether'),
+                    web3=get_web3,
+                    refresh_interval=settings.SIGNER_REFRESH_INTERVAL,
+                )
+    return _pool
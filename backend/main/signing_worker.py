@@ -0,0 +1,19 @@
+"""
+Entry point of the BatchSigner pool processes (see main.tx_signing).
+
+Spawned children import this module to unpickle `sign_batch`, so it must
+stay free of Django, settings and web3 imports: only eth_account.
+"""
+from eth_account import Account
+
+
+def sign_batch(batch: list) -> list:
+    """The raw transaction, or the error, for each (tx, key)."""
+    signed = []
+    for tx, private_key in batch:
+        try:
+            signed.append(bytes(Account.sign_transaction(tx, private_key).raw_transaction))
+        except Exception as e:
+            # plain ValueError so the error always pickles back to the parent
+            signed.append(ValueError(f"{type(e).__name__}: {e}"))
+    return signed
@@ -0,0 +1,136 @@
+"""
+Synthetic election data at production volumes, for query-plan and index
+work (see the generate_election_data command).
+
+Rows are written with bulk_create in streaming batches, with primary keys
+assigned up front so votes can point at their transactions without reading
+anything back. Model save() overrides and signals are skipped: every
+account shares one password hash, and transaction hashes are derived from
+the seed and row id instead of BlockchainTransaction.generate_hash. The
+same seed on an empty database always gives the same rows.
+"""
+import hashlib
+from datetime import timedelta
+from itertools import accumulate
+from random import Random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.timezone import now
+
+from .models import BlockchainTransaction, Candidate, CustomUser, Election, Party, Vote
+from .tally import rebuild_tallies
+
+GENERATED_MODELS = (CustomUser, Party, Election, Candidate, BlockchainTransaction, Vote)
+
+
+def _next_id(model) -> int:
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+def _user(uid: int, password: str, role: str) -> CustomUser:
+    return CustomUser(
+        id=uid, username=f"{role}{uid}", email=f"{role}{uid}@example.invalid", password=password,
+        role=role, voter_id=f"SYN{uid:012d}", phone_number=f"{uid:010d}",
+        wallet_address='0x' + hashlib.sha256(f"wallet:{uid}".encode()).hexdigest()[:40],
+        is_staff=False, is_verified=True,
+    )
+
+
+class ElectionDataGenerator:
+    """
+    Writes `elections` elections with `candidates` candidates each (drawn from
+    `parties` parties), then `voters` voters who each vote in every election
+    with probability `turnout`. Candidate popularity is skewed, so the vote
+    counts look like a real election and not a uniform spread.
+    """
+
+    def __init__(self, voters: int, elections: int, candidates: int, parties: int,
+                 turnout: float, seed: int, batch_size: int, password: str = None):
+        self.voters = voters
+        self.elections = elections
+        self.candidates = candidates
+        self.parties = parties
+        self.turnout = turnout
+        self.seed = seed
+        self.batch_size = batch_size
+        self.password = make_password(password)
+        self.rng = Random(seed)
+
+    def create_ballots(self) -> list:
+        """Parties, elections and candidates; returns `(election, candidate ids, cumulative weights)`."""
+        first = _next_id(Party)
+        party_ids = range(first, first + self.parties)
+        Party.objects.bulk_create([Party(id=pid, name=f"Synthetic party {self.seed}-{pid}") for pid in party_ids])
+
+        start = now() - timedelta(days=1)
+        first = _next_id(Election)
+        elections = Election.objects.bulk_create([
+            Election(
+                id=eid, name=f"Synthetic election {self.seed}-{eid}", description="Generated test data.",
+                start_date=start, end_date=start + timedelta(days=2),
+            )
+            for eid in range(first, first + self.elections)
+        ])
+
+        uid, cid = _next_id(CustomUser), _next_id(Candidate)
+        ballots = []
+        for election in elections:
+            users = [_user(uid + i, self.password, 'candidate') for i in range(self.candidates)]
+            candidates = [
+                Candidate(id=cid + i, user_id=user.id, election_id=election.id, party_id=party_id)
+                # at most one candidate per party in an election
+                for i, (user, party_id) in enumerate(zip(users, self.rng.sample(party_ids, self.candidates)))
+            ]
+            with transaction.atomic():
+                CustomUser.objects.bulk_create(users)
+                Candidate.objects.bulk_create(candidates)
+                Election.candidates.through.objects.bulk_create([
+                    Election.candidates.through(election_id=election.id, customuser_id=user.id) for user in users
+                ])
+            weights = [self.rng.paretovariate(1.5) for _ in candidates]
+            ballots.append((election, [c.id for c in candidates], list(accumulate(weights))))
+            uid += self.candidates
+            cid += self.candidates
+        return ballots
+
+    def create_votes(self, ballots: list):
+        """Voters with their votes and vote transactions, one batch at a time. Yields progress."""
+        uid, tx_id, vote_id = _next_id(CustomUser), _next_id(BlockchainTransaction), _next_id(Vote)
+        for offset in range(0, self.voters, self.batch_size):
+            users = [_user(uid + i, self.password, 'voter') for i in range(min(self.batch_size, self.voters - offset))]
+            txs, votes = [], []
+            for election, candidate_ids, cum_weights in ballots:
+                voting = [user for user in users if self.rng.random() < self.turnout]
+                choices = self.rng.choices(candidate_ids, cum_weights=cum_weights, k=len(voting))
+                for user, candidate_id in zip(voting, choices):
+                    txs.append(BlockchainTransaction(
+                        id=tx_id,
+                        transaction_hash='0x' + hashlib.sha256(f"{self.seed}:{tx_id}".encode()).hexdigest(),
+                        sender_id=user.id, receiver_id=user.id, data={'candidate': candidate_id},
+                        status=BlockchainTransaction.STATUS_MINED, block_number=tx_id // 100 + 1,
+                    ))
+                    votes.append(Vote(
+                        id=vote_id, voter_id=user.id, election_id=election.id,
+                        candidate_id=candidate_id, transaction_id=tx_id,
+                    ))
+                    tx_id += 1
+                    vote_id += 1
+            with transaction.atomic():
+                CustomUser.objects.bulk_create(users)
+                BlockchainTransaction.objects.bulk_create(txs)
+                Vote.objects.bulk_create(votes)
+            uid += len(users)
+            yield offset + len(users), len(votes)
+
+    def finish(self, ballots: list):
+        """Recount the generated elections' tallies and move sequences past the explicit ids."""
+        for election, _, _ in ballots:
+            rebuild_tallies(election)
+        statements = connection.ops.sequence_reset_sql(no_style(), GENERATED_MODELS)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
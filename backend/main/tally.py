@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Candidate, CandidateTally, Vote
+
+
+def count_vote(candidate, election, delta: int = 1):
+    """
+    Add `delta` to the candidate's tally. Call inside the transaction that
+    creates or deletes the Vote; the F() update is applied by the database,
+    so concurrent voters never lose increments. Accepts instances or ids.
+    """
+    candidate_id = getattr(candidate, 'pk', candidate)
+    election_id = getattr(election, 'pk', election)
+    tally = CandidateTally.objects.filter(candidate_id=candidate_id)
+    if not tally.update(votes=F('votes') + delta, updated_at=timezone.now()):
+        # first vote for this candidate; get_or_create copes with a concurrent insert
+        CandidateTally.objects.get_or_create(candidate_id=candidate_id, defaults={'election_id': election_id})
+        tally.update(votes=F('votes') + delta, updated_at=timezone.now())
+
+
+def election_tallies(election) -> dict:
+    """Votes per Candidate id for `election`, including candidates without votes."""
+    counts = dict(
+        CandidateTally.objects.filter(election=election).values_list('candidate_id', 'votes')
+    )
+    candidate_ids = Candidate.objects.filter(election=election).order_by('id').values_list('id', flat=True)
+    return {candidate_id: counts.get(candidate_id, 0) for candidate_id in candidate_ids}
+
+
+@transaction.atomic
+def rebuild_tallies(election=None) -> int:
+    """Recount tallies from the Vote table; returns the number of rows written."""
+    candidates = Candidate.objects.all()
+    votes = Vote.objects.all()
+    if election is not None:
+        candidates = candidates.filter(election=election)
+        votes = votes.filter(election=election)
+
+    counts = dict(votes.values_list('candidate_id').annotate(n=Count('id')).order_by())
+    CandidateTally.objects.filter(candidate__in=candidates).delete()
+    tallies = CandidateTally.objects.bulk_create([
+        CandidateTally(candidate_id=candidate_id, election_id=election_id, votes=counts.get(candidate_id, 0))
+        for candidate_id, election_id in candidates.values_list('id', 'election_id')
+    ])
+    return len(tallies)
@@ -1,3 +1,1030 @@
-from django.test import TestCase
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.timezone import now
+from eth_account import Account
+from hexbytes import HexBytes
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIRequestFactory, force_authenticate
+from web3 import Web3
+
+from . import voted_set, web3_failover
+from .blockchain import (
+    attach_election_contract, fetch_winner_and_votes, get_election_contract, get_total_votes, open_voting_on_chain,
+    send_vote_transaction, vote_on_chain,
+)
+from .benchmark import RpcCounter
+from .chain_backends import RpcBackend, SimulatorBackend, get_chain_backend
+from .chain_cache import ChainMetadataCache
+from .chain_sim import AsyncSimulatedProvider, SimulatedProvider, VotingState, get_simulated_chain
+from .circuit_breaker import ChainUnavailable, achain_guard, chain_guard
+from .confirmations import ConfirmationTracker
+from .event_indexer import EventIndexer
+from .fee_watchdog import StuckTransactionWatchdog
+from .fees import bump_fees, fee_params
+from .web3_provider import PooledHTTPProvider, get_async_web3, get_contract, get_web3
+from .VotingResult import compute_result, get_voting_result
+from .idempotency import arun_idempotent, claim, complete
+from .live_results import ElectionFeed
+from .rpc_batch import RpcBatch, RpcCallError, to_int
+from .models import (
+    BlockchainTransaction, Candidate, CandidateTally, ContractEvent, CustomUser, Election, IdempotencyKey,
+    IndexerCursor, Party, SignerNonce, Vote, VoteBatch, VotingResult,
+)
+from .tx_signing import BatchSigner
+from .signer_pool import SignerPool
+from .tally import count_vote, election_tallies, rebuild_tallies
+from .serializers import VoteReceiptSerializer, VoteSerializer
+from .views import CandidateViewSet, ContractEventViewSet, VoteViewSet
+from .merkle import vote_leaf
+from .vote_batches import claim_batch, commit_vote, inclusion_proof, release_stale, run_anchorer
+from .vote_queue import claim_pending, enqueue_vote, process_transaction, record_vote, release_stale_claims
+
+
+def make_user(n: int, **fields) -> CustomUser:
+    fields.setdefault('wallet_address', '0x' + f"{n:040x}")
+    return CustomUser.objects.create(
+        username=f"user{n}", email=f"user{n}@example.com", voter_id=f"V{n:08d}", phone_number=f"{n:010d}", **fields,
+    )
+
+
+def make_election(candidates: int = 1):
+    election = Election.objects.create(
+        name="Test election", description="", start_date=now() - timedelta(hours=1), end_date=now() + timedelta(days=1),
+    )
+    return election, [
+        Candidate.objects.create(user=make_user(1000 + i, role='candidate'), election=election)
+        for i in range(candidates)
+    ]
+
+
+class BatchConfirmationTests(TestCase):
+    """Anchored votes are confirmed through their batch, not their leaf hash."""
+
+    ANCHOR_HASH = '0x' + 'ab' * 32
+
+    def setUp(self):
+        self.election, (self.candidate,) = make_election()
+        for i in range(3):
+            commit_vote(make_user(i), self.election, self.candidate)
+        self.batch = claim_batch(self.election.id, 10)
+        # what anchor_batch leaves behind once the root is mined in block 5
+        self.batch.status = VoteBatch.STATUS_MINED
+        self.batch.transaction_hash = self.ANCHOR_HASH
+        self.batch.block_number = 5
+        self.batch.save()
+        self.batch.leaves.update(status=BlockchainTransaction.STATUS_MINED, block_number=5)
+
+    def fetch_receipts(self, hashes):
+        # the node only knows the anchor transaction; leaf hashes have no receipt
+        return {h: {'status': '0x1', 'blockNumber': '0x5'} if h == self.ANCHOR_HASH else None for h in hashes}
+
+    @override_settings(VOTE_RECEIPT_TIMEOUT=0)
+    def test_leaves_survive_polls_and_sweeps(self):
+        tracker = ConfirmationTracker(confirmations=2)
+        with mock.patch('main.confirmations._fetch_receipts', side_effect=self.fetch_receipts):
+            tracker.confirm(head=5)
+            tracker.confirm_batches(head=5)
+            tracker.sweep()
+            statuses = set(self.batch.leaves.values_list('status', 'block_number'))
+            self.assertEqual(statuses, {(BlockchainTransaction.STATUS_MINED, 5)})
+
+            tracker.confirm(head=6)
+            tracker.confirm_batches(head=6)
+            tracker.sweep()
+
+        statuses = set(self.batch.leaves.values_list('status', 'block_number'))
+        self.assertEqual(statuses, {(BlockchainTransaction.STATUS_CONFIRMED, 5)})
+        self.assertEqual(Vote.objects.filter(election=self.election).count(), 3)
+        self.assertEqual(CandidateTally.objects.get(candidate=self.candidate).votes, 3)
+
+
+class ChainCacheTests(SimpleTestCase):
+    """The metadata cache stays bounded however many wallets vote."""
+
+    def test_least_recently_used_keys_are_evicted(self):
+        cache = ChainMetadataCache(max_entries=2)
+        cache.set(('balance', 'a'), 1)
+        cache.set(('balance', 'b'), 2)
+        self.assertEqual(cache.get(('balance', 'a'), self.fail), 1)
+        cache.set(('balance', 'c'), 3)
+        self.assertEqual(cache.get(('balance', 'b'), lambda: 20), 20)
+        self.assertEqual(cache.get(('balance', 'a'), lambda: 10), 10)
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_expired_entries_are_dropped_when_read(self):
+        clock = [0]
+        cache = ChainMetadataCache(clock=lambda: clock[0])
+        cache.set('chain_id', 1)
+        cache.set('gas_price', 5, ttl=10)
+        clock[0] = 11
+        # a failed reload is not stored, so only the expired entry's removal shows
+        failed = cache.get_many({'gas_price': (10, False)}, lambda missing: {'gas_price': RuntimeError("down")})
+        self.assertIsInstance(failed['gas_price'], RuntimeError)
+        self.assertEqual(cache.stats()['entries'], 1)
+
+
+class FakeBatch:
+    """RpcBatch stand-in answering from `node`, a map of method to `params -> result`."""
+
+    def __init__(self, node):
+        self.node = node
+        self.calls = []
+
+    def request(self, method, params=(), formatter=None):
+        self.calls.append((method, list(params)))
+
+    def execute(self, raise_errors=False):
+        return [self.node[method](params) for method, params in self.calls]
+
+
+class ReceiptTimeoutTests(TestCase):
+    """A sent vote without a receipt is failed only once the node has let go of it."""
+
+    SENDER = '0x' + '11' * 20
+
+    def setUp(self):
+        self.election, (self.candidate,) = make_election()
+        self.vote = enqueue_vote(make_user(1), self.election, self.candidate)
+        self.tx = self.vote.transaction
+        BlockchainTransaction.objects.filter(pk=self.tx.pk).update(
+            status=BlockchainTransaction.STATUS_SENT, transaction_hash='0x' + 'aa' * 32,
+            updated_at=now() - timedelta(minutes=5),
+        )
+
+    def sweep(self, pending, mined_nonce=0):
+        node = {
+            'eth_getTransactionByHash': lambda params: pending,
+            'eth_getTransactionCount': lambda params: mined_nonce,
+        }
+        with mock.patch('main.confirmations._fetch_receipts', side_effect=lambda hashes: dict.fromkeys(hashes)), \
+                mock.patch('main.confirmations.rpc_batch', side_effect=lambda: FakeBatch(node)):
+            ConfirmationTracker().sweep()
+        self.tx.refresh_from_db()
+        return self.tx.status
+
+    def test_transaction_in_the_mempool_stays_sent(self):
+        pending = {'from': self.SENDER, 'nonce': '0x3', 'blockNumber': None}
+        self.assertEqual(self.sweep(pending, mined_nonce=3), BlockchainTransaction.STATUS_SENT)
+        self.assertTrue(Vote.objects.filter(pk=self.vote.pk).exists())
+
+    def test_nonce_taken_by_another_transaction_fails(self):
+        pending = {'from': self.SENDER, 'nonce': '0x3', 'blockNumber': None}
+        self.assertEqual(self.sweep(pending, mined_nonce=4), BlockchainTransaction.STATUS_FAILED)
+        self.assertFalse(Vote.objects.filter(pk=self.vote.pk).exists())
+
+    def test_dropped_transaction_fails(self):
+        self.assertEqual(self.sweep(None), BlockchainTransaction.STATUS_FAILED)
+
+
+class StaleClaimTests(TestCase):
+    """Receipts claimed by a worker that died go back to the queue."""
+
+    def setUp(self):
+        self.election, (self.candidate,) = make_election()
+        self.vote = enqueue_vote(make_user(1), self.election, self.candidate)
+        self.tx = self.vote.transaction
+        self.assertEqual(claim_pending(10), [self.tx.pk])
+
+    def test_expired_claims_are_released(self):
+        self.assertEqual(release_stale_claims(lease=60), 0)
+        BlockchainTransaction.objects.filter(pk=self.tx.pk).update(updated_at=now() - timedelta(minutes=2))
+        self.assertEqual(release_stale_claims(lease=60), 1)
+        self.tx.refresh_from_db()
+        self.assertEqual(self.tx.status, BlockchainTransaction.STATUS_PENDING)
+        self.assertEqual(claim_pending(10), [self.tx.pk])
+
+    def test_resent_ballot_already_on_chain_is_kept(self):
+        with mock.patch('main.vote_queue.send_vote_transaction', side_effect=RuntimeError("Voter has already voted")), \
+                mock.patch('main.vote_queue._already_on_chain', return_value=True):
+            process_transaction(self.tx.pk)
+        self.tx.refresh_from_db()
+        self.assertEqual(self.tx.status, BlockchainTransaction.STATUS_CONFIRMED)
+        self.assertTrue(Vote.objects.filter(pk=self.vote.pk).exists())
+
+
+class TallyTests(TestCase):
+    """Candidate tallies follow votes as they are cast, moved and deleted."""
+
+    def setUp(self):
+        self.election, (self.first, self.second) = make_election(candidates=2)
+        receipt = SimpleNamespace(transactionHash=HexBytes(b'\x01' * 32), blockNumber=1)
+        self.votes = [
+            record_vote(make_user(0), self.election, self.first, receipt),
+            enqueue_vote(make_user(1), self.election, self.first),
+            enqueue_vote(make_user(2), self.election, self.second),
+        ]
+
+    def tallies(self):
+        return dict(CandidateTally.objects.filter(election=self.election).values_list('candidate_id', 'votes'))
+
+    def test_counts_after_create_update_and_destroy(self):
+        self.assertEqual(self.tallies(), {self.first.id: 2, self.second.id: 1})
+
+        vote = self.votes[1]
+
+        def save():
+            vote.candidate = self.second
+            vote.save()
+            return vote
+
+        VoteViewSet().perform_update(SimpleNamespace(instance=vote, save=save))
+        self.assertEqual(self.tallies(), {self.first.id: 1, self.second.id: 2})
+
+        VoteViewSet().perform_destroy(self.votes[2])
+        self.assertEqual(self.tallies(), {self.first.id: 1, self.second.id: 1})
+
+    def test_rebuild_matches_the_votes_table(self):
+        CandidateTally.objects.filter(candidate=self.first).update(votes=9)
+        CandidateTally.objects.filter(candidate=self.second).delete()
+        self.assertEqual(rebuild_tallies(self.election), 2)
+        self.assertEqual(self.tallies(), {self.first.id: 2, self.second.id: 1})
+
+
+@override_settings(VOTING_RESULTS_SOURCE='tally')
+class FinalResultTests(TestCase):
+    """Ended elections are frozen once, after every ballot has settled."""
+
+    def setUp(self):
+        self.election, (self.first, self.second) = make_election(candidates=2)
+        self.votes = [enqueue_vote(make_user(i), self.election, self.first) for i in range(2)]
+        Election.objects.filter(pk=self.election.pk).update(end_date=now() - timedelta(minutes=1))
+        patcher = mock.patch.dict('main.VotingResult._final_results', clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def settle(self):
+        BlockchainTransaction.objects.filter(vote__in=self.votes).update(status=BlockchainTransaction.STATUS_CONFIRMED)
+
+    def test_not_frozen_while_ballots_can_fail(self):
+        result = get_voting_result(self.election.id)
+        self.assertFalse(result.is_final)
+        self.assertEqual(result.total_votes, 2)
+        self.assertFalse(VotingResult.objects.filter(election=self.election).exists())
+
+    def test_frozen_result_is_stable_and_not_recomputed(self):
+        self.settle()
+        result = get_voting_result(self.election.id)
+        self.assertTrue(result.is_final)
+        self.assertEqual(result.content_hash, result.compute_hash())
+        self.assertEqual(result.tallies, {self.first.id: 2, self.second.id: 0})
+
+        CandidateTally.objects.filter(candidate=self.second).update(votes=5)
+        with mock.patch('main.VotingResult.compute_result') as recompute:
+            again = get_voting_result(self.election.id)
+            self.assertIs(again, result)
+            with mock.patch.dict('main.VotingResult._final_results', clear=True):
+                stored = get_voting_result(self.election.id)
+        recompute.assert_not_called()
+        self.assertEqual(stored.pk, result.pk)
+        self.assertEqual(stored.content_hash, result.content_hash)
+
+
+@override_settings(CHAIN_BREAKER_FAILURE_THRESHOLD=1, CHAIN_BREAKER_RESET_TIMEOUT=30,
+                   CHAIN_MAX_CONCURRENCY=1, CHAIN_MAX_ASYNC_CONCURRENCY=1)
+class ChainGuardTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict('main.circuit_breaker._states', clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_tripping_request_gets_503(self):
+        with self.assertRaises(ChainUnavailable) as failed:
+            with chain_guard():
+                raise ConnectionError("node down")
+        self.assertEqual(failed.exception.wait, 30)
+        # and the breaker now turns requests away without running them
+        with self.assertRaises(ChainUnavailable):
+            with chain_guard():
+                self.fail("the breaker should be open")
+
+    def test_async_requests_have_their_own_slots(self):
+        async def vote():
+            async with achain_guard():
+                # a second async request is shed, whatever the sync slots say
+                with self.assertRaises(ChainUnavailable):
+                    async with achain_guard():
+                        pass
+
+        with chain_guard():
+            async_to_sync(vote)()
+
+    def test_local_errors_do_not_trip(self):
+        with self.assertRaises(FileNotFoundError):
+            with chain_guard():
+                raise FileNotFoundError("abi.json")
+        with chain_guard():
+            pass
+
+    def test_breaker_state_is_cached(self):
+        with chain_guard():
+            pass
+        with self.assertNumQueries(0):
+            with chain_guard():
+                pass
+
+    def test_failed_chain_call_rolls_back_the_candidate(self):
+        election, _ = make_election(candidates=0)
+        user = make_user(1, role='candidate')
+        request = APIRequestFactory().post('/api/candidates/', {'election': election.id}, format='json')
+        force_authenticate(request, user=user)
+        with mock.patch('main.views.add_candidate_to_chain', side_effect=ConnectionError("node down")):
+            response = CandidateViewSet.as_view({'post': 'create'})(request)
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(Candidate.objects.filter(user=user).exists())
+
+
+@mock.patch('main.voted_set.start_refresher')
+class VotedSetTests(TestCase):
+    """Requests never load a voted set themselves; the background loader does."""
+
+    def setUp(self):
+        voted_set._sets.clear()
+        voted_set._wanted.clear()
+        self.election, (self.candidate,) = make_election()
+        self.voter = make_user(1)
+        self.vote = enqueue_vote(self.voter, self.election, self.candidate)
+
+    def test_unloaded_election_falls_through_to_the_database(self, start_refresher):
+        with self.assertNumQueries(1):
+            self.assertTrue(voted_set.has_voted(self.voter.id, self.election.id))
+        start_refresher.assert_called()
+        self.assertIn(self.election.id, voted_set._wanted)
+
+        voted_set.refresh_voted_sets()
+        with self.assertNumQueries(0):
+            self.assertTrue(voted_set.has_voted(self.voter.id, self.election.id))
+
+    def test_ballot_deleted_during_a_reload_stays_deleted(self, start_refresher):
+        load = Vote.objects.filter
+
+        def delete_mid_query(*args, **kwargs):
+            # the snapshot still holds the ballot when its deletion commits
+            rows = list(load(*args, **kwargs).values_list('election_id', 'voter_id'))
+            voted_set._discard(self.election.id, self.voter.id)
+            return mock.Mock(values_list=lambda *a: mock.Mock(iterator=lambda: iter(rows)))
+
+        with mock.patch.object(Vote.objects, 'filter', side_effect=delete_mid_query):
+            voted_set.refresh_voted_sets()
+        self.assertNotIn(self.voter.id, voted_set._sets[self.election.id])
+
+    def test_ballot_cast_during_a_reload_is_kept(self, start_refresher):
+        late = make_user(2)
+        load = Vote.objects.filter
+
+        def cast_mid_query(*args, **kwargs):
+            # the snapshot was taken before the new ballot committed
+            rows = list(load(*args, **kwargs).values_list('election_id', 'voter_id'))
+            voted_set._add(self.election.id, late.id)
+            return mock.Mock(values_list=lambda *a: mock.Mock(iterator=lambda: iter(rows)))
+
+        with mock.patch.object(Vote.objects, 'filter', side_effect=cast_mid_query):
+            voted_set.refresh_voted_sets()
+        self.assertIn(late.id, voted_set._sets[self.election.id])
+        self.assertIn(self.voter.id, voted_set._sets[self.election.id])
+
+    def test_startup_loads_running_elections(self, start_refresher):
+        voted_set.warm_voted_sets()
+        start_refresher.assert_called_once_with(loaded=True)
+        with self.assertNumQueries(0):
+            self.assertTrue(voted_set.has_voted(self.voter.id, self.election.id))
+
+
+class BatchSignerTests(SimpleTestCase):
+    """A dispatch failure fails its batch instead of stranding every later caller."""
+
+    KEY = '0x' + '11' * 32
+    TX = {'nonce': 0, 'gasPrice': 10**9, 'gas': 21000, 'to': '0x' + '22' * 20, 'value': 0, 'chainId': 1}
+
+    def test_dispatcher_survives_a_broken_pool(self):
+        broken = mock.Mock(submit=mock.Mock(side_effect=RuntimeError("cannot schedule new futures")))
+        with mock.patch.object(BatchSigner, '_new_pool', side_effect=[broken, ThreadPoolExecutor(1)]):
+            signer = BatchSigner(processes=1, batch_size=1, max_wait=0)
+            with self.assertLogs('main.tx_signing', 'ERROR') as logs, self.assertRaises(RuntimeError):
+                signer.submit(self.TX, self.KEY).result(timeout=5)
+            raw = signer.submit(self.TX, self.KEY).result(timeout=5)
+        self.assertEqual(logs.records[0].getMessage(), "Dispatching a signing batch failed")
+        self.assertTrue(signer._thread.is_alive())
+        self.assertEqual(raw[0], 0xf8)  # an RLP-encoded legacy transaction
+
+    def test_pool_processes_sign_without_django(self):
+        signer = BatchSigner(processes=1, batch_size=2, max_wait=0)
+        self.addCleanup(signer._pool.shutdown)
+        raw = signer.submit(self.TX, self.KEY).result(timeout=60)
+        self.assertEqual(raw, Account.sign_transaction(self.TX, self.KEY).raw_transaction)
+        # a builtin, so the child doesn't import this module to run it
+        modules = signer._pool.submit(eval, "list(__import__('sys').modules)").result(timeout=60)
+        self.assertNotIn('django', modules)
+        self.assertNotIn('main.tx_signing', modules)
+
+
+@override_settings(IDEMPOTENCY_LOCK_TIMEOUT=30)
+class IdempotencyLeaseTests(TestCase):
+
+    def setUp(self):
+        self.user = make_user(1)
+
+    def test_complete_after_the_lease_passed_to_a_retry(self):
+        first, _ = claim(self.user, 'key', 'votes', 'digest')
+        IdempotencyKey.objects.filter(pk=first.pk).update(expires_at=now() - timedelta(seconds=1))
+        retry, answer = claim(self.user, 'key', 'votes', 'digest')
+        self.assertIsNone(answer)
+
+        # the first attempt finishing late neither raises nor overwrites the retry's lease
+        self.assertFalse(complete(first, 201, {'id': 1}))
+        self.assertTrue(complete(retry, 201, {'id': 2}))
+        self.assertEqual(IdempotencyKey.objects.get().response_body, {'id': 2})
+
+    def test_key_in_flight_is_turned_away_at_once(self):
+        claim(self.user, 'key', 'votes', 'digest')
+        started = time.monotonic()
+        record, answer = claim(self.user, 'key', 'votes', 'digest')
+        self.assertIsNone(record)
+        self.assertEqual(answer[0], 409)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    @mock.patch('main.voted_set.start_refresher')
+    def test_validation_error_is_stored_for_replay(self, start_refresher):
+        election, _ = make_election()
+        create = VoteViewSet.as_view({'post': 'create'})
+
+        def post():
+            request = APIRequestFactory().post(
+                '/api/votes/', {'election': election.id}, format='json', HTTP_IDEMPOTENCY_KEY='key',
+            )
+            force_authenticate(request, user=self.user)
+            return create(request)
+
+        first = post()
+        self.assertEqual(first.status_code, 400)
+        retry = post()
+        self.assertEqual(retry.status_code, 400)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+
+    def test_async_validation_error_is_stored_for_replay(self):
+        request = RequestFactory().post('/api/votes/', HTTP_IDEMPOTENCY_KEY='key')
+        handler = mock.AsyncMock(side_effect=ValidationError({'candidate': ['This field is required.']}))
+
+        first = async_to_sync(arun_idempotent)(request, self.user, 'votes', {}, handler)
+        retry = async_to_sync(arun_idempotent)(request, self.user, 'votes', {}, handler)
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual(retry.status_code, 400)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(json.loads(retry.content), {'candidate': ['This field is required.']})
+        handler.assert_awaited_once()
+
+
+@override_settings(VOTING_RESULTS_SOURCE='index')
+class IndexedResultsTests(TestCase):
+    """The 'index' source counts VoteCast events up to the indexer cursor."""
+
+    CONTRACT = '0x' + '33' * 20
+
+    def setUp(self):
+        self.election, self.candidates = make_election(candidates=2)
+        Election.objects.filter(pk=self.election.pk).update(contract_address=self.CONTRACT)
+
+    def cast(self, candidate, block, log_index=0):
+        ContractEvent.objects.create(
+            contract_address=self.CONTRACT, event='VoteCast', block_number=block, block_hash='0x',
+            transaction_hash=f"0x{block:064x}", log_index=log_index, candidate=candidate.id,
+        )
+
+    def test_counts_stop_at_the_cursor(self):
+        first, second = self.candidates
+        IndexerCursor.objects.create(contract_address=self.CONTRACT, last_block=10)
+        self.cast(first, 4)
+        self.cast(first, 5)
+        self.cast(second, 6)
+        self.cast(second, 11)  # written past the cursor, e.g. by a range still being stored
+
+        result = compute_result(self.election.id)
+        self.assertEqual(result.tallies, {first.id: 2, second.id: 1})
+        self.assertEqual(result.winner, first)
+        self.assertEqual(result.total_votes, 3)
+
+
+class EventIndexTests(TestCase):
+    """Receipts are found in the event index, and the indexer adapts its range."""
+
+    CONTRACT = '0x' + '44' * 20
+
+    def test_vote_receipt_is_found_by_its_hash(self):
+        election, (candidate,) = make_election()
+        receipt = SimpleNamespace(transactionHash=HexBytes(b'\x12' * 32), blockNumber=7)
+        vote = record_vote(make_user(1), election, candidate, receipt)
+        ContractEvent.objects.create(
+            contract_address=self.CONTRACT, event='VoteCast', block_number=7, block_hash='0x' + '00' * 32,
+            transaction_hash=HexBytes(receipt.transactionHash).to_0x_hex(), log_index=0, candidate=candidate.id,
+        )
+
+        tx_hash = VoteReceiptSerializer(vote.transaction).data['transaction_hash']
+        request = APIRequestFactory().get('/api/chain/events/', {'transaction_hash': tx_hash})
+        response = ContractEventViewSet.as_view({'get': 'list'})(request)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_chunk_size_shrinks_and_grows_back(self):
+        indexer = EventIndexer(mock.Mock(address=self.CONTRACT, abi=[]), start_block=1, chunk_size=8)
+        indexer.check_reorg = lambda cursor: False
+        refused = RpcCallError('eth_getLogs', {'code': -32005, 'message': "query returned more than 10000 results"})
+        with mock.patch.object(indexer, '_fetch', side_effect=refused):
+            indexer.step(head=100)
+        self.assertEqual(indexer.chunk_size, 4)
+        with mock.patch.object(indexer, '_fetch', return_value=([], '0x' + '00' * 32)):
+            indexer.step(head=100)
+            self.assertEqual(indexer.chunk_size, 8)
+            indexer.step(head=100)
+        self.assertEqual(indexer.chunk_size, 8)
+        self.assertEqual(indexer.cursor.last_block, 12)
+
+    def test_missing_block_is_retried(self):
+        indexer = EventIndexer(mock.Mock(address=self.CONTRACT, abi=[]), start_block=1)
+        node = {'eth_getLogs': lambda params: [], 'eth_getBlockByNumber': lambda params: None}
+        with mock.patch('main.event_indexer.rpc_batch', side_effect=lambda: FakeBatch(node)):
+            with self.assertRaises(RpcCallError):
+                indexer.step(head=5)
+        self.assertEqual(indexer.cursor.last_block, 0)
+
+
+class StandInNode:
+    """Answers JSON-RPC in place of a node's HTTP provider, after `delay` seconds."""
+
+    def __init__(self, result=None, delay: float = 0, error: Exception = None):
+        self.result, self.delay, self.error = result, delay, error
+        self.calls = []
+
+    def make_request(self, method, params):
+        self.calls.append(method)
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {'jsonrpc': '2.0', 'id': 1, 'result': self.result}
+
+
+@override_settings(WEB3_HEDGE_MIN_DELAY=0.02, WEB3_HEALTH_WINDOW=20, WEB3_MAX_ERROR_RATE=0.5,
+                   WEB3_UNHEALTHY_COOLDOWN=30)
+class FailoverProviderTests(SimpleTestCase):
+
+    def provider(self, first: StandInNode, second: StandInNode):
+        web3_failover._health.clear()
+        provider = web3_failover.FailoverHTTPProvider(['http://node-a.invalid', 'http://node-b.invalid'])
+        provider.endpoints[0].provider, provider.endpoints[1].provider = first, second
+        return provider
+
+    def test_slow_read_is_hedged_to_the_next_node(self):
+        slow, fast = StandInNode('0x1', delay=0.5), StandInNode('0x2')
+        provider = self.provider(slow, fast)
+        started = time.monotonic()
+        self.assertEqual(provider.make_request('eth_blockNumber', [])['result'], '0x2')
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual((slow.calls, fast.calls), (['eth_blockNumber'], ['eth_blockNumber']))
+
+    def test_write_fails_over_without_being_duplicated(self):
+        down, up = StandInNode(error=ConnectionError("connection refused")), StandInNode('0xabc')
+        provider = self.provider(down, up)
+        self.assertEqual(provider.make_request('eth_sendRawTransaction', ['0x00'])['result'], '0xabc')
+        self.assertEqual((down.calls, up.calls), (['eth_sendRawTransaction'], ['eth_sendRawTransaction']))
+        self.assertEqual(provider.endpoints[0].health.consecutive_errors, 1)
+
+        # a slow write is waited for, never raced against a second node
+        slow, spare = StandInNode('0xdef', delay=0.1), StandInNode('0x123')
+        provider = self.provider(slow, spare)
+        self.assertEqual(provider.make_request('eth_sendRawTransaction', ['0x00'])['result'], '0xdef')
+        self.assertEqual(spare.calls, [])
+
+
+class SignerPoolTests(TestCase):
+    """Worker processes without the health probe still skip drained or busy relayers."""
+
+    KEYS = ['0x' + f"{n:064x}" for n in (1, 2)]
+
+    def setUp(self):
+        self.loads = 0
+        self.balances, self.mined = {}, {}
+        node = {
+            'eth_getBalance': lambda params: self.balances[params[0]],
+            'eth_getTransactionCount': lambda params: self.mined.get(params[0], 0),
+        }
+
+        def batch(w3):
+            self.loads += 1
+            return FakeBatch(node)
+
+        patcher = mock.patch('main.signer_pool.RpcBatch', side_effect=batch)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = SignerPool(self.KEYS, min_balance=10, web3=mock.Mock, refresh_interval=60)
+        self.first, self.second = (s.address for s in self.pool.signers)
+
+    def picked(self):
+        with self.pool.acquire() as signer:
+            return signer.address
+
+    def test_acquire_refreshes_stale_balances(self):
+        self.balances = {self.first: 0, self.second: 100}
+        self.assertEqual({self.picked() for _ in range(4)}, {self.second})
+        self.assertEqual(self.loads, 1)
+
+    def test_backlog_of_other_workers_counts(self):
+        self.balances = {self.first: 100, self.second: 100}
+        # another worker has four of the first account's transactions in flight
+        SignerNonce.objects.create(address=self.first, next_nonce=7)
+        self.mined = {self.first: 3}
+        self.assertEqual([self.picked() for _ in range(3)], [self.second] * 3)
+        self.assertEqual(self.pool.signers[0].backlog, 4)
+
+
+class BatchProofTests(TestCase):
+
+    def setUp(self):
+        self.election, (self.candidate,) = make_election()
+        self.voters = [make_user(i) for i in range(3)]
+        for voter in self.voters:
+            commit_vote(voter, self.election, self.candidate)
+        self.batch = claim_batch(self.election.id, 10)
+
+    def anchored(self):
+        receipt = mock.Mock(status=1, blockNumber=7, transactionHash=HexBytes('0x' + 'cd' * 32))
+        with mock.patch('main.vote_batches.wait_for_receipt', return_value=receipt):
+            release_stale()
+        self.batch.refresh_from_db()
+
+    def test_sent_batch_is_settled_not_released(self):
+        VoteBatch.objects.filter(pk=self.batch.pk).update(transaction_hash='0x' + 'cd' * 32)
+        self.anchored()
+        self.assertEqual(self.batch.status, VoteBatch.STATUS_MINED)
+        self.assertEqual(set(self.batch.leaves.values_list('status', flat=True)), {BlockchainTransaction.STATUS_MINED})
+
+    def test_unsent_batch_is_released(self):
+        self.anchored()
+        self.assertEqual(self.batch.status, VoteBatch.STATUS_FAILED)
+        self.assertFalse(self.batch.leaves.exists())
+
+    def test_verify_recomputes_the_leaf(self):
+        VoteBatch.objects.filter(pk=self.batch.pk).update(transaction_hash='0x' + 'cd' * 32)
+        self.anchored()
+        proof = inclusion_proof(self.batch.leaves.get(leaf_index=1))
+        verify = VoteViewSet.as_view({'post': 'verify'})
+
+        response = verify(APIRequestFactory().post('/api/votes/verify-proof/', proof, format='json'))
+        self.assertEqual((response.data['valid'], response.data['anchored']), (True, True))
+
+        # another candidate under the same salt and proof is not this ballot
+        forged = {**proof, 'candidate': proof['candidate'] + 1}
+        response = verify(APIRequestFactory().post('/api/votes/verify-proof/', forged, format='json'))
+        self.assertFalse(response.data['valid'])
+
+    def test_vote_needs_a_valid_wallet(self):
+        voter = make_user(50)
+        voter.wallet_address = 'not-an-address'
+        request = mock.Mock(user=voter)
+        serializer = VoteSerializer(
+            data={'election': self.election.id, 'candidate_id': self.candidate.id}, context={'request': request}
+        )
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('non_field_errors', serializer.errors)
+
+
+class AnchorerTests(TestCase):
+    """A one-shot anchorer drains every election, even after a pass where every batch failed."""
+
+    def test_failed_batch_does_not_stop_the_drain(self):
+        first, (candidate,) = make_election()
+        second = Election.objects.create(
+            name="Second election", description="", start_date=first.start_date, end_date=first.end_date,
+        )
+        ballots = [(first, candidate), (second, Candidate.objects.create(user=make_user(1001, role='candidate'), election=second))]
+        votes = [commit_vote(make_user(10 * i + n), *ballot) for i, ballot in enumerate(ballots) for n in range(2)]
+        tx = votes[0].transaction
+        self.assertEqual(
+            tx.transaction_hash,
+            HexBytes(vote_leaf(tx.data['election'], tx.data['voter_address'], tx.data['candidate'],
+                               HexBytes(tx.data['salt']))).to_0x_hex(),
+        )
+
+        receipt = mock.Mock(status=1, blockNumber=9, transactionHash=HexBytes('0x' + 'ef' * 32))
+        anchor = mock.patch('main.vote_batches.anchor_merkle_root', side_effect=[RuntimeError("node hiccup")] * 2 + [receipt] * 2)
+        with anchor as anchored:
+            run_anchorer(interval=0, poll_interval=0.01, once=True)
+        self.assertEqual(anchored.call_count, 4)
+        self.assertEqual(
+            set(BlockchainTransaction.objects.filter(vote__in=votes).values_list('status', flat=True)),
+            {BlockchainTransaction.STATUS_MINED},
+        )
+
+
+VOTER_KEYS = ['0x' + f"{n:064x}" for n in range(1, 4)]
+
+
+@override_settings(CHAIN_BACKEND='simulator', CHAIN_SIM_BLOCK_TIME=0, CHAIN_SIM_LATENCY=0, CHAIN_SIM_FAILURE_RATE=0,
+                   SIGNER_PRIVATE_KEYS='0x' + 'aa' * 32, VOTER_PRIVATE_KEYS=','.join(VOTER_KEYS))
+class SimulatedChainTestCase(TestCase):
+    """Runs against a fresh in-process simulated chain instead of a node."""
+
+    def setUp(self):
+        for patcher in (
+            mock.patch('main.chain_backends._backend', None),
+            mock.patch('main.chain_sim._chain', None),
+            mock.patch('main.signer_pool._pool', None),
+            mock.patch.dict('main.web3_provider._clients', clear=True),
+            mock.patch.dict('main.web3_provider._async_clients', clear=True),
+            mock.patch.dict('main.web3_provider._contracts', clear=True),
+            mock.patch.dict('main.blockchain._election_addresses', clear=True),
+            mock.patch.dict('main.blockchain.chain_cache._entries', clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_voters(self, count: int) -> list:
+        return [make_user(i, wallet_address=Account.from_key(key).address) for i, key in enumerate(VOTER_KEYS[:count])]
+
+
+class RpcBatchTests(SimulatedChainTestCase):
+    """Independent calls share one round trip and keep their own errors."""
+
+    def test_results_in_order_with_per_call_errors(self):
+        rpc = RpcCounter(get_web3().provider)
+        contract = get_contract('0x' + '77' * 20)
+        voter = Account.from_key(VOTER_KEYS[0]).address
+
+        batch = RpcBatch(get_web3())
+        batch.request('eth_getBalance', [voter, 'latest'], to_int)
+        batch.call(contract.functions.candidates(5))  # no such candidate: reverts
+        batch.request('eth_getTransactionCount', [voter, 'latest'], to_int)
+        balance, missing, nonce = batch.execute()
+        self.assertEqual(rpc.snapshot()['round_trips'], 1)
+
+        self.assertEqual(balance, get_web3().eth.get_balance(voter))
+        self.assertIsInstance(missing, RpcCallError)
+        self.assertEqual(nonce, 0)
+
+        batch.call(contract.functions.candidates(5))
+        with self.assertRaises(RpcCallError):
+            batch.execute(raise_errors=True)
+
+
+@override_settings(CHAIN_BACKEND='rpc', WEB3_PROVIDER_URIS=[], WEB3_POOL_MAXSIZE=7,
+                   WEB3_CONNECT_TIMEOUT=2, WEB3_READ_TIMEOUT=9)
+class SharedClientTests(SimpleTestCase):
+    """One pooled client and one contract object per address, per process."""
+
+    def setUp(self):
+        for patcher in (
+            mock.patch('main.chain_backends._backend', None),
+            mock.patch.dict('main.web3_provider._clients', clear=True),
+            mock.patch.dict('main.web3_provider._contracts', clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_client_and_contracts_are_shared(self):
+        w3 = get_web3()
+        self.assertIs(get_web3(), w3)
+        self.assertIs(get_contract('0x' + '88' * 20), get_contract('0x' + '88' * 20))
+
+        provider = w3.provider
+        self.assertEqual(provider.get_request_kwargs()['timeout'], (2, 9))
+        session = provider._request_session_manager.cache_and_return_session(provider.endpoint_uri)
+        self.assertIs(provider._request_session_manager.cache_and_return_session(provider.endpoint_uri), session)
+        self.assertEqual(session.get_adapter('http://').poolmanager.connection_pool_kw['maxsize'], 7)
+
+
+class AggregatedReadTests(SimulatedChainTestCase):
+    """One aggregated read returns what a call per candidate would."""
+
+    def test_matches_per_candidate_reads(self):
+        rpc = RpcCounter(get_web3().provider)
+        election, candidates = make_election(candidates=3)
+        attach_election_contract(election.id, '0x' + '55' * 20)
+        open_voting_on_chain(election)
+        for voter, candidate in zip(self.make_voters(3), [candidates[0], candidates[2], candidates[2]]):
+            vote_on_chain(voter.wallet_address, candidate.id, election)
+
+        contract = get_election_contract(election)
+        ids = [candidate.id for candidate in candidates]
+        winner, votes = fetch_winner_and_votes(ids, election)
+        self.assertIsNone(winner)  # getWinner reverts while voting is open
+        self.assertEqual(votes, [contract.functions.candidateVotes(i).call() for i in ids])
+        self.assertEqual(votes, [1, 0, 2])
+
+        # once Multicall3's absence is cached, the read is a single round trip
+        before = rpc.snapshot()['round_trips']
+        self.assertEqual(get_total_votes(election.id), 3)
+        self.assertEqual(rpc.snapshot()['round_trips'] - before, 1)
+
+
+class ElectionContractTests(SimulatedChainTestCase):
+    """Each election's votes land on its own contract."""
+
+    def test_votes_are_routed_to_the_elections_contract(self):
+        state, (state_candidate,) = make_election()
+        central = Election.objects.create(
+            name="Central election", description="", start_date=now() - timedelta(hours=1),
+            end_date=now() + timedelta(days=1),
+        )
+        central_candidate = Candidate.objects.create(user=make_user(2000, role='candidate'), election=central)
+        with override_settings(ELECTION_CONTRACTS='per_election'):
+            for election in (state, central):
+                open_voting_on_chain(election)
+        state.refresh_from_db()
+        central.refresh_from_db()
+        self.assertTrue(state.contract_address)
+        self.assertNotEqual(state.contract_address, central.contract_address)
+
+        first, second, third = self.make_voters(3)
+        vote_on_chain(first.wallet_address, state_candidate.id, state)
+        vote_on_chain(second.wallet_address, central_candidate.id, central)
+        vote_on_chain(third.wallet_address, central_candidate.id, central.id)
+
+        contracts = get_simulated_chain().contracts
+        self.assertEqual(dict(contracts[state.contract_address].candidate_votes), {state_candidate.id: 1})
+        self.assertEqual(dict(contracts[central.contract_address].candidate_votes), {central_candidate.id: 2})
+        self.assertEqual(get_total_votes(state.id), 1)
+        self.assertEqual(get_total_votes(central.id), 2)
+
+
+@override_settings(FEE_STRATEGY='auto', FEE_PRIORITY_PERCENTILE=50, FEE_MIN_PRIORITY_FEE_GWEI=1,
+                   FEE_BASE_FEE_MULTIPLIER=2, FEE_BUMP_PERCENT=12.5)
+class FeeTests(SimpleTestCase):
+    """EIP-1559 fees come from fee history; replacements outbid the original."""
+
+    GWEI = 10 ** 9
+
+    def test_fees_from_fee_history(self):
+        history = {
+            'baseFeePerGas': [hex(8 * self.GWEI), hex(10 * self.GWEI)],
+            'reward': [[hex(3 * self.GWEI)], [hex(1 * self.GWEI)], [hex(2 * self.GWEI)]],
+        }
+        self.assertEqual(fee_params(history, 50 * self.GWEI), {
+            'maxPriorityFeePerGas': 2 * self.GWEI,
+            'maxFeePerGas': 22 * self.GWEI,  # twice the next base fee plus the median tip
+        })
+
+    def test_legacy_price_without_a_base_fee(self):
+        self.assertEqual(fee_params({}, 50 * self.GWEI), {'gasPrice': 50 * self.GWEI})
+        self.assertEqual(fee_params(None, 50 * self.GWEI), {'gasPrice': 50 * self.GWEI})
+        with override_settings(FEE_STRATEGY='legacy'):
+            history = {'baseFeePerGas': [hex(self.GWEI)], 'reward': [[hex(self.GWEI)]]}
+            self.assertEqual(fee_params(history, 50 * self.GWEI), {'gasPrice': 50 * self.GWEI})
+
+    def test_replacement_fees_are_bumped(self):
+        pending = {'maxFeePerGas': 20 * self.GWEI, 'maxPriorityFeePerGas': 2 * self.GWEI}
+        current = {'maxFeePerGas': 10 * self.GWEI, 'maxPriorityFeePerGas': self.GWEI}
+        self.assertEqual(bump_fees(pending, current), {
+            'maxPriorityFeePerGas': 2_250_000_000, 'maxFeePerGas': 22_500_000_000,
+        })
+        # a risen suggestion wins over the minimum bump
+        current = {'maxFeePerGas': 40 * self.GWEI, 'maxPriorityFeePerGas': 5 * self.GWEI}
+        self.assertEqual(bump_fees(pending, current), current)
+
+
+class StuckTransactionTests(SimulatedChainTestCase):
+    """The watchdog re-sends a vote stuck in the mempool at the same nonce."""
+
+    CONTRACT = Web3.to_checksum_address('0x' + '66' * 20)
+
+    # blocks an hour apart, so nothing is mined until the test says so
+    @override_settings(CHAIN_SIM_BLOCK_TIME=3600, FEE_MAX_REPLACEMENTS=1)
+    def test_stuck_vote_is_replaced(self):
+        election, (candidate,) = make_election()
+        attach_election_contract(election.id, self.CONTRACT)
+        chain = get_simulated_chain()
+        contract = chain.contracts[self.CONTRACT] = VotingState()
+        contract.voting_open = True
+        (voter,) = self.make_voters(1)
+
+        vote = enqueue_vote(voter, election, candidate)
+        original = send_vote_transaction(voter.wallet_address, candidate.id, election).to_0x_hex()
+        BlockchainTransaction.objects.filter(pk=vote.transaction_id).update(
+            status=BlockchainTransaction.STATUS_SENT, transaction_hash=original,
+            updated_at=now() - timedelta(minutes=5),
+        )
+
+        w3 = get_web3()
+        old = w3.eth.get_transaction(original)
+        watchdog = StuckTransactionWatchdog(deadline=60)
+        self.assertEqual(watchdog.check(), 1)
+        tx = BlockchainTransaction.objects.get(pk=vote.transaction_id)
+        self.assertNotEqual(tx.transaction_hash, original)
+        self.assertEqual(tx.data['replaced'], [original])
+
+        new = w3.eth.get_transaction(tx.transaction_hash)
+        self.assertEqual(new['nonce'], old['nonce'])
+        self.assertGreater(new['maxFeePerGas'], old['maxFeePerGas'])
+
+        # FEE_MAX_REPLACEMENTS reached: left alone from now on
+        BlockchainTransaction.objects.filter(pk=tx.pk).update(updated_at=now() - timedelta(minutes=5))
+        self.assertEqual(watchdog.check(), 0)
+
+        chain._mine()
+        self.assertEqual(w3.eth.get_transaction_receipt(tx.transaction_hash)['status'], 1)
+        self.assertEqual(contract.candidate_votes[candidate.id], 1)
+
+
+class ChainBackendTests(SimulatedChainTestCase):
+    """CHAIN_BACKEND picks the providers behind the shared clients."""
+
+    def test_simulator_backs_both_clients(self):
+        self.assertIsInstance(get_chain_backend(), SimulatorBackend)
+        self.assertIsInstance(get_web3().provider, SimulatedProvider)
+        self.assertIsInstance(get_async_web3().provider, AsyncSimulatedProvider)
+        self.assertEqual(get_web3().eth.chain_id, 1337)
+
+        async def block_number():
+            return await get_async_web3().eth.block_number
+
+        # one simulated chain behind both
+        self.assertEqual(async_to_sync(block_number)(), get_web3().eth.block_number)
+
+    @override_settings(CHAIN_BACKEND='rpc', WEB3_PROVIDER_URIS=[])
+    def test_rpc_is_http(self):
+        self.assertIsInstance(get_chain_backend(), RpcBackend)
+        self.assertIsInstance(get_web3().provider, PooledHTTPProvider)
+
+    @override_settings(CHAIN_BACKEND='ganache')
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_chain_backend()
+
+    @override_settings(CHAIN_SIM_FAILURE_RATE=1)
+    def test_simulator_injects_failures(self):
+        with self.assertRaises(ConnectionError):
+            get_web3().eth.block_number
+
+
+class ElectionDataGeneratorTests(TestCase):
+    """generate_election_data writes the requested volumes in batches."""
+
+    def generate(self, **options):
+        call_command('generate_election_data', stdout=StringIO(), **options)
+
+    def test_row_counts(self):
+        self.generate(voters=25, elections=2, candidates=3, parties=4, turnout=1.0, batch_size=10)
+        self.assertEqual(Party.objects.count(), 4)
+        self.assertEqual(Election.objects.count(), 2)
+        self.assertEqual(Candidate.objects.count(), 6)
+        self.assertEqual(CustomUser.objects.filter(role='voter').count(), 25)
+        self.assertEqual(Vote.objects.count(), 50)
+        self.assertEqual(BlockchainTransaction.objects.count(), 50)
+        for election in Election.objects.all():
+            self.assertEqual(sum(election_tallies(election).values()), 25)
+
+    def test_turnout_is_seeded(self):
+        self.generate(voters=40, elections=1, candidates=2, parties=2, turnout=0.5, batch_size=16, seed=7)
+        first = list(Vote.objects.order_by('id').values_list('voter__username', 'candidate__user__username'))
+        self.assertTrue(0 < len(first) < 40)
+
+        # the same seed on an empty database gives the same rows
+        for model in (Vote, BlockchainTransaction, Candidate, Election, Party, CustomUser):
+            model.objects.all().delete()
+        self.generate(voters=40, elections=1, candidates=2, parties=2, turnout=0.5, batch_size=16, seed=7)
+        again = list(Vote.objects.order_by('id').values_list('voter__username', 'candidate__user__username'))
+        self.assertEqual(again, first)
+
+    def test_more_candidates_than_parties_is_refused(self):
+        with self.assertRaises(CommandError):
+            self.generate(voters=1, candidates=3, parties=2)
+
+
+class LiveResultsTests(TestCase):
+    """Every subscriber gets one coalesced delta per interval from a shared producer."""
+
+    def setUp(self):
+        self.election, (self.first, self.second) = make_election(candidates=2)
+
+    def cast(self, candidate, votes):
+        for _ in range(votes):
+            count_vote(candidate, self.election)
+
+    async def test_votes_in_an_interval_arrive_as_one_delta(self):
+        feed = ElectionFeed(self.election.id, interval=0.2)
+        readers = [await feed.subscribe(), await feed.subscribe()]
+        self.assertEqual(feed.tallies, {self.first.id: 0, self.second.id: 0})
+
+        await sync_to_async(self.cast)(self.first, 3)
+        for reader in readers:
+            self.assertEqual(await reader.next(timeout=5), {self.first.id: 3})
+
+        await sync_to_async(self.cast)(self.second, 1)
+        self.assertEqual(await readers[0].next(timeout=5), {self.second.id: 1})
+        # a reader that fell behind gets the merged changes, not one message per tick
+        await sync_to_async(self.cast)(self.first, 1)
+        await asyncio.sleep(0.5)
+        self.assertEqual(await readers[1].next(timeout=5), {self.first.id: 4, self.second.id: 1})
+
+        for reader in readers:
+            feed.unsubscribe(reader)
+        await feed._task
+        self.assertIsNone(feed.tallies)
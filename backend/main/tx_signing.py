@@ -0,0 +1,182 @@
+"""
+Fast path for building and signing transactions.
+
+Vote calldata is encoded once per candidate id, from a selector looked up
+once in the ABI, so a vote skips web3's contract-function machinery.
+
+Pure-Python ECDSA signing takes milliseconds and holds the GIL. With
+SIGNING_PROCESSES > 0, signing requests from every thread are collected
+into batches of up to SIGNING_BATCH_SIZE and signed in a pool of that many
+processes (main.signing_worker). A batch is sent once it is full or
+SIGNING_BATCH_WAIT seconds after its first request. Callers give up after
+SIGNING_TIMEOUT seconds.
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from queue import Empty, SimpleQueue
+
+from django.conf import settings
+from eth_abi import encode
+from eth_account import Account
+from eth_utils.abi import function_abi_to_4byte_selector, get_abi_input_types
+from hexbytes import HexBytes
+
+from .signing_worker import sign_batch
+from .web3_provider import load_abi
+
+logger = logging.getLogger(__name__)
+
+# ——— Calldata ——————————————————————————————————
+
+@lru_cache(maxsize=None)
+def function_selector(name: str, abi_path: str = None) -> tuple:
+    """`(selector, input_types)` of contract function `name`, looked up in the ABI once."""
+    abi = load_abi(str(abi_path or settings.CONTRACT_ABI_PATH))
+    for item in abi:
+        if item.get('type') == 'function' and item.get('name') == name:
+            return function_abi_to_4byte_selector(item), tuple(get_abi_input_types(item))
+    raise ValueError(f"{name} is not a function of the contract ABI")
+
+
+@lru_cache(maxsize=100_000)
+def vote_calldata(candidate_id: int) -> bytes:
+    """Encoded `vote(candidate_id)` call; every VotingContract shares the ABI."""
+    selector, input_types = function_selector('vote')
+    return selector + encode(input_types, [candidate_id])
+
+
+# ——— Signing ——————————————————————————————————
+
+class BatchSigner:
+    """Signs transactions in batches in a process pool. See the module docstring."""
+
+    def __init__(self, processes: int, batch_size: int, max_wait: float):
+        self.processes = processes
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._pool = self._new_pool()
+        self._queue = SimpleQueue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._start_dispatcher()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn, not fork: the parent runs request and worker threads
+        return ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('spawn'))
+
+    def _start_dispatcher(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._dispatch, name='tx-signer', daemon=True)
+                self._thread.start()
+
+    def submit(self, tx: dict, private_key) -> Future:
+        """Queue `tx` for signing; the future resolves to the raw signed transaction."""
+        future = Future()
+        self._queue.put((tx, private_key, future))
+        if not self._thread.is_alive():
+            self._start_dispatcher()
+        return future
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except Empty:
+                break
+        return batch
+
+    def _dispatch(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._send(batch)
+            except Exception as e:
+                # never let the thread die with callers waiting on their futures
+                logger.exception("Dispatching a signing batch failed")
+                self._fail(batch, e)
+                self._pool.shutdown(wait=False)
+                self._pool = self._new_pool()
+
+    def _send(self, batch: list):
+        # one chunk per process so a batch is signed in parallel
+        size = -(-len(batch) // self.processes)
+        for start in range(0, len(batch), size):
+            chunk = batch[start:start + size]
+            try:
+                result = self._pool.submit(sign_batch, [(tx, key) for tx, key, _ in chunk])
+            except BrokenProcessPool:
+                # a pool process died (e.g. OOM-killed); start over with a fresh pool
+                self._pool = self._new_pool()
+                result = self._pool.submit(sign_batch, [(tx, key) for tx, key, _ in chunk])
+            result.add_done_callback(functools.partial(self._resolve, chunk))
+
+    @staticmethod
+    def _settle(future: Future, raw):
+        # futures already resolved, or cancelled by a caller that timed out, are left alone
+        if future.done():
+            return
+        if isinstance(raw, Exception):
+            future.set_exception(raw)
+        else:
+            future.set_result(HexBytes(raw))
+
+    def _fail(self, chunk, error):
+        for _, _, future in chunk:
+            self._settle(future, error)
+
+    def _resolve(self, chunk, result):
+        try:
+            signed = result.result()
+        except Exception as e:
+            self._fail(chunk, e)
+            return
+        for (_, _, future), raw in zip(chunk, signed):
+            self._settle(future, raw)
+
+
+_signer = None
+_signer_lock = threading.Lock()
+
+
+def get_batch_signer():
+    """The process-wide BatchSigner, or None when SIGNING_PROCESSES is 0."""
+    global _signer
+    if settings.SIGNING_PROCESSES <= 0:
+        return None
+    if _signer is None:
+        with _signer_lock:
+            if _signer is None:
+                _signer = BatchSigner(
+                    settings.SIGNING_PROCESSES, settings.SIGNING_BATCH_SIZE, settings.SIGNING_BATCH_WAIT
+                )
+    return _signer
+
+
+def sign_transaction(tx: dict, private_key) -> HexBytes:
+    """Raw signed `tx`, signed in the pool when one is configured."""
+    signer = get_batch_signer()
+    if signer is None:
+        return Account.sign_transaction(tx, private_key).raw_transaction
+    future = signer.submit(tx, private_key)
+    try:
+        return future.result(timeout=settings.SIGNING_TIMEOUT)
+    finally:
+        future.cancel()
+
+
+async def asign_transaction(tx: dict, private_key) -> HexBytes:
+    """Async `sign_transaction`; waits on the pool without blocking the event loop."""
+    signer = get_batch_signer()
+    if signer is None:
+        return Account.sign_transaction(tx, private_key).raw_transaction
+    return await asyncio.wait_for(asyncio.wrap_future(signer.submit(tx, private_key)), settings.SIGNING_TIMEOUT)
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import *
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
@@ -8,6 +9,7 @@ router.register(r'elections', ElectionViewSet)
 router.register(r'candidates', CandidateViewSet)
 router.register(r'transactions', BlockchainTransactionViewSet)
 router.register(r'votes', VoteViewSet)
+router.register(r'chain/events', ContractEventViewSet)
 router.register('register', RegisterViewset, basename='register')
 router.register('login', LoginViewset, basename='login')
 
@@ -15,6 +17,16 @@ urlpatterns = [
     path('', include(router.urls)),
     path('profile/', profile, name='profile'),
     path('phone-numbers/', PhoneNumberListView.as_view()),
+    path('chain/cache-stats/', ChainCacheStatsView.as_view(), name='chain-cache-stats'),
+    path('chain/health/', ChainHealthView.as_view(), name='chain-health'),
+    path('chain/signers/', SignerPoolView.as_view(), name='chain-signers'),
+    path('chain/nodes/', RpcNodesView.as_view(), name='chain-nodes'),
+    path('voting-results/<int:election_id>/', VotingResultDetailView.as_view(), name='voting-result-detail'),
+    # AsyncWeb3-backed variants, meant to be served through core.asgi
+    path('async/votes/', async_views.cast_vote, name='async-cast-vote'),
+    path('async/candidates/', async_views.register_candidate, name='async-register-candidate'),
+    path('async/voting-results/<int:election_id>/', async_views.voting_result, name='async-voting-result'),
+    path('async/voting-results/<int:election_id>/stream/', async_views.live_results, name='live-results'),
    # path('user/by-phone-number/', get_user_by_phone_number),
     
     
@@ -18,6 +18,23 @@ from knox.models import AuthToken
 import os
 from .blockchain import add_candidate_to_chain
 from .blockchain import vote_on_chain
+from .blockchain import chain_cache, chain_health
+from .signer_pool import get_signer_pool
+from .web3_failover import endpoint_stats
+from .vote_queue import enqueue_vote, record_vote
+from .vote_batches import commit_vote, inclusion_proof
+from .merkle import verify_proof, vote_leaf
+from eth_abi.exceptions import EncodingError
+from hexbytes import HexBytes
+from web3 import Web3
+from .VotingResult import get_voting_result
+from .tally import count_vote
+from .voted_set import has_voted, unmark_voted
+from .idempotency import idempotent
+from .circuit_breaker import chain_guard
+from django.db import transaction
+from django.conf import settings
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework as filters
@@ -179,15 +196,22 @@ class CandidateViewSet(viewsets.ModelViewSet):
     queryset = Candidate.objects.all()
     serializer_class = CandidateSerializer
 
+    @idempotent('candidates')
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         user = self.request.user
         election = self.request.data.get('election')
         if Candidate.objects.filter(user=user, election=election).exists():
             raise PermissionDenied("You have already registered as a candidate for this election.")
 
-        candidate = serializer.save(user=user)
-        # add candidate to blockchain
-        add_candidate_to_chain(candidate.id)
+        # shed before saving, and roll the row back if the chain call fails,
+        # so a stalled node doesn't leave off-chain candidates behind
+        with chain_guard(), transaction.atomic():
+            candidate = serializer.save(user=user)
+            # add candidate to blockchain
+            add_candidate_to_chain(candidate.id, candidate.election)
 
     def get_queryset(self):
         queryset = Candidate.objects.all()
@@ -202,15 +226,33 @@ class BlockchainTransactionViewSet(viewsets.ModelViewSet):
     serializer_class = BlockchainTransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+class ContractEventViewSet(viewsets.ReadOnlyModelViewSet):
+    """Locally indexed contract events, for audits and receipt lookups."""
+    queryset = ContractEvent.objects.order_by('block_number', 'log_index')
+    serializer_class = ContractEventSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['event', 'voter', 'candidate', 'transaction_hash', 'block_number']
+
 @method_decorator(csrf_exempt, name='dispatch')
 class VoteViewSet(viewsets.ModelViewSet):
     queryset = Vote.objects.all()
     serializer_class = VoteSerializer
     authentication_classes = [TokenAuthentication]
+
+    @idempotent('votes')
     def create(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
             return Response({'error': 'You must be authenticated to cast a vote'}, status=status.HTTP_401_UNAUTHORIZED)
 
+        # ① check existence first: repeat voters are turned away from the
+        # in-memory voted set before validation queries or the chain
+        election_id = str(request.data.get('election', ''))
+        if election_id.isdigit() and has_voted(request.user.id, int(election_id)):
+            return Response(
+                {"detail": "You have already voted in this election."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
        # serializer.validated_data['candidate_id'] is a Candidate instance
@@ -218,33 +260,100 @@ class VoteViewSet(viewsets.ModelViewSet):
        # Extract the actual integer primary key
         candidate_pk = candidate.id  # already an int
         voter = request.user
-        receipt = vote_on_chain(voter.wallet_address, int(candidate_pk))
         election = serializer.validated_data['election']
-         #① check existence
-        if Vote.objects.filter(voter=voter, election=election).exists():
-             return Response(
-                 {"detail": "You have already voted in this election."},
-                 status=status.HTTP_400_BAD_REQUEST
-             )
+
+        if settings.VOTE_SUBMISSION_MODE in ('queued', 'batched'):
+            # persist a pending receipt; run_vote_worker submits it on-chain,
+            # or anchor_votes anchors it as part of a Merkle batch
+            if settings.VOTE_SUBMISSION_MODE == 'batched':
+                vote = commit_vote(voter, election, candidate)
+            else:
+                vote = enqueue_vote(voter, election, candidate)
+            return Response(VoteReceiptSerializer(vote.transaction).data, status=status.HTTP_202_ACCEPTED)
 
         # ② proceed to send on‑chain + save
         
         # send vote tx on-chain
         # save on DB with tx hash
-        tx = BlockchainTransaction.objects.create(
-            transaction_hash=receipt.transactionHash.hex(),
-            sender=voter,
-            receiver=voter,  # or contract address
-            data={'candidate': candidate_pk}
-        )
-        vote = Vote.objects.create(
-            voter=request.user,
-            election=serializer.validated_data['election'],
-            candidate=candidate,
-            transaction=tx
-        )
+        with chain_guard():
+            receipt = vote_on_chain(voter.wallet_address, int(candidate_pk), election)
+        if receipt.status != 1:
+            return Response(
+                {"detail": "The vote was rejected on chain and has not been recorded.",
+                 "transaction_hash": receipt.transactionHash.to_0x_hex()},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        vote = record_vote(voter, election, candidate, receipt)
         return Response(VoteSerializer(vote).data, status=status.HTTP_201_CREATED)
 
+    def perform_update(self, serializer):
+        previous = serializer.instance.candidate_id
+        with transaction.atomic():
+            vote = serializer.save()
+            if vote.candidate_id != previous:
+                count_vote(previous, vote.election_id, -1)
+                count_vote(vote.candidate_id, vote.election_id)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            count_vote(instance.candidate_id, instance.election_id, -1)
+            unmark_voted(instance.voter_id, instance.election_id)
+
+    @action(detail=False, methods=['get'], url_path=r'receipts/(?P<receipt_id>\d+)')
+    def receipt(self, request, receipt_id=None):
+        """Report whether a queued ballot is pending, submitted, mined or failed."""
+        if not request.user.is_authenticated:
+            return Response({'error': 'You must be authenticated to view a receipt'}, status=status.HTTP_401_UNAUTHORIZED)
+        tx = get_object_or_404(BlockchainTransaction, pk=receipt_id, sender=request.user)
+        return Response(VoteReceiptSerializer(tx).data)
+
+    @action(detail=False, methods=['get'], url_path=r'receipts/(?P<receipt_id>\d+)/proof')
+    def proof(self, request, receipt_id=None):
+        """Merkle inclusion proof of a batched ballot, once its batch root is anchored."""
+        if not request.user.is_authenticated:
+            return Response({'error': 'You must be authenticated to view a receipt'}, status=status.HTTP_401_UNAUTHORIZED)
+        tx = get_object_or_404(BlockchainTransaction.objects.select_related('batch'), pk=receipt_id, sender=request.user)
+        proof = inclusion_proof(tx)
+        if proof is None:
+            return Response({"detail": "This ballot has not been anchored in a batch yet."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(proof)
+
+    @action(detail=False, methods=['post'], url_path='verify-proof', permission_classes=[AllowAny])
+    def verify(self, request):
+        """
+        Check a ballot's proof against a root, and whether that root was
+        anchored. The leaf is recomputed from the election, voter_address,
+        candidate and salt of the proof, so a proof only verifies for the
+        ballot it was issued for.
+        """
+        data = request.data
+        try:
+            leaf = vote_leaf(
+                int(data['election']), Web3.to_checksum_address(data['voter_address']),
+                int(data['candidate']), HexBytes(data['salt']),
+            )
+            root = HexBytes(data['merkle_root']).to_0x_hex()
+            valid = verify_proof(leaf, data.get('proof', []), root)
+            # a leaf sent along must be the one the ballot hashes to
+            valid = valid and HexBytes(data.get('leaf') or leaf) == leaf
+        except (KeyError, TypeError, ValueError, EncodingError):
+            return Response(
+                {'error': 'election, voter_address, candidate, salt, proof and merkle_root are required; '
+                          'the salt, proof and merkle_root as hex strings.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        batch = VoteBatch.objects.filter(
+            merkle_root=root, status=VoteBatch.STATUS_MINED
+        ).first()
+        return Response({
+            'valid': valid,
+            'leaf': HexBytes(leaf).to_0x_hex(),
+            'anchored': batch is not None,
+            'anchor_transaction': batch.transaction_hash if batch else None,
+            'block_number': batch.block_number if batch else None,
+        })
+
 
 @csrf_exempt 
 def request_otp(request):
@@ -315,6 +424,39 @@ class CheckPhoneNumberView(APIView):
         else:
             return Response({'error': 'Phone number is required'}, status=400)
         
+class ChainCacheStatsView(APIView):
+    """Hit/miss counters of the chain metadata cache in this worker process."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(chain_cache.stats())
+
+
+class SignerPoolView(APIView):
+    """In-flight and sent transaction counts and last known balance per relayer account."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_signer_pool().stats())
+
+
+class RpcNodesView(APIView):
+    """Rolling latency, error rate and health of each RPC node behind the failover provider."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(endpoint_stats())
+
+
+class ChainHealthView(APIView):
+    """Last result of the background chain health probe."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        healthy = chain_health['status'] == 'ok'
+        return Response(chain_health, status=status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
 class PhoneNumberListView(APIView):
     def get(self, request):
         users = User.objects.all()
@@ -330,6 +472,20 @@ class PhoneNumberListView(APIView):
 #     serializer = UserSerializer(user)
 #     return Response({'token': token, 'user': serializer.data})
 
+class VotingResultDetailView(APIView):
+    """
+    An election's result: its frozen snapshot once ended and settled, else the
+    live standings from VOTING_RESULTS_SOURCE (sync counterpart of
+    async_views.voting_result).
+    """
+
+    def get(self, request, election_id):
+        try:
+            result = get_voting_result(election_id)
+        except Election.DoesNotExist:
+            return Response({'error': 'Election not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(VotingResultSerializer(result).data)
+
 class VotingResultViewSet(viewsets.ModelViewSet):
     queryset = VotingResult.objects.all()
     serializer_class = VotingResultSerializer
\ No newline at end of file
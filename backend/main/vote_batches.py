@@ -0,0 +1,236 @@
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Min
+from django.utils.timezone import now
+from hexbytes import HexBytes
+
+from .blockchain import anchor_merkle_root, wait_for_receipt
+from .merkle import MerkleTree, vote_leaf
+from .models import BlockchainTransaction, Vote, VoteBatch
+from .tally import count_vote
+from .voted_set import mark_voted
+
+logger = logging.getLogger(__name__)
+
+# `run_anchorer(once=True)` gives up after this many passes in a row that
+# anchor nothing, e.g. while the node is down.
+ONCE_MAX_IDLE_PASSES = 3
+
+
+# ——— Request side ——————————————————————————————————
+
+def commit_vote(voter, election, candidate) -> Vote:
+    """
+    Persist a ballot as a local commitment. Its leaf hash doubles as the
+    receipt's transaction_hash; the chain only sees the batch root.
+    """
+    salt = os.urandom(32)
+    leaf = vote_leaf(election.id, voter.wallet_address, candidate.id, salt)
+    with transaction.atomic():
+        tx = BlockchainTransaction.objects.create(
+            transaction_hash=HexBytes(leaf).to_0x_hex(),
+            sender=voter,
+            receiver=voter,
+            status=BlockchainTransaction.STATUS_COMMITTED,
+            data={
+                'candidate': candidate.id,
+                'election': election.id,
+                'voter': voter.id,
+                'voter_address': voter.wallet_address,
+                'salt': HexBytes(salt).to_0x_hex(),
+            },
+        )
+        vote = Vote.objects.create(
+            voter=voter,
+            election=election,
+            candidate=candidate,
+            transaction=tx,
+        )
+        count_vote(candidate, election)
+        mark_voted(voter.id, election.id)
+        return vote
+
+
+# ——— Anchoring ——————————————————————————————————
+
+def _unbatched():
+    return BlockchainTransaction.objects.filter(
+        status=BlockchainTransaction.STATUS_COMMITTED, batch__isnull=True
+    )
+
+
+def due_elections(batch_size: int, max_age: float) -> list:
+    """Elections with at least `batch_size` unbatched votes or one older than `max_age` seconds."""
+    cutoff = now() - timedelta(seconds=max_age)
+    rows = _unbatched().values('data__election').annotate(n=Count('id'), oldest=Min('timestamp')).order_by()
+    return [row['data__election'] for row in rows if row['n'] >= batch_size or row['oldest'] <= cutoff]
+
+
+def claim_batch(election_id: int, limit: int):
+    """
+    Move up to `limit` unbatched votes of `election_id` into a new
+    VoteBatch and number its leaves. The conditional UPDATE keeps a vote
+    from landing in two batches when anchorers run concurrently.
+    """
+    with transaction.atomic():
+        ids = list(_unbatched().filter(data__election=election_id).order_by('id').values_list('id', flat=True)[:limit])
+        if not ids:
+            return None
+        batch = VoteBatch.objects.create(election_id=election_id)
+        _unbatched().filter(pk__in=ids).update(batch=batch)
+        leaves = list(batch.leaves.order_by('id'))
+        if not leaves:
+            batch.delete()
+            return None
+        for index, leaf in enumerate(leaves):
+            leaf.leaf_index = index
+        BlockchainTransaction.objects.bulk_update(leaves, ['leaf_index'])
+
+        batch.size = len(leaves)
+        batch.merkle_root = HexBytes(MerkleTree([tx.transaction_hash for tx in leaves]).root).to_0x_hex()
+        batch.save(update_fields=['size', 'merkle_root'])
+        return batch
+
+
+def release_batch(batch: VoteBatch, error: str):
+    """Mark an anchor as failed and hand its votes back for the next batch."""
+    with transaction.atomic():
+        batch.leaves.update(batch=None, leaf_index=None)
+        batch.status = VoteBatch.STATUS_FAILED
+        batch.error = error
+        batch.save(update_fields=['status', 'error'])
+
+
+def _record_sent(batch: VoteBatch, tx_hash):
+    # saved before waiting, so release_stale can tell a sent root from an unsent one
+    batch.transaction_hash = HexBytes(tx_hash).to_0x_hex()
+    VoteBatch.objects.filter(pk=batch.pk).update(transaction_hash=batch.transaction_hash)
+
+
+def anchor_batch(batch: VoteBatch) -> VoteBatch:
+    """Send the batch root on chain and, once mined, mark every vote in it as mined."""
+    try:
+        receipt = anchor_merkle_root(HexBytes(batch.merkle_root), on_sent=lambda h: _record_sent(batch, h))
+    except Exception as e:
+        if batch.transaction_hash:
+            # the root is out and may still be mined; release_stale settles it on the next start
+            logger.warning("Anchor transaction %s of batch %s is unsettled: %s", batch.transaction_hash, batch.pk, e)
+            return batch
+        logger.warning("Anchoring batch %s failed: %s", batch.pk, e)
+        release_batch(batch, str(e))
+        return batch
+    return settle_batch(batch, receipt)
+
+
+def settle_batch(batch: VoteBatch, receipt) -> VoteBatch:
+    """Record the mined anchor transaction of `batch`, or hand its votes back if it reverted."""
+    if receipt.status != 1:
+        error = f"Anchor transaction {receipt.transactionHash.to_0x_hex()} reverted"
+        logger.warning("Anchoring batch %s failed: %s", batch.pk, error)
+        release_batch(batch, error)
+        return batch
+
+    with transaction.atomic():
+        batch.status = VoteBatch.STATUS_MINED
+        batch.transaction_hash = receipt.transactionHash.to_0x_hex()
+        batch.block_number = receipt.blockNumber
+        batch.anchored_at = now()
+        batch.save(update_fields=['status', 'transaction_hash', 'block_number', 'anchored_at'])
+        batch.leaves.update(status=BlockchainTransaction.STATUS_MINED, block_number=receipt.blockNumber)
+    return batch
+
+
+def anchor_due(batch_size: int = None, max_age: float = None, force: bool = False) -> list:
+    """Claim and anchor one batch for every election that is due (all of them with `force`)."""
+    batch_size = batch_size or settings.VOTE_BATCH_SIZE
+    max_age = settings.VOTE_BATCH_INTERVAL if max_age is None else max_age
+    batches = []
+    for election_id in due_elections(batch_size, 0 if force else max_age):
+        try:
+            batch = claim_batch(election_id, batch_size)
+            if batch is not None:
+                batches.append(anchor_batch(batch))
+        except Exception:
+            # one election's failure must not hold up the others
+            logger.exception("Anchoring votes of election %s failed", election_id)
+    return batches
+
+
+def release_stale():
+    """
+    Settle batches left pending by an anchorer that died. A batch whose root
+    was broadcast is waited for, so its votes are never anchored twice;
+    one still unmined after VOTE_RECEIPT_TIMEOUT stays pending for the next
+    start. Only batches that were never sent are handed back.
+    """
+    for batch in VoteBatch.objects.filter(status=VoteBatch.STATUS_PENDING):
+        if not batch.transaction_hash:
+            release_batch(batch, "Anchorer stopped before the root was sent")
+            continue
+        try:
+            receipt = wait_for_receipt(batch.transaction_hash)
+        except Exception as e:
+            logger.warning("Anchor transaction %s of batch %s is unsettled: %s", batch.transaction_hash, batch.pk, e)
+            continue
+        settle_batch(batch, receipt)
+
+
+def run_anchorer(batch_size: int = None, interval: float = None, poll_interval: float = None, once: bool = False):
+    """
+    Anchor a batch whenever an election has `batch_size` unbatched votes or
+    its oldest one has waited `interval` seconds. With `once`, anchor
+    everything outstanding and exit; failed batches are retried until
+    ONCE_MAX_IDLE_PASSES passes in a row anchor nothing. Run a single
+    anchorer.
+    """
+    interval = settings.VOTE_BATCH_INTERVAL if interval is None else interval
+    poll_interval = poll_interval or settings.VOTE_WORKER_POLL_INTERVAL
+    release_stale()
+    idle_passes = 0
+    while True:
+        close_old_connections()
+        try:
+            batches = anchor_due(batch_size, interval, force=once)
+        except Exception:
+            logger.exception("Vote anchoring failed")
+            batches = []
+        progressed = any(b.status == VoteBatch.STATUS_MINED for b in batches)
+        idle_passes = 0 if progressed else idle_passes + 1
+        if once:
+            if not due_elections(batch_size or settings.VOTE_BATCH_SIZE, 0):
+                return
+            if idle_passes >= ONCE_MAX_IDLE_PASSES:
+                logger.warning("Giving up with votes still unbatched after %s failed passes", idle_passes)
+                return
+        if not progressed:
+            time.sleep(poll_interval)
+
+
+# ——— Proofs ——————————————————————————————————
+
+def inclusion_proof(tx: BlockchainTransaction) -> dict:
+    """Everything a voter needs to check their ballot against the anchored root."""
+    batch = tx.batch
+    if batch is None or batch.status != VoteBatch.STATUS_MINED:
+        return None
+    leaves = batch.leaves.order_by('leaf_index').values_list('transaction_hash', flat=True)
+    tree = MerkleTree(list(leaves))
+    return {
+        'receipt_id': tx.id,
+        'election': tx.data.get('election'),
+        'voter_address': tx.data.get('voter_address'),
+        'candidate': tx.data.get('candidate'),
+        'salt': tx.data.get('salt'),
+        'leaf': HexBytes(tx.transaction_hash).to_0x_hex(),
+        'leaf_index': tx.leaf_index,
+        'proof': [HexBytes(node).to_0x_hex() for node in tree.proof(tx.leaf_index)],
+        'merkle_root': batch.merkle_root,
+        'batch': batch.id,
+        'anchor_transaction': batch.transaction_hash,
+        'block_number': batch.block_number,
+    }
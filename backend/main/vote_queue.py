@@ -0,0 +1,210 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from hexbytes import HexBytes
+from web3 import Web3
+
+from .blockchain import get_election_contract, send_vote_transaction
+from .models import BlockchainTransaction, Vote
+from .tally import count_vote
+from .voted_set import mark_voted, unmark_voted
+
+logger = logging.getLogger(__name__)
+
+
+# ——— Request side ——————————————————————————————————
+
+def record_vote(voter, election, candidate, receipt) -> Vote:
+    """Persist a ballot whose transaction has already been mined."""
+    with transaction.atomic():
+        tx = BlockchainTransaction.objects.create(
+            transaction_hash=receipt.transactionHash.to_0x_hex(),
+            sender=voter,
+            receiver=voter,  # or contract address
+            data={'candidate': candidate.id},
+            status=BlockchainTransaction.STATUS_MINED,
+            block_number=receipt.blockNumber,
+        )
+        vote = Vote.objects.create(
+            voter=voter,
+            election=election,
+            candidate=candidate,
+            transaction=tx,
+        )
+        count_vote(candidate, election)
+        mark_voted(voter.id, election.id)
+        return vote
+
+
+def enqueue_vote(voter, election, candidate) -> Vote:
+    """
+    Persist a ballot together with a pending BlockchainTransaction receipt.
+    The chain submission itself is left to `run_worker`.
+    """
+    with transaction.atomic():
+        tx = BlockchainTransaction.objects.create(
+            sender=voter,
+            receiver=voter,
+            status=BlockchainTransaction.STATUS_PENDING,
+            data={
+                'candidate': candidate.id,
+                'election': election.id,
+                'voter': voter.id,
+                'voter_address': voter.wallet_address,
+            },
+        )
+        vote = Vote.objects.create(
+            voter=voter,
+            election=election,
+            candidate=candidate,
+            transaction=tx,
+        )
+        count_vote(candidate, election)
+        mark_voted(voter.id, election.id)
+        return vote
+
+
+# ——— Worker side ——————————————————————————————————
+
+def claim_pending(limit: int):
+    """
+    Atomically move up to `limit` pending receipts to 'submitted'.
+    The conditional UPDATE guarantees that concurrent workers never claim
+    the same row, on every database backend. `updated_at` stamps the claim
+    for `release_stale_claims`.
+    """
+    candidates = BlockchainTransaction.objects.filter(
+        status=BlockchainTransaction.STATUS_PENDING
+    ).order_by('id').values_list('id', flat=True)[:limit]
+
+    claimed = []
+    for pk in candidates:
+        updated = BlockchainTransaction.objects.filter(
+            pk=pk, status=BlockchainTransaction.STATUS_PENDING
+        ).update(status=BlockchainTransaction.STATUS_SUBMITTED, updated_at=timezone.now())
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def release_stale_claims(lease: float = None) -> int:
+    """
+    Return receipts that have sat in 'submitted' for longer than `lease`
+    seconds to the queue. A live worker broadcasts a claimed receipt within
+    seconds, so these were claimed by a worker that died before sending or
+    before saving the hash; in the second case the resend is refused and
+    `process_transaction` finds the ballot already on chain.
+    """
+    lease = settings.VOTE_SUBMISSION_LEASE if lease is None else lease
+    released = BlockchainTransaction.objects.filter(
+        status=BlockchainTransaction.STATUS_SUBMITTED,
+        updated_at__lt=timezone.now() - timedelta(seconds=lease),
+    ).update(status=BlockchainTransaction.STATUS_PENDING, updated_at=timezone.now())
+    if released:
+        logger.warning("Returned %d abandoned vote submissions to the queue", released)
+    return released
+
+
+def mark_failed(tx: BlockchainTransaction, error: str):
+    """
+    Record a failed submission and drop the ballot that referenced it,
+    so the voter is free to vote again.
+    """
+    with transaction.atomic():
+        tx.status = BlockchainTransaction.STATUS_FAILED
+        tx.error = error
+        tx.save(update_fields=['status', 'error', 'updated_at'])
+        for vote in Vote.objects.filter(transaction=tx).select_for_update():
+            vote.delete()
+            count_vote(vote.candidate_id, vote.election_id, -1)
+            unmark_voted(vote.voter_id, vote.election_id)
+
+
+def _already_on_chain(tx: BlockchainTransaction) -> bool:
+    """Whether the contract already holds this receipt's ballot."""
+    try:
+        contract = get_election_contract(tx.data.get('election'))
+        voted_for = contract.functions.votes(Web3.to_checksum_address(tx.data['voter_address'])).call()
+    except Exception:
+        logger.exception("Could not read the on-chain ballot of transaction %s", tx.pk)
+        return False
+    return voted_for == int(tx.data['candidate'])
+
+
+def process_transaction(pk: int):
+    """
+    Broadcast one claimed receipt. Inclusion and confirmation are picked up
+    in bulk by `main.confirmations.ConfirmationTracker`.
+    """
+    close_old_connections()
+    try:
+        tx = BlockchainTransaction.objects.get(pk=pk)
+        try:
+            tx_hash = send_vote_transaction(
+                tx.data['voter_address'], int(tx.data['candidate']), tx.data.get('election')
+            )
+        except Exception as e:
+            if _already_on_chain(tx):
+                # broadcast by a worker that died before saving the hash
+                tx.status = BlockchainTransaction.STATUS_CONFIRMED
+                tx.error = f"Ballot found on chain; transaction hash unknown ({e})"
+                tx.save(update_fields=['status', 'error', 'updated_at'])
+            else:
+                mark_failed(tx, str(e))
+            return
+
+        tx.transaction_hash = HexBytes(tx_hash).to_0x_hex()
+        tx.status = BlockchainTransaction.STATUS_SENT
+        tx.save(update_fields=['transaction_hash', 'status', 'updated_at'])
+    except Exception:
+        logger.exception("Vote worker failed on transaction %s", pk)
+    finally:
+        close_old_connections()
+
+
+def run_worker(concurrency: int = None, poll_interval: float = None, once: bool = False, tracker=None):
+    """
+    Poll for pending receipts and broadcast them through a pool of
+    `concurrency` threads. When a `tracker` is given it is polled from the
+    same loop to settle sent transactions; with `once` the loop then also
+    waits until every sent transaction has been mined or failed.
+    """
+    concurrency = concurrency or settings.VOTE_WORKER_CONCURRENCY
+    poll_interval = poll_interval or settings.VOTE_WORKER_POLL_INTERVAL
+    last_track = last_release = 0.0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = set()
+        while True:
+            in_flight = {f for f in in_flight if not f.done()}
+            # on start, then once per lease: pick up what dead workers left behind
+            if time.monotonic() - last_release >= settings.VOTE_SUBMISSION_LEASE:
+                last_release = time.monotonic()
+                try:
+                    release_stale_claims()
+                except Exception:
+                    logger.exception("Releasing stale vote submissions failed")
+            free = concurrency - len(in_flight)
+            claimed = claim_pending(free) if free > 0 else []
+            for pk in claimed:
+                in_flight.add(pool.submit(process_transaction, pk))
+
+            if tracker is not None and time.monotonic() - last_track >= settings.CONFIRMATION_POLL_INTERVAL:
+                last_track = time.monotonic()
+                try:
+                    tracker.poll()
+                except Exception:
+                    logger.exception("Confirmation tracker poll failed")
+
+            if once and not claimed and not in_flight:
+                if tracker is None or not BlockchainTransaction.objects.filter(
+                    status=BlockchainTransaction.STATUS_SENT
+                ).exists():
+                    return
+            if not claimed:
+                time.sleep(poll_interval)
@@ -0,0 +1,189 @@
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from .models import Vote
+
+logger = logging.getLogger(__name__)
+
+
+class VotedSet:
+    """Bitmap of the user ids that have voted in one election; one bit per id."""
+
+    def __init__(self, voter_ids=()):
+        self.bits = bytearray()
+        for voter_id in voter_ids:
+            self.add(voter_id)
+
+    def add(self, voter_id: int):
+        byte, bit = divmod(voter_id, 8)
+        if byte >= len(self.bits):
+            # grow geometrically so a run of new ids doesn't copy the map each time
+            self.bits.extend(bytes(max(byte + 1, len(self.bits) * 2) - len(self.bits)))
+        self.bits[byte] |= 1 << bit
+
+    def discard(self, voter_id: int):
+        byte, bit = divmod(voter_id, 8)
+        if byte < len(self.bits):
+            self.bits[byte] &= ~(1 << bit) & 0xFF
+
+    def __contains__(self, voter_id: int) -> bool:
+        byte, bit = divmod(voter_id, 8)
+        return byte < len(self.bits) and bool(self.bits[byte] >> bit & 1)
+
+
+# Per-process sets, keyed by election id. The Vote unique constraint stays
+# the authority: a voter missing from a set, or an election whose set isn't
+# loaded yet, falls through to the database. The sets of running elections
+# are loaded when the worker starts (warm_voted_sets) and a background thread
+# reloads them every VOTED_SET_REFRESH seconds, off the request path, to drop
+# ballots deleted by other processes (e.g. queued votes the worker marked
+# failed).
+_sets = {}
+_lock = threading.Lock()
+_wanted = set()      # elections asked for that have no set yet
+_changes = None      # (election, voter, voted) recorded during a reload
+_wake = threading.Event()
+_refresher = None
+
+
+def refresh_voted_sets():
+    """Reload the sets of every running or already loaded election, in one query."""
+    global _changes
+    with _lock:
+        election_ids = _wanted | set(_sets)
+        _wanted.clear()
+        _changes = []
+    try:
+        sets = {election_id: VotedSet() for election_id in election_ids}
+        rows = Vote.objects.filter(
+            Q(election__end_date__gt=now()) | Q(election_id__in=election_ids)
+        ).values_list('election_id', 'voter_id')
+        for election_id, voter_id in rows.iterator():
+            sets.setdefault(election_id, VotedSet()).add(voter_id)
+    except Exception:
+        with _lock:
+            _changes = None
+        raise
+    with _lock:
+        # ballots cast or deleted while the query ran may be missing from, or
+        # still in, its snapshot; replay them in order on the new sets
+        for election_id, voter_id, voted in _changes:
+            if election_id in sets:
+                if voted:
+                    sets[election_id].add(voter_id)
+                else:
+                    sets[election_id].discard(voter_id)
+        _changes = None
+        _sets.update(sets)
+
+
+def _refresh_loop(interval: float, loaded: bool):
+    while True:
+        if loaded:
+            _wake.wait(interval)
+            _wake.clear()
+        try:
+            refresh_voted_sets()
+        except Exception:
+            logger.exception("Reloading the voted sets failed")
+        finally:
+            close_old_connections()
+        loaded = True
+
+
+def start_refresher(interval: float = None, loaded: bool = False):
+    """Start the background loader once per process; 0 disables the sets."""
+    global _refresher
+    if interval is None:
+        interval = settings.VOTED_SET_REFRESH
+    if interval <= 0:
+        return
+    with _lock:
+        if _refresher is None:
+            _refresher = threading.Thread(
+                target=_refresh_loop, args=(interval, loaded), name='voted-set-refresher', daemon=True
+            )
+            _refresher.start()
+
+
+def warm_voted_sets():
+    """Load the running elections' sets at worker startup, then keep them fresh."""
+    if settings.VOTED_SET_REFRESH <= 0:
+        return
+    try:
+        refresh_voted_sets()
+        loaded = True
+    except Exception:
+        # the refresher retries; until then checks fall through to the database
+        logger.exception("Loading the voted sets at startup failed")
+        loaded = False
+    finally:
+        close_old_connections()
+    start_refresher(loaded=loaded)
+
+
+def get_voted_set(election_id: int):
+    """The election's set, or None until the background loader has read it."""
+    voted = _sets.get(election_id)
+    if voted is None:
+        start_refresher()
+        with _lock:
+            if election_id not in _wanted:
+                _wanted.add(election_id)
+                _wake.set()
+    return voted
+
+
+def has_voted(voter_id: int, election_id: int) -> bool:
+    """True if the voter already has a ballot in the election; set hits skip the database."""
+    voted = get_voted_set(election_id)
+    if voted is not None and voter_id in voted:
+        return True
+    if Vote.objects.filter(voter_id=voter_id, election_id=election_id).exists():
+        if voted is not None:
+            voted.add(voter_id)
+        return True
+    return False
+
+
+async def ahas_voted(voter_id: int, election_id: int) -> bool:
+    voted = _sets.get(election_id)
+    if voted is not None and voter_id in voted:
+        return True
+    return await sync_to_async(has_voted)(voter_id, election_id)
+
+
+def _record(election_id: int, voter_id: int, voted: bool):
+    with _lock:
+        voted_set = _sets.get(election_id)
+        if voted_set is not None:
+            if voted:
+                voted_set.add(voter_id)
+            else:
+                voted_set.discard(voter_id)
+        if _changes is not None:
+            _changes.append((election_id, voter_id, voted))
+
+
+def _add(election_id: int, voter_id: int):
+    _record(election_id, voter_id, True)
+
+
+def _discard(election_id: int, voter_id: int):
+    _record(election_id, voter_id, False)
+
+
+def mark_voted(voter_id: int, election_id: int):
+    """Add the voter once the transaction creating their Vote commits."""
+    transaction.on_commit(lambda: _add(election_id, voter_id))
+
+
+def unmark_voted(voter_id: int, election_id: int):
+    """Drop the voter once the transaction deleting their Vote commits."""
+    transaction.on_commit(lambda: _discard(election_id, voter_id))
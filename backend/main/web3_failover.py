@@ -0,0 +1,277 @@
+"""
+Web3 providers that spread JSON-RPC traffic over several nodes.
+
+Each node keeps rolling latency and error statistics over its last
+WEB3_HEALTH_WINDOW calls. A node whose error rate passes
+WEB3_MAX_ERROR_RATE, or that fails MAX_CONSECUTIVE_ERRORS calls in a row,
+sits out for WEB3_UNHEALTHY_COOLDOWN seconds.
+
+Reads go to the best-ranked node. If it has not answered within its own
+p95 latency, the same request is sent to the next node as well, and
+whichever answers first wins. Writes go only to the healthiest node and
+move on to the next one only when the transport fails. JSON-RPC error
+responses, such as a reverted call, count as answers, not node failures.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from web3 import AsyncWeb3
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.providers.base import JSONBaseProvider
+
+# Methods that change chain state are never hedged.
+WRITE_METHODS = frozenset({'eth_sendRawTransaction', 'eth_sendTransaction'})
+# A dead node trips this long before a long good history lets its error rate climb.
+MAX_CONSECUTIVE_ERRORS = 3
+
+
+class EndpointHealth:
+    """Rolling latency and error rate of one node."""
+
+    def __init__(self, uri: str, window: int = None, max_error_rate: float = None, cooldown: float = None):
+        self.uri = uri
+        self.samples = deque(maxlen=window or settings.WEB3_HEALTH_WINDOW)
+        self.max_error_rate = settings.WEB3_MAX_ERROR_RATE if max_error_rate is None else max_error_rate
+        self.cooldown = settings.WEB3_UNHEALTHY_COOLDOWN if cooldown is None else cooldown
+        self.down_until = 0.0
+        self.consecutive_errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.samples.append((latency, ok))
+            self.consecutive_errors = 0 if ok else self.consecutive_errors + 1
+            # judge the rate only once a handful of calls are in, so one timeout doesn't bench a node
+            failing = len(self.samples) >= 5 and self._error_rate() > self.max_error_rate
+            if failing or self.consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
+                self.down_until = time.monotonic() + self.cooldown
+                self.consecutive_errors = 0
+                self.samples.clear()  # back on probation with a clean slate
+
+    def _error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            return self._error_rate()
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def latency(self, percentile: float):
+        """Latency percentile of successful calls, or None without samples."""
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, math.ceil(percentile / 100 * len(latencies)) - 1)]
+
+    def hedge_delay(self) -> float:
+        p95 = self.latency(95)
+        return max(settings.WEB3_HEDGE_MIN_DELAY, p95 if p95 is not None else 0)
+
+    def score(self) -> float:
+        """Lower is better: median latency, penalised by the error rate."""
+        p50 = self.latency(50) or 0.0
+        return p50 * (1 + 4 * self.error_rate)
+
+    def as_dict(self) -> dict:
+        return {
+            'uri': self.uri,
+            'healthy': self.healthy,
+            'calls': len(self.samples),
+            'error_rate': round(self.error_rate, 3),
+            'p50': self.latency(50),
+            'p95': self.latency(95),
+        }
+
+
+_health = {}
+_health_lock = threading.Lock()
+
+
+def get_health(uri: str) -> EndpointHealth:
+    """Process-wide statistics for `uri`, shared by the sync and async providers."""
+    with _health_lock:
+        if uri not in _health:
+            _health[uri] = EndpointHealth(uri)
+        return _health[uri]
+
+
+def endpoint_stats() -> list:
+    return [health.as_dict() for health in list(_health.values())]
+
+
+class _Endpoint:
+    def __init__(self, uri, provider):
+        self.uri = uri
+        self.provider = provider
+        self.health = get_health(uri)
+
+
+def _ranked(endpoints) -> list:
+    """Healthy nodes by score, then benched ones as a last resort."""
+    return sorted(endpoints, key=lambda e: (not e.health.healthy, e.health.score()))
+
+
+def _is_write(requests) -> bool:
+    return any(method in WRITE_METHODS for method, _ in requests)
+
+
+class FailoverHTTPProvider(JSONBaseProvider):
+    """Sync provider over several PooledHTTPProviders; see the module docstring."""
+
+    def __init__(self, endpoint_uris, **kwargs):
+        from .web3_provider import PooledHTTPProvider
+
+        super().__init__(**kwargs)
+        self.endpoints = []
+        for uri in endpoint_uris:
+            provider = PooledHTTPProvider(uri)
+            provider.exception_retry_configuration = None  # failing over beats retrying a sick node
+            self.endpoints.append(_Endpoint(uri, provider))
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.WEB3_POOL_MAXSIZE * len(self.endpoints), thread_name_prefix='web3-failover'
+        )
+
+    def __str__(self):
+        return f"RPC failover over {', '.join(e.uri for e in self.endpoints)}"
+
+    def _timed(self, endpoint, call):
+        started = time.monotonic()
+        try:
+            result = call(endpoint.provider)
+        except Exception:
+            endpoint.health.record(time.monotonic() - started, False)
+            raise
+        endpoint.health.record(time.monotonic() - started, True)
+        return result
+
+    def _failover(self, call):
+        error = None
+        for endpoint in _ranked(self.endpoints):
+            try:
+                return self._timed(endpoint, call)
+            except Exception as e:
+                error = e
+        raise error
+
+    def _hedged(self, call):
+        remaining = _ranked(self.endpoints)
+        first = remaining[0]
+        pending = set()
+        error = None
+
+        def launch():
+            pending.add(self._executor.submit(self._timed, remaining.pop(0), call))
+
+        launch()
+        hedged = False
+        while pending:
+            timeout = first.health.hedge_delay() if remaining and not hedged else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # the first node is slower than usual: race a duplicate on the next one
+                hedged = True
+                launch()
+                continue
+            for future in done:
+                pending.discard(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    error = e
+            if not pending and remaining:
+                launch()
+        raise error
+
+    def make_request(self, method, params):
+        call = lambda provider: provider.make_request(method, params)  # noqa: E731
+        return self._failover(call) if method in WRITE_METHODS else self._hedged(call)
+
+    def make_batch_request(self, requests):
+        call = lambda provider: provider.make_batch_request(requests)  # noqa: E731
+        return self._failover(call) if _is_write(requests) else self._hedged(call)
+
+
+class AsyncFailoverHTTPProvider(AsyncJSONBaseProvider):
+    """Async counterpart of FailoverHTTPProvider for AsyncWeb3 clients."""
+
+    def __init__(self, endpoint_uris, request_kwargs=None, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoints = []
+        for uri in endpoint_uris:
+            provider = AsyncWeb3.AsyncHTTPProvider(uri, request_kwargs=request_kwargs or {})
+            provider.exception_retry_configuration = None
+            self.endpoints.append(_Endpoint(uri, provider))
+
+    def __str__(self):
+        return f"Async RPC failover over {', '.join(e.uri for e in self.endpoints)}"
+
+    async def _timed(self, endpoint, call):
+        started = time.monotonic()
+        try:
+            result = await call(endpoint.provider)
+        except Exception:
+            endpoint.health.record(time.monotonic() - started, False)
+            raise
+        endpoint.health.record(time.monotonic() - started, True)
+        return result
+
+    async def _failover(self, call):
+        error = None
+        for endpoint in _ranked(self.endpoints):
+            try:
+                return await self._timed(endpoint, call)
+            except Exception as e:
+                error = e
+        raise error
+
+    async def _hedged(self, call):
+        remaining = _ranked(self.endpoints)
+        first = remaining[0]
+        pending = set()
+        error = None
+
+        def launch():
+            pending.add(asyncio.ensure_future(self._timed(remaining.pop(0), call)))
+
+        launch()
+        hedged = False
+        try:
+            while pending:
+                timeout = first.health.hedge_delay() if remaining and not hedged else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    launch()
+                    continue
+                for task in done:
+                    pending.discard(task)
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        error = e
+                if not pending and remaining:
+                    launch()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def make_request(self, method, params):
+        call = lambda provider: provider.make_request(method, params)  # noqa: E731
+        return await (self._failover(call) if method in WRITE_METHODS else self._hedged(call))
+
+    async def make_batch_request(self, requests):
+        call = lambda provider: provider.make_batch_request(requests)  # noqa: E731
+        return await (self._failover(call) if _is_write(requests) else self._hedged(call))
@@ -0,0 +1,127 @@
+import json
+import threading
+from functools import lru_cache
+
+import aiohttp
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from web3 import AsyncWeb3, Web3
+from web3._utils.http_session_manager import HTTPSessionManager
+
+from .chain_backends import get_chain_backend
+
+# One Web3 client per endpoint and one contract object per address, shared
+# by every thread of the worker process.
+_lock = threading.Lock()
+_clients = {}
+_async_clients = {}
+_contracts = {}
+
+
+class SharedSessionManager(HTTPSessionManager):
+    """
+    web3's default manager opens a separate `requests.Session` per thread.
+    This one hands every thread the same session, so they all draw from a
+    single keep-alive connection pool.
+    """
+
+    def __init__(self, session: requests.Session):
+        super().__init__()
+        self._session = session
+
+    def cache_and_return_session(self, endpoint_uri, session=None, request_timeout=None):
+        return self._session
+
+
+class PooledHTTPProvider(Web3.HTTPProvider):
+    """HTTPProvider backed by a shared, bounded keep-alive connection pool."""
+
+    def __init__(self, endpoint_uri, pool_maxsize: int = None, timeout=None, **kwargs):
+        pool_maxsize = pool_maxsize or settings.WEB3_POOL_MAXSIZE
+        timeout = timeout or (settings.WEB3_CONNECT_TIMEOUT, settings.WEB3_READ_TIMEOUT)
+
+        session = requests.Session()
+        # pool_block keeps a worker from opening more sockets than its threads need
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, pool_block=True)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        request_kwargs = {'timeout': timeout, **kwargs.pop('request_kwargs', {})}
+        super().__init__(endpoint_uri, request_kwargs=request_kwargs, **kwargs)
+        self._request_session_manager = SharedSessionManager(session)
+
+
+def get_web3(endpoint_uri: str = None) -> Web3:
+    """
+    Return the process-wide Web3 client for `endpoint_uri`, backed by the
+    CHAIN_BACKEND provider (see main.chain_backends).
+    """
+    endpoint_uri = endpoint_uri or settings.WEB3_PROVIDER_URI
+    client = _clients.get(endpoint_uri)
+    if client is None:
+        with _lock:
+            client = _clients.get(endpoint_uri)
+            if client is None:
+                client = Web3(get_chain_backend().provider(endpoint_uri))
+                _clients[endpoint_uri] = client
+    return client
+
+
+def get_async_web3(endpoint_uri: str = None) -> AsyncWeb3:
+    """
+    Return the process-wide AsyncWeb3 client for `endpoint_uri`. web3 keeps
+    one aiohttp session per event loop, so all coroutines in an ASGI worker
+    share its keep-alive connections.
+    """
+    endpoint_uri = endpoint_uri or settings.WEB3_PROVIDER_URI
+    client = _async_clients.get(endpoint_uri)
+    if client is None:
+        with _lock:
+            client = _async_clients.get(endpoint_uri)
+            if client is None:
+                timeout = aiohttp.ClientTimeout(
+                    connect=settings.WEB3_CONNECT_TIMEOUT, sock_read=settings.WEB3_READ_TIMEOUT
+                )
+                client = AsyncWeb3(get_chain_backend().async_provider(endpoint_uri, timeout))
+                _async_clients[endpoint_uri] = client
+    return client
+
+
+@lru_cache(maxsize=None)
+def _load_artifact(path: str):
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_abi(abi_path: str) -> list:
+    """Parse an ABI once; accepts a Truffle artifact or a bare ABI list."""
+    data = _load_artifact(str(abi_path))
+    return data['abi'] if isinstance(data, dict) else data
+
+
+def load_bytecode(artifact_path: str) -> str:
+    """Creation bytecode from a Truffle artifact, for deploying new instances."""
+    data = _load_artifact(str(artifact_path))
+    if not isinstance(data, dict) or not data.get('bytecode'):
+        raise ValueError(f"{artifact_path} has no bytecode to deploy")
+    return data['bytecode']
+
+
+def get_contract(address: str, abi_path: str = None, w3=None):
+    """
+    Return a cached contract object for `address` on the given client
+    (sync or async; defaults to the shared sync client).
+    """
+    abi_path = str(abi_path or settings.CONTRACT_ABI_PATH)
+    w3 = w3 or get_web3()
+    address = Web3.to_checksum_address(address)
+    key = (id(w3), address, abi_path)
+    contract = _contracts.get(key)
+    if contract is None:
+        with _lock:
+            contract = _contracts.get(key)
+            if contract is None:
+                contract = w3.eth.contract(address=address, abi=load_abi(abi_path))
+                _contracts[key] = contract
+    return contract
@@ -1,20 +1,23 @@
+from functools import lru_cache
 from django.http import JsonResponse
-from web3 import Web3
-import json
+from main.web3_provider import get_contract, get_web3
 from .models import VerificationRequest
 
 # Setup Web3 connection - replace with your Ganache URL
 ganache_url = "http://192.168.0.146:7545"
-web3 = Web3(Web3.HTTPProvider(ganache_url))
-
-# Default account for transactions
-web3.eth.defaultAccount = web3.eth.accounts[0]
 
 # Load contract ABI and address - replace with your contract details
-with open('../build/contracts/IdentityVerification.json', 'r') as f:
-    contract_abi = json.load(f)
+contract_abi_path = '../build/contracts/IdentityVerification.json'
 contract_address = '0x28Fc09C00a32fD04734cA0e7E455f6409530DD76'  # Replace with your deployed contract address
-contract = web3.eth.contract(address=contract_address, abi=contract_abi)
+
+
+@lru_cache(maxsize=1)
+def get_verification_contract():
+    """Connect on first use rather than at import, so startup never waits on Ganache."""
+    web3 = get_web3(ganache_url)
+    # Default account for transactions
+    web3.eth.default_account = web3.eth.accounts[0]
+    return web3, get_contract(contract_address, contract_abi_path, w3=web3)
 
 def record_verification_on_blockchain(request):
     verification_id = request.session.get('verification_id')
@@ -36,10 +39,11 @@ def record_verification_on_blockchain(request):
             }, status=400)
         
         # Call the smart contract function
+        web3, contract = get_verification_contract()
         tx_hash = contract.functions.verifyUser(str(verification.id)).transact()
         
         # Wait for transaction receipt
-        tx_receipt = web3.eth.waitForTransactionReceipt(tx_hash)
+        tx_receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
         
         return JsonResponse({
             'status': 'success',
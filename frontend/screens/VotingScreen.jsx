@@ -85,7 +85,10 @@ export default function VotingScreen({ navigation }) {
          }, 
         }
       );
-      if (response.data) {
+      if (response.status === 202) {
+        // queued submission: poll the receipt until the vote is confirmed
+        await pollReceipt(response.data.receipt_id, token);
+      } else if (response.data) {
         setVotingStatus('success');
         setModalVisible(true);
       }
@@ -100,6 +103,30 @@ export default function VotingScreen({ navigation }) {
     }
   }
 
+  async function pollReceipt(receiptId, token) {
+    for (let attempt = 0; attempt < 60; attempt++) {
+      const response = await axios.get(
+        `${API_URL}/votes/receipts/${receiptId}/`,
+        { headers: { 'Authorization': `Token ${token}` } }
+      );
+      const receiptStatus = response.data?.status;
+      // batched ballots are settled once their batch root is mined
+      if (receiptStatus === 'confirmed' || (receiptStatus === 'mined' && response.data?.batch)) {
+        setVotingStatus('success');
+        setModalVisible(true);
+        return;
+      }
+      if (receiptStatus === 'failed') {
+        setVotingStatus(null);
+        Alert.alert('Voting Failed', 'Your vote could not be recorded on the blockchain. Please try again.');
+        return;
+      }
+      await new Promise(resolve => setTimeout(resolve, 2000));
+    }
+    setVotingStatus(null);
+    Alert.alert('Vote Pending', 'Your vote is still being confirmed. Please check back shortly.');
+  }
+
   function renderElectionItem({ item }) {
     return (
       <TouchableOpacity